@@ -1,20 +1,43 @@
-from flask import Flask, jsonify
-from flask_pymongo import PyMongo
-from pymongo import MongoClient
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+
+from flask import Flask, Response, jsonify, request, stream_with_context
 from controllers import user_bp, reporte_bp
 from models import UserModel, ProyectoModel, TareaModel, ResponsableModel, EstadoTareaModel, ReporteModel
 from supermarket_controllers import supermarket_bp
-from supermarket_models import CategoriaModel, ProveedorModel, ClienteModel, ProductoModel, VentaModel, SupermarketReporteModel
+from supermarket_models import CategoriaModel, ProveedorModel, ClienteModel, ProductoModel, VentaModel, VentaDiariaModel, ClienteStatsModel, SupermarketReporteModel
+from cache import CacheResultados, DimensionCache
+from indexes import aplicar_indices
+from versioning import Versiones
+from json_provider import BSONJSONProvider
+from proyeccion import parsear_campos, proyeccion_find
+from streaming import TIPO_NDJSON, quiere_stream
+from conexion import ConexionMongo
+from metricas import Metricas
 
 app = Flask(__name__)
 
-# Configuración de la base de datos TAREAS
-app.config["MONGO_URI"] = "mongodb://localhost:27017/mi_db"
-mongo = PyMongo(app)
+# Serializador JSON compartido por todos los blueprints (ObjectId, fechas, Decimal128...)
+app.json = BSONJSONProvider(app)
+
+# Configuración de MongoDB: un solo MongoClient (un solo pool) para ambas bases de datos
+app.config.setdefault("MONGO_URI", "mongodb://localhost:27017/")
+app.config.setdefault("MONGO_DB_TAREAS", "mi_db")
+app.config.setdefault("MONGO_DB_SUPERMARKET", "supermarket")
+app.config.setdefault("METRICAS_HABILITADAS", True)
+
+# Métricas de rutas y de comandos de MongoDB expuestas en /metrics (formato Prometheus)
+if app.config["METRICAS_HABILITADAS"]:
+    Metricas.init(app)
+    ConexionMongo.init(app.config, listeners=[Metricas.listener_comandos()])
+else:
+    ConexionMongo.init(app.config)
 
-# Configuración de la base de datos SUPERMARKET
-client = MongoClient("mongodb://localhost:27017/")
-db_supermarket = client["supermarket"]
+# Base de datos TAREAS
+mongo = ConexionMongo.base_datos(app.config["MONGO_DB_TAREAS"])
+
+# Base de datos SUPERMARKET
+mongo_supermarket = ConexionMongo.base_datos(app.config["MONGO_DB_SUPERMARKET"])
 
 # Inicializar todos los modelos de TAREAS
 UserModel.init(mongo)
@@ -25,19 +48,34 @@ EstadoTareaModel.init(mongo)
 ReporteModel.init(mongo)
 
 # Inicializar todos los modelos de SUPERMARKET
-# Crear una instancia de PyMongo para la base de datos supermarket
-from flask_pymongo import PyMongo
-
-app.config["SUPERMARKET_MONGO_URI"] = "mongodb://localhost:27017/supermarket"
-mongo_supermarket = PyMongo(app, uri="mongodb://localhost:27017/supermarket")
-
 CategoriaModel.init(mongo_supermarket)
 ProveedorModel.init(mongo_supermarket)
 ClienteModel.init(mongo_supermarket)
 ProductoModel.init(mongo_supermarket)
 VentaModel.init(mongo_supermarket)
+VentaDiariaModel.init(mongo_supermarket)
+ClienteStatsModel.init(mongo_supermarket)
 SupermarketReporteModel.init(mongo_supermarket)
 
+# Caché en memoria de las colecciones pequeñas de referencia (estados, tipos de documento, categorías, proveedores)
+DimensionCache.init(mongo, mongo_supermarket, ttl=app.config.get("DIMENSION_CACHE_TTL", 300))
+# Rankings (top-productos, top-clientes) por conjunto de parámetros, invalidados por versión
+CacheResultados.init(max_entradas=app.config.get("RESULTADOS_CACHE_MAX", 256),
+                     ttl=app.config.get("RESULTADOS_CACHE_TTL", 300))
+
+# Crear los índices declarados en los modelos (idempotente; también: python indexes.py aplicar)
+if app.config.get("CREAR_INDICES_AL_INICIAR", True):
+    try:
+        aplicar_indices()
+    except Exception as e:
+        print(f"[WARN] No se pudieron crear los índices: {e}")
+
+# Detectar cambios hechos por fuera de la API (importadores, shell) para los ETag.
+# Requiere que MongoDB corra como replica set.
+if app.config.get("VIGILAR_CAMBIOS", False):
+    Versiones.vigilar(mongo.db)
+    Versiones.vigilar(mongo_supermarket.db)
+
 # Registrar los blueprints
 app.register_blueprint(user_bp)
 app.register_blueprint(reporte_bp)
@@ -47,58 +85,164 @@ app.register_blueprint(supermarket_bp)
 def index():
     return "API Flask + MongoDB funcionando con todas las colecciones"
 
+# Secciones de /unified: (base de datos, sección, clave del resumen, colección)
+SECCIONES_UNIFIED = [
+    ("base_datos_tareas", "usuarios", "total_usuarios", lambda: mongo.db.users),
+    ("base_datos_tareas", "tareas", "total_tareas", lambda: mongo.db.tareas),
+    ("base_datos_tareas", "proyectos", "total_proyectos", lambda: mongo.db.proyectos),
+    ("base_datos_supermarket", "clientes", "total_clientes", lambda: mongo_supermarket.db.clientes),
+    ("base_datos_supermarket", "productos", "total_productos", lambda: mongo_supermarket.db.productos),
+    ("base_datos_supermarket", "ventas", "total_ventas", lambda: mongo_supermarket.db.ventas),
+]
+
+# Pool acotado para leer las secciones de /unified en paralelo
+unified_executor = ThreadPoolExecutor(
+    max_workers=app.config.get("UNIFIED_MAX_WORKERS", len(SECCIONES_UNIFIED)),
+    thread_name_prefix="unified"
+)
+
+
+def _opciones_seccion(seccion):
+    """
+    Lee limit, fields y timeout (segundos) de una sección. Los parámetros con prefijo
+    (?ventas.limit=100) tienen prioridad sobre los globales (?limit=100).
+    """
+    def parametro(nombre):
+        return request.args.get(f"{seccion}.{nombre}", request.args.get(nombre))
+
+    limite = parametro("limit")
+    timeout = parametro("timeout")
+    try:
+        limite = int(limite) if limite else 0
+        timeout = float(timeout) if timeout else None
+    except ValueError:
+        raise ValueError(f"limit debe ser entero y timeout numérico (sección '{seccion}')")
+    if limite < 0 or (timeout is not None and timeout <= 0):
+        raise ValueError(f"limit y timeout deben ser positivos (sección '{seccion}')")
+    return limite, parsear_campos(parametro("fields")), timeout
+
+
+def _leer_seccion(collection, limite, campos, timeout):
+    cursor = collection.find({}, proyeccion_find(campos) or {"_id": 0})
+    if limite:
+        cursor = cursor.limit(limite)
+    if timeout:
+        # El servidor también aborta la consulta al vencer el plazo
+        cursor = cursor.max_time_ms(int(timeout * 1000))
+    return list(cursor)
+
+
+def _stream_unified(futuros, inicio):
+    """Escribe cada sección en cuanto termina (NDJSON) y al final el resumen."""
+    resumen = {}
+    errores = {}
+    pendientes = set(futuros)
+    plazos = [timeout for (_, _, _, timeout) in futuros.values()]
+    limite_espera = None if None in plazos else max(plazos) - (time.monotonic() - inicio)
+    try:
+        for futuro in as_completed(futuros, timeout=limite_espera):
+            pendientes.discard(futuro)
+            base, seccion, clave_total, _ = futuros[futuro]
+            try:
+                datos = futuro.result()
+            except Exception as e:
+                errores[seccion] = str(e)
+                yield app.json.dumps({"base_datos": base, "seccion": seccion, "error": str(e)}) + "\n"
+                continue
+            resumen[clave_total] = len(datos)
+            yield app.json.dumps({"base_datos": base, "seccion": seccion, "total": len(datos), "data": datos}) + "\n"
+    except FuturesTimeoutError:
+        for futuro in pendientes:
+            base, seccion, _, _ = futuros[futuro]
+            errores[seccion] = "timeout"
+            yield app.json.dumps({"base_datos": base, "seccion": seccion, "error": "timeout"}) + "\n"
+
+    final = {"success": not errores, "resumen": resumen}
+    if errores:
+        final["errores"] = errores
+    yield app.json.dumps(final) + "\n"
+
+
 @app.route("/unified")
 def unified_data():
     """
-    Endpoint que une datos de ambas bases de datos como en el ejemplo
+    Endpoint que une datos de ambas bases de datos como en el ejemplo.
+    Las seis colecciones se leen en paralelo, así la latencia es la de la más lenta.
+
+    Parámetros opcionales (globales o por sección con prefijo, p. ej. ?ventas.limit=50):
+    - limit: máximo de documentos por sección
+    - fields: campos a retornar
+    - timeout: segundos máximos por sección
+    - stream=1: escribe cada sección (NDJSON) en cuanto termina
     """
     try:
-        # Obtener datos de la base de datos TAREAS
-        usuarios = list(mongo.db.users.find({}, {"_id": 0}))
-        tareas = list(mongo.db.tareas.find({}, {"_id": 0}))
-        proyectos = list(mongo.db.proyectos.find({}, {"_id": 0}))
-        
-        # Obtener datos de la base de datos SUPERMARKET
-        clientes = list(mongo_supermarket.db.clientes.find({}, {"_id": 0}))
-        productos = list(mongo_supermarket.db.productos.find({}, {"_id": 0}))
-        ventas = list(mongo_supermarket.db.ventas.find({}, {"_id": 0}))
-        
-        return jsonify({
-            "base_datos_tareas": {
-                "usuarios": usuarios,
-                "tareas": tareas,
-                "proyectos": proyectos
-            },
-            "base_datos_supermarket": {
-                "clientes": clientes,
-                "productos": productos,
-                "ventas": ventas
-            },
-            "resumen": {
-                "total_usuarios": len(usuarios),
-                "total_tareas": len(tareas),
-                "total_proyectos": len(proyectos),
-                "total_clientes": len(clientes),
-                "total_productos": len(productos),
-                "total_ventas": len(ventas)
-            }
-        })
-    except Exception as e:
+        opciones = {seccion: _opciones_seccion(seccion) for _, seccion, _, _ in SECCIONES_UNIFIED}
+    except ValueError as e:
+        return jsonify({"error": str(e), "message": "Parámetros inválidos"}), 400
+
+    inicio = time.monotonic()
+    futuros = {}
+    for base, seccion, clave_total, coleccion in SECCIONES_UNIFIED:
+        limite, campos, timeout = opciones[seccion]
+        futuro = unified_executor.submit(_leer_seccion, coleccion(), limite, campos, timeout)
+        futuros[futuro] = (base, seccion, clave_total, timeout)
+
+    if quiere_stream():
+        return Response(stream_with_context(_stream_unified(futuros, inicio)), mimetype=TIPO_NDJSON)
+
+    respuesta = {"base_datos_tareas": {}, "base_datos_supermarket": {}, "resumen": {}}
+    errores = {}
+    for futuro, (base, seccion, clave_total, timeout) in futuros.items():
+        espera = None if timeout is None else max(0, timeout - (time.monotonic() - inicio))
+        try:
+            datos = futuro.result(timeout=espera)
+        except FuturesTimeoutError:
+            errores[seccion] = "timeout"
+            continue
+        except Exception as e:
+            errores[seccion] = str(e)
+            continue
+        respuesta[base][seccion] = datos
+        respuesta["resumen"][clave_total] = len(datos)
+
+    if errores and len(errores) == len(futuros):
         return jsonify({
-            "error": str(e),
+            "error": errores,
             "message": "Error al obtener datos de las bases de datos"
         }), 500
+    if errores:
+        respuesta["errores"] = errores
+    return jsonify(respuesta)
+
+@app.route("/estado/pool")
+def estado_pool():
+    """
+    Estadísticas vivas del pool de conexiones compartido (para planificar capacidad)
+    """
+    return jsonify(ConexionMongo.estado_pool())
+
+@app.route("/metrics")
+def metrics():
+    """
+    Latencias por ruta y por comando de MongoDB, bytes, errores y pool (formato de texto de Prometheus)
+    """
+    return Metricas.respuesta(ConexionMongo.estadisticas)
 
 @app.route("/api")
 def api_info():
     return {
         "message": "API Unificada - Tareas + Supermarket",
         "endpoints": {
-            "unified_data": "/unified",
+            "estado_pool": "/estado/pool",
+            "metricas": "/metrics (formato Prometheus)",
+            "unified_data": "/unified?limit=&fields=&timeout=&stream=1 (o por sección: ?ventas.limit=100)",
             "tareas": {
                 "reporte_tareas": "/reportes/tareas",
+                "exportar_reporte_tareas": "/reportes/tareas?format=csv|parquet&batch_size=",
                 "reporte_tareas_filtrado": "/reportes/tareas/filtro?estado=Pendiente|Terminada|Vencida|all",
                 "reporte_pendientes_terminadas": "/reportes/tareas?filtrar=pendientes_terminadas",
+                "reporte_tareas_materializado": "/reportes/tareas?modo=materializado",
+                "refrescar_reporte_tareas": "POST /reportes/tareas/refrescar",
                 "pipeline_info": "/pipeline",
                 "proyectos": "/proyectos",
                 "responsables": "/responsables",
@@ -108,19 +252,33 @@ def api_info():
                 "categorias": "/supermarket/categorias",
                 "proveedores": "/supermarket/proveedores",
                 "clientes": "/supermarket/clientes",
+                "historial_cliente": "/supermarket/clientes/<id>/ventas?limit=&after=&desde=&hasta=",
+                "resumen_cliente": "/supermarket/clientes/<id>/resumen",
                 "productos": "/supermarket/productos",
                 "productos_por_categoria": "/supermarket/productos/categoria/<id>",
-                "ventas": "/supermarket/ventas",
-                "reporte_ventas_detallado": "/supermarket/reportes/ventas-detallado",
-                "reporte_ventas_por_categoria": "/supermarket/reportes/ventas-por-categoria",
-                "reporte_ventas_con_productos": "/supermarket/reportes/ventas-con-productos"
+                "ventas": "/supermarket/ventas?desde=&hasta=",
+                "crear_venta": "POST /supermarket/ventas",
+                "reporte_ventas_detallado": "/supermarket/reportes/ventas-detallado?desde=&hasta=",
+                "exportar_ventas_detallado": "/supermarket/reportes/ventas-detallado?format=csv|parquet&desde=&hasta=",
+                "reporte_ventas_por_categoria": "/supermarket/reportes/ventas-por-categoria?desde=&hasta=",
+                "reporte_ventas_por_producto": "/supermarket/reportes/ventas-por-producto?desde=&hasta=",
+                "reporte_ventas_con_productos": "/supermarket/reportes/ventas-con-productos?desde=&hasta=",
+                "top_productos": "/supermarket/reportes/top-productos?n=&categoria=&desde=&hasta=",
+                "top_clientes": "/supermarket/reportes/top-clientes?n=&categoria=&desde=&hasta="
             }
         },
         "filtros_disponibles": {
             "todas_las_tareas": "GET /reportes/tareas (sin parámetros)",
             "pendientes_terminadas": "GET /reportes/tareas?filtrar=pendientes_terminadas",
-            "por_estado_especifico": "GET /reportes/tareas/filtro?estado=Pendiente|Terminada|Vencida"
-        }
+            "por_estado_especifico": "GET /reportes/tareas/filtro?estado=Pendiente|Terminada|Vencida",
+            "por_proyecto_o_responsable": "GET /reportes/tareas/filtro?id_proyecto=1,2&id_responsable=3",
+            "por_edad": "GET /reportes/tareas/filtro?edad_min=18&edad_max=30 o ?grupo_etareo=adulto medio"
+        },
+        "streaming": "Cualquier listado o reporte acepta ?stream=1 (o Accept: application/x-ndjson) y ?batch_size=",
+        "proyeccion": "Cualquier listado o reporte acepta ?fields=campo1,campo2 (_id solo si se pide)",
+        "paginacion": "Listados, /reportes/tareas y ventas-detallado aceptan ?limit=&after=<siguiente> y ?total=1 "
+                      "(/reportes/tareas ordena las páginas por _id de tarea, o por responsable con modo=materializado)",
+        "explain": "Los reportes y /pipeline aceptan ?explain=executionStats|queryPlanner|allPlansExecution (plan por etapa, índices y estrategia de $lookup)"
     }
 
 if __name__ == "__main__":
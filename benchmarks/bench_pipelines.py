@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los pipelines de reportes y consultas registradas contra un mongod local.
+
+Para cada escala (opcionalmente generada con import/generar_datos.py en bases de
+datos propias del benchmark) ejecuta cada consulta de indexes.consultas_registradas()
+y registra:
+- latencia p50/p95/p99 (servidor + red, documentos recibidos como RawBSONDocument);
+- tiempo de decodificación en el cliente (RawBSONDocument -> dict);
+- filas y bytes retornados;
+- documentos y claves examinados según explain("executionStats").
+
+Los resultados se guardan como JSON y pueden compararse contra una línea base:
+la comparación marca como regresión cualquier percentil que empeore más que
+--umbral y sale con código 1.
+
+Uso:
+    python benchmarks/bench_pipelines.py --generar --escalas 1000,10000,100000 --guardar base.json
+    python benchmarks/bench_pipelines.py --generar --escalas 1000,10000,100000 --comparar base.json
+    python benchmarks/bench_pipelines.py --escalas actual     # datos ya cargados en mi_db / supermarket
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from bson import decode
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import OperationFailure
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "import"))
+import indexes  # noqa: E402
+from conexion import ConexionMongo  # noqa: E402
+from models import ReporteModel  # noqa: E402
+from optimizador import ejecutar as ejecutar_pipeline, optimizar_comando  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+CODEC_RAW = CodecOptions(document_class=RawBSONDocument)
+DIFERENCIA_MINIMA_MS = 0.5
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not valores:
+        return None
+    rango = max(1, -(-p * len(valores) // 100))
+    return valores[rango - 1]
+
+
+def ejecutar(coleccion, comando):
+    """Ejecuta un comando de consultas_registradas() como lo haría el modelo y retorna los documentos crudos."""
+    coleccion = coleccion.with_options(codec_options=CODEC_RAW)
+    if "aggregate" in comando:
+        return list(ejecutar_pipeline(coleccion, comando["pipeline"]))
+    cursor = coleccion.find(comando.get("filter", {}))
+    if comando.get("sort"):
+        cursor = cursor.sort(list(comando["sort"].items()))
+    if comando.get("limit"):
+        cursor = cursor.limit(comando["limit"])
+    return list(cursor)
+
+
+def medir_consulta(coleccion, comando, repeticiones, calentamiento):
+    for _ in range(calentamiento):
+        ejecutar(coleccion, comando)
+
+    latencias = []
+    decodificacion = []
+    filas = bytes_totales = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        documentos = ejecutar(coleccion, comando)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        for doc in documentos:
+            decode(doc.raw)
+        decodificacion.append((time.perf_counter() - inicio) * 1000)
+        filas = len(documentos)
+        bytes_totales = sum(len(doc.raw) for doc in documentos)
+
+    latencias.sort()
+    decodificacion.sort()
+    resultado = {f"p{p}_ms": round(percentil(latencias, p), 3) for p in PERCENTILES}
+    resultado.update({
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+        "decode_p50_ms": round(percentil(decodificacion, 50), 3),
+        "filas": filas,
+        "bytes": bytes_totales,
+    })
+
+    try:
+        explain = coleccion.database.command("explain", optimizar_comando(coleccion, comando),
+                                             verbosity="executionStats")
+        diagnostico = indexes.diagnosticar(explain)
+        resultado["docs_examinados"] = diagnostico["estadisticas"]["totalDocsExamined"]
+        resultado["keys_examinadas"] = diagnostico["estadisticas"]["totalKeysExamined"]
+        resultado["problemas"] = diagnostico["problemas"]
+    except OperationFailure as e:
+        resultado["problemas"] = [f"explain: {e}"]
+    return resultado
+
+
+def preparar_escala(escala, db_tareas, db_supermarket, semilla):
+    """Genera los datos de una escala en las bases del benchmark y crea sus índices."""
+    import generar_datos
+    p = generar_datos.parametros(tareas=escala, ventas=escala, semilla=semilla)
+    for base, nombre_db in (("tareas", db_tareas), ("supermarket", db_supermarket)):
+        generar, _, _ = generar_datos.GENERADORES[base]
+        generar_datos.escribir_mongo(ConexionMongo.client[nombre_db], generar(p, generar_datos.aleatorio(p, base)),
+                                     p.batch_size, None)
+    generar_datos.actualizar_rollups(db_supermarket)
+    indexes.inicializar_modelos(db_tareas, db_supermarket)
+    indexes.aplicar_indices()
+    try:
+        ReporteModel.refrescar_reporte_materializado()
+    except OperationFailure as e:
+        print(f"[WARN] No se pudo refrescar la vista materializada: {e}")
+
+
+def correr(escalas, repeticiones, calentamiento, generar, db_tareas, db_supermarket, semilla, solo=None):
+    resultados = {}
+    for escala in escalas:
+        if generar:
+            print(f"\nGenerando escala {escala}...")
+            preparar_escala(int(escala), db_tareas, db_supermarket, semilla)
+        else:
+            indexes.inicializar_modelos(db_tareas, db_supermarket)
+
+        print(f"\nEscala {escala} ({repeticiones} repeticiones, {calentamiento} de calentamiento)")
+        print(f"  {'consulta':<58} {'p50':>9} {'p95':>9} {'p99':>9} {'decode':>9} {'filas':>8} {'docs ex.':>10}")
+        por_consulta = {}
+        for nombre, coleccion, comando in indexes.consultas_registradas():
+            if solo and solo not in nombre:
+                continue
+            r = medir_consulta(coleccion, comando, repeticiones, calentamiento)
+            por_consulta[nombre] = r
+            print(f"  {nombre:<58} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                  f"{r['decode_p50_ms']:>9.2f} {r['filas']:>8} {r.get('docs_examinados', '-'):>10}")
+        resultados[str(escala)] = por_consulta
+    return resultados
+
+
+def comparar(base, actual, umbral):
+    """
+    Compara dos corridas consulta por consulta.
+
+    Returns:
+        list: regresiones encontradas (texto).
+    """
+    regresiones = []
+    for escala, consultas in actual["resultados"].items():
+        for nombre, r in consultas.items():
+            anterior = base.get("resultados", {}).get(escala, {}).get(nombre)
+            if not anterior:
+                continue
+            for metrica in [f"p{p}_ms" for p in PERCENTILES] + ["docs_examinados", "keys_examinadas"]:
+                antes, ahora = anterior.get(metrica), r.get(metrica)
+                if antes is None or ahora is None:
+                    continue
+                # Las latencias necesitan además una diferencia absoluta mínima para no marcar ruido
+                minimo = DIFERENCIA_MINIMA_MS if metrica.endswith("_ms") else 0
+                if ahora > antes * (1 + umbral) and ahora - antes > minimo:
+                    cambio = f"+{(ahora / antes - 1) * 100:.0f}%" if antes else "nuevo"
+                    regresiones.append(f"[{escala}] {nombre} {metrica}: {antes} -> {ahora} ({cambio})")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los pipelines de reportes")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--escalas", default="actual",
+                        help='tamaños separados por coma (p. ej. "1000,10000,100000") o "actual"')
+    parser.add_argument("--generar", action="store_true",
+                        help="generar los datos de cada escala en las bases del benchmark")
+    parser.add_argument("--db-tareas", default=None)
+    parser.add_argument("--db-supermarket", default=None)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--calentamiento", type=int, default=2)
+    parser.add_argument("--solo", help="solo las consultas cuyo nombre contiene este texto")
+    parser.add_argument("--guardar", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="archivo JSON de línea base contra el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="empeoramiento tolerado (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    escalas = [e.strip() for e in args.escalas.split(",") if e.strip()]
+    if args.generar and "actual" in escalas:
+        parser.error('--generar requiere escalas numéricas, no "actual"')
+    # Al generar se usan bases propias para no sobrescribir mi_db / supermarket
+    db_tareas = args.db_tareas or ("bench_mi_db" if args.generar else "mi_db")
+    db_supermarket = args.db_supermarket or ("bench_supermarket" if args.generar else "supermarket")
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        version = ConexionMongo.client.server_info().get("version")
+        resultados = correr(escalas, args.repeticiones, args.calentamiento, args.generar,
+                            db_tareas, db_supermarket, args.semilla, args.solo)
+    finally:
+        ConexionMongo.cerrar()
+
+    corrida = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "mongodb": version,
+        "python": platform.python_version(),
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(corrida, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(base, corrida, args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones (umbral {args.umbral:.0%}):")
+            for regresion in regresiones:
+                print(f"  {regresion}")
+            sys.exit(1)
+        print(f"\nSin regresiones respecto a {args.comparar} (umbral {args.umbral:.0%})")
+
+
+if __name__ == "__main__":
+    main()
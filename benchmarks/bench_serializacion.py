@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización JSON de resultados grandes.
+
+Compara el enfoque anterior (convertir `_id` a str documento por documento y
+serializar con el proveedor por defecto de Flask) contra BSONJSONProvider con
+el backend estándar y con orjson (si está instalado).
+
+Uso:
+    python benchmarks/bench_serializacion.py --documentos 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json_provider  # noqa: E402
+from json_provider import BSONJSONProvider  # noqa: E402
+
+
+def generar_documentos(cantidad, semilla=42):
+    """Documentos con la forma de una venta, con _id ObjectId y fecha datetime."""
+    rnd = random.Random(semilla)
+    inicio = datetime(2025, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "cliente_id": rnd.randint(1, 10000),
+            "fecha": inicio + timedelta(minutes=rnd.randint(0, 525600)),
+            "items": [
+                {"producto_id": rnd.randint(1, 5000), "cantidad": rnd.randint(1, 10)}
+                for _ in range(rnd.randint(1, 6))
+            ],
+            "total": round(rnd.uniform(1000, 500000), 2)
+        }
+        for _ in range(cantidad)
+    ]
+
+
+def medir(nombre, funcion, documentos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        copia = [dict(doc) for doc in documentos]
+        inicio = time.perf_counter()
+        salida = funcion(copia)
+        tiempos.append(time.perf_counter() - inicio)
+    mejor = min(tiempos)
+    print(f"  {nombre:<40} {mejor * 1000:10.1f} ms   {len(salida) / 1e6:8.2f} MB")
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del serializador JSON")
+    parser.add_argument("--documentos", type=int, default=100000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    por_defecto = DefaultJSONProvider(app)
+    bson_provider = BSONJSONProvider(app)
+    documentos = generar_documentos(args.documentos)
+
+    def anterior(docs):
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+        return por_defecto.dumps(docs, separators=(",", ":"))
+
+    def estandar(docs):
+        orjson = json_provider.orjson
+        json_provider.orjson = None
+        try:
+            return bson_provider.dumps(docs, separators=(",", ":"))
+        finally:
+            json_provider.orjson = orjson
+
+    def acelerado(docs):
+        return bson_provider.dumps(docs, separators=(",", ":"))
+
+    print(f"Serializando {args.documentos} documentos (mejor de {args.repeticiones}):")
+    base = medir("anterior (_id a str + json)", anterior, documentos, args.repeticiones)
+    t_estandar = medir("BSONJSONProvider (json)", estandar, documentos, args.repeticiones)
+    print(f"    -> {base / t_estandar:.2f}x")
+    if json_provider.orjson is not None:
+        t_orjson = medir("BSONJSONProvider (orjson)", acelerado, documentos, args.repeticiones)
+        print(f"    -> {base / t_orjson:.2f}x")
+    else:
+        print("  orjson no está instalado: pip install orjson")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Caché en memoria para colecciones pequeñas de referencia (dimensiones):
+estados_tarea, tipo_documento, categorias y proveedores.
+
+Cada dimensión se carga completa con un solo find() y se mantiene en memoria
+hasta que vence su TTL o se invalida explícitamente, de modo que los modelos
+pueden resolver nombre <-> id sin ir a MongoDB en cada petición.
+
+CacheResultados guarda además resultados pequeños de reportes (rankings) por
+conjunto de parámetros, atados a la versión de las colecciones de las que
+dependen.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from proyeccion import proyectar_documento
+
+
+class Dimension:
+    """
+    Copia en memoria de una colección de referencia con mapas id -> documento
+    y nombre -> id.
+    """
+
+    def __init__(self, collection, campo_nombre, ttl=300):
+        self.collection = collection
+        self.campo_nombre = campo_nombre
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cargado_en = None
+        self._por_id = {}
+        self._id_por_nombre = {}
+
+    def _vigente(self):
+        return self._cargado_en is not None and (time.monotonic() - self._cargado_en) < self.ttl
+
+    def _asegurar_cargada(self):
+        if self._vigente():
+            return
+        with self._lock:
+            # Otro hilo pudo recargarla mientras esperábamos el lock
+            if self._vigente():
+                return
+            por_id = {}
+            id_por_nombre = {}
+            for doc in self.collection.find():
+                por_id[doc["_id"]] = doc
+                if self.campo_nombre in doc:
+                    id_por_nombre[doc[self.campo_nombre]] = doc["_id"]
+            self._por_id = por_id
+            self._id_por_nombre = id_por_nombre
+            self._cargado_en = time.monotonic()
+
+    def invalidar(self):
+        """Fuerza la recarga en el siguiente acceso."""
+        with self._lock:
+            self._cargado_en = None
+
+    def todos(self, campos=None):
+        """
+        Retorna copias de todos los documentos (los llamadores pueden modificarlas),
+        opcionalmente proyectadas a `campos`.
+        """
+        self._asegurar_cargada()
+        if campos:
+            return [proyectar_documento(doc, campos) for doc in self._por_id.values()]
+        return [dict(doc) for doc in self._por_id.values()]
+
+    def por_id(self, doc_id):
+        self._asegurar_cargada()
+        doc = self._por_id.get(doc_id)
+        return dict(doc) if doc is not None else None
+
+    def nombre(self, doc_id):
+        self._asegurar_cargada()
+        doc = self._por_id.get(doc_id)
+        return doc.get(self.campo_nombre) if doc is not None else None
+
+    def id_por_nombre(self, nombre):
+        self._asegurar_cargada()
+        return self._id_por_nombre.get(nombre)
+
+    def ids(self):
+        """Lista de todos los _id de la dimensión."""
+        self._asegurar_cargada()
+        return list(self._por_id)
+
+    def ids_por_nombres(self, nombres):
+        """Traduce una lista de nombres a ids, ignorando los que no existen."""
+        self._asegurar_cargada()
+        return [self._id_por_nombre[n] for n in nombres if n in self._id_por_nombre]
+
+    def expresion_nombre(self, campo):
+        """
+        Expresión de agregación ($switch) que traduce el id en `campo` a su nombre.
+        Sustituye un $lookup + $unwind contra esta colección dentro de un pipeline.
+        """
+        self._asegurar_cargada()
+        ramas = [
+            {"case": {"$eq": [campo, doc_id]}, "then": doc[self.campo_nombre]}
+            for doc_id, doc in self._por_id.items()
+            if self.campo_nombre in doc
+        ]
+        if not ramas:
+            return None
+        return {"$switch": {"branches": ramas, "default": None}}
+
+
+class DimensionCache:
+    """
+    Registro compartido de dimensiones. Se inicializa una sola vez desde app.py.
+    """
+    dimensiones = {}
+
+    @staticmethod
+    def init(mongo_tareas, mongo_supermarket, ttl=300):
+        DimensionCache.dimensiones = {
+            "estados_tarea": Dimension(mongo_tareas.db.estados_tarea, "estado_tarea", ttl),
+            "tipo_documento": Dimension(mongo_tareas.db.tipo_documento, "tipo_documento", ttl),
+            "categorias": Dimension(mongo_supermarket.db.categorias, "nombre", ttl),
+            "proveedores": Dimension(mongo_supermarket.db.proveedores, "nombre", ttl),
+        }
+
+    @staticmethod
+    def get(nombre):
+        return DimensionCache.dimensiones[nombre]
+
+    @staticmethod
+    def invalidar(nombre=None):
+        """Invalida una dimensión o, si no se indica, todas."""
+        if nombre is None:
+            for dimension in DimensionCache.dimensiones.values():
+                dimension.invalidar()
+        elif nombre in DimensionCache.dimensiones:
+            DimensionCache.dimensiones[nombre].invalidar()
+
+
+class CacheResultados:
+    """
+    Resultados de reportes por clave (reporte + parámetros normalizados). Cada entrada
+    guarda la versión de sus colecciones (versioning.Versiones.obtener): si cambió, se
+    recalcula. El TTL cubre las escrituras que no pasan por los contadores de versión,
+    y la caché se acota a `max_entradas`, descartando la usada hace más tiempo.
+    """
+    entradas = OrderedDict()
+    max_entradas = 256
+    ttl = 300
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init(max_entradas=256, ttl=300):
+        with CacheResultados._lock:
+            CacheResultados.entradas = OrderedDict()
+            CacheResultados.max_entradas = max_entradas
+            CacheResultados.ttl = ttl
+
+    @staticmethod
+    def obtener(clave, version, calcular):
+        """
+        Retorna el resultado vigente para `clave` o lo calcula con `calcular()` y lo guarda.
+        El resultado se comparte entre peticiones: los llamadores no deben modificarlo.
+        El cálculo corre fuera del lock; dos fallos simultáneos pueden calcularlo dos veces.
+        """
+        with CacheResultados._lock:
+            entrada = CacheResultados.entradas.get(clave)
+            if entrada is not None:
+                version_guardada, guardado_en, resultado = entrada
+                if version_guardada == version and (time.monotonic() - guardado_en) < CacheResultados.ttl:
+                    CacheResultados.entradas.move_to_end(clave)
+                    return resultado
+
+        resultado = calcular()
+        with CacheResultados._lock:
+            CacheResultados.entradas[clave] = (version, time.monotonic(), resultado)
+            CacheResultados.entradas.move_to_end(clave)
+            while len(CacheResultados.entradas) > CacheResultados.max_entradas:
+                CacheResultados.entradas.popitem(last=False)
+        return resultado
+
+    @staticmethod
+    def invalidar():
+        """Descarta todos los resultados guardados."""
+        with CacheResultados._lock:
+            CacheResultados.entradas.clear()
+
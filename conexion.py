@@ -0,0 +1,182 @@
+"""
+Conexión única a MongoDB compartida por las bases de datos de tareas y supermarket.
+
+Un solo MongoClient (y por lo tanto un solo pool de conexiones por servidor)
+entrega los handles de `mi_db` y `supermarket` a todos los modelos. El pool,
+la compresión de red y los timeouts se configuran desde app.config:
+
+    MONGO_URI                           (por defecto mongodb://localhost:27017/)
+    MONGO_DB_TAREAS / MONGO_DB_SUPERMARKET
+    MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE
+    MONGO_WAIT_QUEUE_TIMEOUT_MS
+    MONGO_SERVER_SELECTION_TIMEOUT_MS
+    MONGO_COMPRESSORS                   (p. ej. "zstd,snappy,zlib")
+"""
+import threading
+import time
+
+from pymongo import MongoClient, monitoring
+
+# Módulo de Python que requiere cada compresor de red (zlib viene con Python)
+_MODULOS_COMPRESORES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def compresores_disponibles(solicitados):
+    """Filtra los compresores pedidos a los que tienen su librería instalada."""
+    disponibles = []
+    for compresor in solicitados:
+        modulo = _MODULOS_COMPRESORES.get(compresor)
+        if modulo is None:
+            continue
+        try:
+            __import__(modulo)
+        except ImportError:
+            continue
+        disponibles.append(compresor)
+    return disponibles
+
+
+class EstadisticasPool(monitoring.ConnectionPoolListener):
+    """
+    Listener del pool de PyMongo que lleva contadores para planificar capacidad:
+    conexiones abiertas y en uso, checkouts, fallos y tiempos de espera.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.abiertas = 0
+        self.en_uso = 0
+        self.max_en_uso = 0
+        self.checkouts = 0
+        self.checkouts_fallidos = 0
+        self.espera_total_ms = 0.0
+        self.espera_max_ms = 0.0
+        self.pools_limpiados = 0
+
+    # El checkout ocurre en el hilo que ejecuta la operación: se mide con un reloj por hilo
+    def connection_check_out_started(self, event):
+        self._local.inicio = time.perf_counter()
+
+    def _registrar_espera(self):
+        inicio = getattr(self._local, "inicio", None)
+        if inicio is None:
+            return 0.0
+        self._local.inicio = None
+        return (time.perf_counter() - inicio) * 1000
+
+    def connection_checked_out(self, event):
+        espera = self._registrar_espera()
+        with self._lock:
+            self.checkouts += 1
+            self.en_uso += 1
+            self.max_en_uso = max(self.max_en_uso, self.en_uso)
+            self.espera_total_ms += espera
+            self.espera_max_ms = max(self.espera_max_ms, espera)
+
+    def connection_check_out_failed(self, event):
+        espera = self._registrar_espera()
+        with self._lock:
+            self.checkouts_fallidos += 1
+            self.espera_total_ms += espera
+            self.espera_max_ms = max(self.espera_max_ms, espera)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.en_uso = max(0, self.en_uso - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.abiertas += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.abiertas = max(0, self.abiertas - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_limpiados += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "conexiones_abiertas": self.abiertas,
+                "conexiones_en_uso": self.en_uso,
+                "max_conexiones_en_uso": self.max_en_uso,
+                "checkouts": self.checkouts,
+                "checkouts_fallidos": self.checkouts_fallidos,
+                "espera_promedio_ms": round(self.espera_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "espera_max_ms": round(self.espera_max_ms, 3),
+                "pools_limpiados": self.pools_limpiados
+            }
+
+
+class BaseDatos:
+    """Handle de una base de datos con el atributo `db` que esperan los init() de los modelos."""
+
+    def __init__(self, db):
+        self.db = db
+
+
+class ConexionMongo:
+    """
+    Dueño del MongoClient compartido. Se inicializa una sola vez desde app.py
+    (o desde los scripts de línea de comandos).
+    """
+    client = None
+    estadisticas = None
+    opciones = {}
+
+    @staticmethod
+    def init(config, listeners=()):
+        compresores = compresores_disponibles(
+            [c.strip() for c in config.get("MONGO_COMPRESSORS", "zstd,snappy,zlib").split(",") if c.strip()]
+        )
+        opciones = {
+            "maxPoolSize": config.get("MONGO_MAX_POOL_SIZE", 100),
+            "minPoolSize": config.get("MONGO_MIN_POOL_SIZE", 0),
+            "serverSelectionTimeoutMS": config.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        }
+        if config.get("MONGO_WAIT_QUEUE_TIMEOUT_MS"):
+            opciones["waitQueueTimeoutMS"] = config["MONGO_WAIT_QUEUE_TIMEOUT_MS"]
+        if compresores:
+            opciones["compressors"] = compresores
+
+        ConexionMongo.estadisticas = EstadisticasPool()
+        ConexionMongo.opciones = opciones
+        ConexionMongo.client = MongoClient(
+            config.get("MONGO_URI", "mongodb://localhost:27017/"),
+            event_listeners=[ConexionMongo.estadisticas, *listeners],
+            **opciones
+        )
+        return ConexionMongo.client
+
+    @staticmethod
+    def base_datos(nombre):
+        return BaseDatos(ConexionMongo.client[nombre])
+
+    @staticmethod
+    def estado_pool():
+        """Estadísticas vivas del pool y configuración efectiva."""
+        return {
+            "configuracion": ConexionMongo.opciones,
+            "pool": ConexionMongo.estadisticas.resumen() if ConexionMongo.estadisticas else {}
+        }
+
+    @staticmethod
+    def cerrar():
+        if ConexionMongo.client is not None:
+            ConexionMongo.client.close()
+            ConexionMongo.client = None
@@ -1,5 +1,18 @@
 from flask import Blueprint, request, jsonify
 from models import UserModel, ProyectoModel, TareaModel, ResponsableModel, EstadoTareaModel, ReporteModel
+from streaming import quiere_stream, respuesta_stream
+from versioning import condicional
+from proyeccion import campos_solicitados
+from paginacion import pagina_solicitada
+from explain import describir_pipeline, explain_solicitado
+from exportar import columnas_exportacion, formato_solicitado, respuesta_exportacion
+from optimizador import optimizar, version_servidor
+
+# Colecciones de las que depende el reporte de tareas (para el ETag)
+DEPENDENCIAS_REPORTE_TAREAS = (
+    TareaModel, ProyectoModel, ResponsableModel, EstadoTareaModel,
+    (ReporteModel, ReporteModel.VISTA_MATERIALIZADA)
+)
 
 user_bp = Blueprint("users", __name__)
 reporte_bp = Blueprint("reportes", __name__)
@@ -12,16 +25,26 @@ def create_user():
 
 @user_bp.route("/users", methods=["GET"])
 def get_users():
-    users = UserModel.get_all_users()
-    for u in users:
-        u["_id"] = str(u["_id"])
+    try:
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if pagina is not None:
+        return jsonify(UserModel.get_all_users(campos, pagina=pagina).sobre())
+    if quiere_stream():
+        return respuesta_stream(UserModel.get_all_users(campos, como_cursor=True))
+    users = UserModel.get_all_users(campos)
     return jsonify(users)
 
 @user_bp.route("/users/<user_id>", methods=["GET"])
 def get_user(user_id):
-    user = UserModel.get_user(user_id)
+    try:
+        campos = campos_solicitados()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    user = UserModel.get_user(user_id, campos)
     if user:
-        user["_id"] = str(user["_id"])
         return jsonify(user)
     return jsonify({"error": "Usuario no encontrado"}), 404
 
@@ -43,6 +66,7 @@ def delete_user(user_id):
 
 # Endpoints para reportes
 @reporte_bp.route("/reportes/tareas", methods=["GET"])
+@condicional(*DEPENDENCIAS_REPORTE_TAREAS)
 def get_reporte_tareas():
     """
     Endpoint para obtener el reporte de tareas con todas las especificaciones:
@@ -56,9 +80,23 @@ def get_reporte_tareas():
     
     Parámetros opcionales:
     - filtrar: "pendientes_terminadas" para filtrar solo pendientes y terminadas
+    - modo: "directo" (por defecto) o "materializado" para leer la vista reporte_tareas
+      (si la vista no está al día con sus fuentes se responde en modo directo)
+    - fields: campos a retornar separados por coma
+    - limit, after: página por cursor; total=1 agrega el conteo. En modo materializado se ordena
+      por (nombre_responsable, _id); en modo directo, por el _id de la tarea
+    - explain: "executionStats" (o "queryPlanner", "allPlansExecution") retorna el plan de ejecución
+      de la consulta que se correría, en vez de los datos
+    - format: "csv" o "parquet" descarga el reporte completo como archivo, escrito por lotes
+      (?batch_size=, por defecto 10000 filas)
     """
     try:
         filtrar = request.args.get('filtrar', None)
+        modo = request.args.get('modo', 'directo')
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        explain = explain_solicitado()
+        formato = formato_solicitado()
         
         # Determinar qué estados filtrar
         if filtrar == "pendientes_terminadas":
@@ -66,13 +104,34 @@ def get_reporte_tareas():
         else:
             estados_filtro = None  # Mostrar todas las tareas
         
-        reporte = ReporteModel.generar_reporte_tareas(estados_filtro)
+        filtro_aplicado = "pendientes_terminadas" if estados_filtro else "todas_las_tareas"
+        if explain:
+            plan = ReporteModel.generar_reporte_tareas(estados_filtro, modo=modo, campos=campos, pagina=pagina,
+                                                       explain=explain)
+            return jsonify({"success": True, "filtro_aplicado": filtro_aplicado, "explain": plan}), 200
+        if formato:
+            cursor = ReporteModel.generar_reporte_tareas(estados_filtro, modo=modo, campos=campos, como_cursor=True)
+            columnas = columnas_exportacion(ReporteModel.COLUMNAS_EXPORTACION, campos)
+            return respuesta_exportacion(cursor, columnas, formato, f"reporte-tareas-{filtro_aplicado}")
+        if pagina is not None:
+            resultado = ReporteModel.generar_reporte_tareas(estados_filtro, modo=modo, campos=campos, pagina=pagina)
+            return jsonify(resultado.sobre(filtro_aplicado=filtro_aplicado)), 200
+        if quiere_stream():
+            cursor = ReporteModel.generar_reporte_tareas(estados_filtro, modo=modo, campos=campos, como_cursor=True)
+            return respuesta_stream(cursor, filtro_aplicado=filtro_aplicado)
+
+        reporte = ReporteModel.generar_reporte_tareas(estados_filtro, modo=modo, campos=campos)
         return jsonify({
             "success": True,
-            "filtro_aplicado": "pendientes_terminadas" if estados_filtro else "todas_las_tareas",
+            "filtro_aplicado": filtro_aplicado,
             "total_registros": len(reporte),
             "data": reporte
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -81,23 +140,41 @@ def get_reporte_tareas():
 
 
 @reporte_bp.route("/reportes/tareas/filtro", methods=["GET"])
+@condicional(*DEPENDENCIAS_REPORTE_TAREAS)
 def get_reporte_tareas_filtrado():
     """
-    Endpoint para obtener el reporte de tareas con filtro por estado.
+    Endpoint para obtener el reporte de tareas con filtros.
+    Los filtros se compilan a un $match que se ejecuta antes de los $lookup,
+    así solo se unen las tareas que cumplen el filtro.
     Parámetros de query:
-    - estado: "Pendiente", "Terminada", "Vencida" o "all" para todos
+    - estado: "Pendiente", "Terminada", "Vencida" (o varios separados por coma) o "all" para todos
+    - id_proyecto, id_responsable: id o lista de ids separados por coma
+    - edad_min, edad_max: rango inclusivo de edad del responsable
+    - grupo_etareo: "adulto joven", "adulto medio", "adulto mayor" o "sin clasificar"
+    - modo: "directo" (por defecto) o "materializado"
+    - fields: campos a retornar separados por coma
+    - limit, after, total: página por cursor (ver /reportes/tareas)
+    - explain: plan de ejecución en vez de los datos (ver /reportes/tareas)
     """
     try:
         estado_filtro = request.args.get('estado', 'all')
-        
-        # Obtener todos los datos del reporte
-        reporte_completo = ReporteModel.generar_reporte_tareas()
-        
-        # Aplicar filtro si se especifica
-        if estado_filtro != 'all':
-            reporte_filtrado = [tarea for tarea in reporte_completo if tarea['estado_tarea'] == estado_filtro]
-        else:
-            reporte_filtrado = reporte_completo
+        modo = request.args.get('modo', 'directo')
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        explain = explain_solicitado()
+        match = ReporteModel.compilar_filtro_tareas(request.args)
+        if explain:
+            plan = ReporteModel.generar_reporte_tareas(match=match, modo=modo, campos=campos, pagina=pagina,
+                                                       explain=explain)
+            return jsonify({"success": True, "filtro_aplicado": estado_filtro, "explain": plan}), 200
+        if pagina is not None:
+            resultado = ReporteModel.generar_reporte_tareas(match=match, modo=modo, campos=campos, pagina=pagina)
+            return jsonify(resultado.sobre(filtro_aplicado=estado_filtro)), 200
+        if quiere_stream():
+            cursor = ReporteModel.generar_reporte_tareas(match=match, modo=modo, campos=campos, como_cursor=True)
+            return respuesta_stream(cursor, filtro_aplicado=estado_filtro)
+
+        reporte_filtrado = ReporteModel.generar_reporte_tareas(match=match, modo=modo, campos=campos)
         
         return jsonify({
             "success": True,
@@ -105,6 +182,39 @@ def get_reporte_tareas_filtrado():
             "total_registros": len(reporte_filtrado),
             "data": reporte_filtrado
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@reporte_bp.route("/reportes/tareas/refrescar", methods=["POST"])
+def refrescar_reporte_tareas():
+    """
+    Recalcula la vista materializada reporte_tareas.
+    Body JSON opcional con listas de ids que cambiaron:
+    {"tareas": [...], "responsables": [...], "proyectos": [...], "estados": [...]}
+    Sin body se recalcula la vista completa.
+    """
+    try:
+        cambios = request.get_json(silent=True) or {}
+        eliminados = ReporteModel.refrescar_reporte_materializado(
+            ids_tareas=cambios.get("tareas"),
+            ids_responsables=cambios.get("responsables"),
+            ids_proyectos=cambios.get("proyectos"),
+            ids_estados=cambios.get("estados")
+        )
+        return jsonify({
+            "success": True,
+            "refresco": "incremental" if cambios else "completo",
+            "eliminados": eliminados
+        }), 200
     except Exception as e:
         return jsonify({
             "success": False,
@@ -116,10 +226,16 @@ def get_reporte_tareas_filtrado():
 @reporte_bp.route("/proyectos", methods=["GET"])
 def get_proyectos():
     try:
-        proyectos = ProyectoModel.get_all_proyectos()
-        for p in proyectos:
-            p["_id"] = str(p["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(ProyectoModel.get_all_proyectos(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(ProyectoModel.get_all_proyectos(campos, como_cursor=True))
+        proyectos = ProyectoModel.get_all_proyectos(campos)
         return jsonify(proyectos), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -127,10 +243,16 @@ def get_proyectos():
 @reporte_bp.route("/responsables", methods=["GET"])
 def get_responsables():
     try:
-        responsables = ResponsableModel.get_all_responsables()
-        for r in responsables:
-            r["_id"] = str(r["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(ResponsableModel.get_all_responsables(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(ResponsableModel.get_all_responsables(campos, como_cursor=True))
+        responsables = ResponsableModel.get_all_responsables(campos)
         return jsonify(responsables), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -138,10 +260,16 @@ def get_responsables():
 @reporte_bp.route("/estados-tarea", methods=["GET"])
 def get_estados_tarea():
     try:
-        estados = EstadoTareaModel.get_all_estados()
-        for e in estados:
-            e["_id"] = str(e["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(EstadoTareaModel.get_all_estados(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(EstadoTareaModel.get_all_estados(campos, como_cursor=True))
+        estados = EstadoTareaModel.get_all_estados(campos)
         return jsonify(estados), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -149,105 +277,37 @@ def get_estados_tarea():
 @reporte_bp.route("/pipeline", methods=["GET"])
 def get_pipeline_info():
     """
-    Endpoint para mostrar el pipeline de agregación completo
+    Endpoint para mostrar el pipeline de agregación que ejecuta ReporteModel.
+    Acepta los mismos filtros que /reportes/tareas/filtro y ?fields=; con
+    ?explain=executionStats agrega el plan de ejecución de ese pipeline.
+    `pipeline_optimizado` es lo que realmente se envía a MongoDB (ver optimizador.py).
     """
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "proyectos",
-                "localField": "id_proyecto",
-                "foreignField": "_id",
-                "as": "proyecto"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "responsables",
-                "localField": "id_responsable",
-                "foreignField": "_id",
-                "as": "responsable"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "estados_tarea",
-                "localField": "id_estado_tarea",
-                "foreignField": "_id",
-                "as": "estado"
-            }
-        },
-        {
-            "$unwind": "$proyecto"
-        },
-        {
-            "$unwind": "$responsable"
-        },
-        {
-            "$unwind": "$estado"
-        },
-        {
-            "$addFields": {
-                "grupo_etareo": {
-                    "$cond": {
-                        "if": {
-                            "$and": [
-                                {"$gt": ["$responsable.edad", 17]},
-                                {"$lte": ["$responsable.edad", 30]}
-                            ]
-                        },
-                        "then": "adulto joven",
-                        "else": {
-                            "$cond": {
-                                "if": {
-                                    "$and": [
-                                        {"$gt": ["$responsable.edad", 30]},
-                                        {"$lte": ["$responsable.edad", 50]}
-                                    ]
-                                },
-                                "then": "adulto medio",
-                                "else": {
-                                    "$cond": {
-                                        "if": {"$gt": ["$responsable.edad", 50]},
-                                        "then": "adulto mayor",
-                                        "else": "sin clasificar"
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "nombre_tarea": "$nombre_tarea",
-                "estado_tarea": "$estado.estado_tarea",
-                "nombre_proyecto": "$proyecto.nombre_proyecto",
-                "nombre_responsable": "$responsable.nombre_responsable",
-                "apellido_responsable": "$responsable.apellido_responsable",
-                "edad": "$responsable.edad",
-                "grupo_etareo": "$grupo_etareo"
-            }
-        },
-        {
-            "$sort": {"nombre_responsable": 1}
+    try:
+        campos = campos_solicitados()
+        explain = explain_solicitado()
+        match = ReporteModel.compilar_filtro_tareas(request.args)
+        pipeline = ReporteModel.pipeline_reporte_tareas(match, campos=campos)
+        optimizaciones = []
+        optimizado = optimizar(pipeline, version_servidor(ReporteModel.collection.client), optimizaciones)
+        respuesta = {
+            "message": "Pipeline de agregación para el reporte de tareas",
+            "description": "Este pipeline combina datos de múltiples colecciones y calcula grupos etáreos",
+            "steps": describir_pipeline(pipeline),
+            "pipeline": pipeline,
+            "pipeline_optimizado": optimizado,
+            "optimizaciones": optimizaciones,
+            "usage": "GET /reportes/tareas para ejecutar este pipeline"
         }
-    ]
-    
-    return jsonify({
-        "message": "Pipeline de agregación para el reporte de tareas",
-        "description": "Este pipeline combina datos de múltiples colecciones y calcula grupos etáreos",
-        "steps": [
-            "0. $match (OPCIONAL): Filtra por estado - solo si se especifica filtrar_estados",
-            "1. $lookup: Une tareas con proyectos",
-            "2. $lookup: Une tareas con responsables", 
-            "3. $lookup: Une tareas con estados",
-            "4. $unwind: Aplana los arrays de join",
-            "5. $addFields: Calcula grupo etáreo con $cond (if/else)",
-            "6. $project: Selecciona campos específicos",
-            "7. $sort: Ordena alfabéticamente por responsable"
-        ],
-        "pipeline": pipeline,
-        "usage": "GET /reportes/tareas para ejecutar este pipeline"
-    }), 200
\ No newline at end of file
+        if explain:
+            respuesta["explain"] = ReporteModel.generar_reporte_tareas(match=match, campos=campos, explain=explain)
+        return jsonify(respuesta), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
@@ -0,0 +1,241 @@
+"""
+Modo explain de los reportes: muestra cómo ejecuta MongoDB el pipeline o el
+find() exacto que correría el modelo, sin retornar los datos.
+
+Se activa con `?explain=executionStats` (o `queryPlanner`, `allPlansExecution`;
+`?explain=1` equivale a executionStats) en cualquier endpoint de reportes y
+desde show_pipeline.py. El resumen lista las etapas en orden de ejecución con
+documentos de entrada y salida, tiempo propio, índices usados y, para cada
+$lookup, la estrategia del join:
+
+- motor clásico: IndexedLoopJoin si la colección foránea se recorrió por
+  índice, NestedLoopJoin si hizo un COLLSCAN por documento;
+- motor SBE (explainVersion "2"): la estrategia que reporta la etapa EQ_LOOKUP
+  (IndexedLoopJoin, HashJoin o NestedLoopJoin).
+
+El explain completo de MongoDB se incluye en la clave "explain".
+"""
+from flask import request
+
+from optimizador import comando_aggregate
+
+VERBOSIDADES = ("queryPlanner", "executionStats", "allPlansExecution")
+
+# Claves de los hijos de un nodo del plan (clásico y SBE)
+_HIJOS = ("inputStage", "inputStages", "outerStage", "innerStage", "thenStage", "elseStage")
+
+
+def explain_solicitado():
+    """
+    Lee ?explain= de la petición.
+
+    Returns:
+        str: verbosidad pedida, o None si no se pidió explain.
+    """
+    valor = request.args.get("explain")
+    if not valor:
+        return None
+    if valor.lower() in ("1", "true"):
+        return "executionStats"
+    if valor not in VERBOSIDADES:
+        raise ValueError(f"explain inválido: '{valor}'. Valores permitidos: {', '.join(VERBOSIDADES)}")
+    return valor
+
+
+def describir_pipeline(pipeline):
+    """Una línea por etapa del pipeline (para /pipeline y show_pipeline.py)."""
+    pasos = []
+    for numero, etapa in enumerate(pipeline):
+        nombre, valor = next(iter(etapa.items()))
+        if nombre == "$match":
+            detalle = f"filtra por {', '.join(valor)}"
+        elif nombre == "$lookup":
+            detalle = f"une con {valor.get('from')} ({valor.get('localField')} -> {valor.get('foreignField')})"
+        elif nombre == "$unwind":
+            detalle = f"aplana {valor['path'] if isinstance(valor, dict) else valor}"
+        elif nombre in ("$addFields", "$set"):
+            detalle = f"calcula {', '.join(valor)}"
+        elif nombre == "$project":
+            detalle = f"selecciona {', '.join(campo for campo, v in valor.items() if v != 0)}"
+        elif nombre == "$sort":
+            detalle = "ordena por " + ", ".join(f"{campo} {'asc' if d == 1 else 'desc'}" for campo, d in valor.items())
+        elif nombre == "$group":
+            detalle = f"agrupa por {valor.get('_id')}"
+        elif nombre == "$limit":
+            detalle = f"primeros {valor}"
+        elif nombre == "$merge":
+            detalle = f"escribe en {valor.get('into')}"
+        else:
+            detalle = ""
+        pasos.append(f"{numero}. {nombre}: {detalle}" if detalle else f"{numero}. {nombre}")
+    return pasos
+
+
+def explicar_aggregate(collection, pipeline, verbosidad="executionStats"):
+    """Explain del aggregate que ejecutaría optimizador.ejecutar(collection, pipeline) (ya optimizado)."""
+    return explicar(collection, comando_aggregate(collection, pipeline), verbosidad)
+
+
+def explicar_find(collection, filtro=None, proyeccion=None, orden=None, limite=None, verbosidad="executionStats"):
+    """Explain del find() que ejecutaría `collection.find(filtro, proyeccion).sort(orden).limit(limite)`."""
+    comando = {"find": collection.name, "filter": filtro or {}}
+    if proyeccion:
+        comando["projection"] = proyeccion
+    if orden:
+        comando["sort"] = dict(orden)
+    if limite:
+        comando["limit"] = limite
+    return explicar(collection, comando, verbosidad)
+
+
+def explicar(collection, comando, verbosidad="executionStats"):
+    """
+    Ejecuta explain sobre `comando` y lo resume.
+
+    Returns:
+        dict: comando, resumen por etapa, $lookup, índices, problemas y el explain completo.
+    """
+    explain = collection.database.command("explain", comando, verbosity=verbosidad)
+    return {
+        "verbosidad": verbosidad,
+        "coleccion": f"{collection.database.name}.{collection.name}",
+        "comando": comando,
+        **resumir(explain),
+        "explain": explain
+    }
+
+
+def resumir(explain):
+    """
+    Resumen legible de un explain de find o aggregate.
+
+    Returns:
+        dict: motor, tiempo total, etapas, lookups, índices usados, problemas y contadores.
+    """
+    from indexes import diagnosticar
+
+    sbe = str(explain.get("explainVersion", "1")) == "2"
+    if "stages" in explain:
+        etapas = _etapas_pipeline(explain["stages"], sbe)
+        tiempo_total = etapas[-1].get("tiempo_ms") if etapas else None
+    else:
+        # find() o pipeline ejecutado completo dentro del motor de consultas
+        etapas = [_etapa_consulta("consulta", explain, sbe)]
+        tiempo_total = explain.get("executionStats", {}).get("executionTimeMillis")
+
+    lookups = []
+    indices = []
+    for etapa in etapas:
+        for nodo in [etapa] + etapa.get("plan", []):
+            if nodo.get("estrategia"):
+                lookups.append({clave: nodo[clave] for clave in
+                                ("coleccion_foranea", "estrategia", "indices", "docs_examinados") if clave in nodo})
+            for indice in nodo.get("indices", []):
+                if indice not in indices:
+                    indices.append(indice)
+
+    diagnostico = diagnosticar(explain)
+    return {
+        "motor": "sbe" if sbe else "clasico",
+        "tiempo_total_ms": tiempo_total,
+        "etapas": etapas,
+        "lookups": lookups,
+        "indices_usados": indices,
+        "problemas": diagnostico["problemas"],
+        "estadisticas": diagnostico["estadisticas"]
+    }
+
+
+def _etapas_pipeline(stages, sbe):
+    """Etapas de un explain de aggregate con docs de entrada/salida y tiempo propio."""
+    etapas = []
+    docs_anteriores = None
+    tiempo_anterior = 0
+    for stage in stages:
+        nombre = next((clave for clave in stage if clave.startswith("$")), "?")
+        if nombre == "$cursor":
+            etapa = _etapa_consulta(nombre, stage["$cursor"], sbe)
+            etapa["docs_salida"] = stage.get("nReturned", etapa.get("docs_salida"))
+        else:
+            etapa = {"etapa": nombre, "docs_entrada": docs_anteriores, "docs_salida": stage.get("nReturned")}
+            if nombre == "$lookup":
+                etapa.update(_lookup_clasico(stage))
+
+        # executionTimeMillisEstimate es acumulado: el tiempo propio es la diferencia con la etapa anterior
+        tiempo = stage.get("executionTimeMillisEstimate")
+        if tiempo is not None:
+            etapa["tiempo_ms"] = tiempo
+            etapa["tiempo_propio_ms"] = max(tiempo - tiempo_anterior, 0)
+            tiempo_anterior = tiempo
+        docs_anteriores = etapa.get("docs_salida")
+        etapas.append(etapa)
+    return etapas
+
+
+def _lookup_clasico(stage):
+    """
+    Detalle de un $lookup ejecutado por el motor clásico (una consulta por documento).
+    La estrategia solo se conoce con executionStats: queryPlanner no dice qué índices usó.
+    """
+    detalle = {"coleccion_foranea": stage["$lookup"].get("from")}
+    if "totalDocsExamined" not in stage:
+        return detalle
+    indices = list(stage.get("indexesUsed", []))
+    escaneos = stage.get("collectionScans", 0)
+    detalle.update({
+        "estrategia": "NestedLoopJoin" if escaneos or not indices else "IndexedLoopJoin",
+        "indices": indices,
+        "docs_examinados": stage["totalDocsExamined"],
+        "keys_examinadas": stage.get("totalKeysExamined", 0),
+        "collection_scans": escaneos
+    })
+    return detalle
+
+
+def _etapa_consulta(nombre, explain, sbe):
+    """La parte del explain resuelta por el motor de consultas ($cursor, find o pipeline SBE)."""
+    planificador = explain.get("queryPlanner", {})
+    ejecucion = explain.get("executionStats", {})
+    ganador = planificador.get("winningPlan", {})
+    if sbe:
+        # Los nodos del plan SBE con estadísticas no corresponden a las etapas lógicas:
+        # se usa el plan lógico (incluye EQ_LOOKUP con su estrategia)
+        arbol = ganador.get("queryPlan", ganador)
+    else:
+        arbol = ejecucion.get("executionStages") or ganador
+    plan = list(_nodos_plan(arbol))
+
+    etapa = {
+        "etapa": nombre,
+        "docs_entrada": ejecucion.get("totalDocsExamined"),
+        "docs_salida": ejecucion.get("nReturned"),
+        "keys_examinadas": ejecucion.get("totalKeysExamined"),
+        "indices": [nodo["indices"][0] for nodo in plan
+                    if nodo.get("indices") and nodo["etapa"] in ("IXSCAN", "DISTINCT_SCAN", "COUNT_SCAN")],
+        "plan": plan
+    }
+    if "executionTimeMillis" in ejecucion:
+        etapa["tiempo_ms"] = ejecucion["executionTimeMillis"]
+    return {clave: valor for clave, valor in etapa.items() if valor is not None}
+
+
+def _nodos_plan(nodo):
+    """Nodos de un árbol de plan en orden de ejecución (hijos antes que el padre)."""
+    if not isinstance(nodo, dict) or "stage" not in nodo:
+        return
+    for clave in _HIJOS:
+        hijo = nodo.get(clave)
+        for subnodo in (hijo if isinstance(hijo, list) else [hijo]):
+            yield from _nodos_plan(subnodo)
+
+    resumen = {"etapa": nodo["stage"]}
+    if nodo.get("indexName"):
+        resumen["indices"] = [nodo["indexName"]]
+    if nodo["stage"] == "EQ_LOOKUP":
+        resumen["coleccion_foranea"] = nodo.get("foreignCollection")
+        resumen["estrategia"] = nodo.get("strategy")
+    for origen, destino in (("nReturned", "docs_salida"), ("docsExamined", "docs_examinados"),
+                            ("keysExamined", "keys_examinadas"), ("executionTimeMillisEstimate", "tiempo_ms")):
+        if origen in nodo:
+            resumen[destino] = nodo[origen]
+    yield resumen
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Exportación de reportes a CSV y Parquet, desde la API (?format=csv|parquet) o
+desde la terminal.
+
+El cursor de la agregación se recorre en lotes de tamaño fijo y cada lote se
+escribe y se envía antes de leer el siguiente, así la memoria queda acotada por
+el tamaño del lote y no por el del reporte. Las columnas las declara cada
+modelo con su tipo (texto, entero, decimal, fecha): en Parquet cada lote es un
+row group con columnas tipadas y comprimidas con zstd; en CSV las fechas van en
+ISO 8601 y los nulos como celda vacía.
+
+Parquet requiere pyarrow (opcional: pip install pyarrow); CSV solo usa la
+librería estándar.
+
+Uso:
+    python exportar.py ventas-detallado --formato parquet --salida ventas.parquet
+    python exportar.py ventas-detallado --formato csv --desde 2025-09-01 --hasta 2025-09-30
+    python exportar.py tareas --formato csv --modo materializado --salida tareas.csv
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+
+from flask import Response, jsonify, request, stream_with_context
+
+from conexion import ConexionMongo
+from indexes import inicializar_modelos
+from models import ReporteModel
+from streaming import obtener_batch_size
+from supermarket_models import SupermarketReporteModel
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo se necesita para Parquet
+    pa = pq = None
+
+FORMATOS = ("csv", "parquet")
+TIPOS_MIME = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+# Filas por lote (y por row group de Parquet) si no se indica ?batch_size=
+LOTE_EXPORTACION = 10000
+
+
+def formato_solicitado():
+    """Lee ?format= (csv o parquet). None si se pidió JSON o no se indicó."""
+    formato = request.args.get("format", "").lower()
+    if not formato or formato == "json":
+        return None
+    return validar_formato(formato)
+
+
+def validar_formato(formato):
+    """Valida un formato de exportación; Parquet solo si pyarrow está instalado."""
+    if formato not in FORMATOS:
+        raise ValueError(f"format inválido: '{formato}'. Valores permitidos: json, {', '.join(FORMATOS)}")
+    if formato == "parquet" and pq is None:
+        raise ValueError("El formato parquet requiere pyarrow (pip install pyarrow)")
+    return formato
+
+
+def columnas_exportacion(columnas, campos=None):
+    """Las columnas declaradas por el modelo, reducidas a `campos` (?fields=) si se indicaron."""
+    if not campos:
+        return list(columnas)
+    return [(nombre, tipo) for nombre, tipo in columnas if nombre in campos]
+
+
+def _lotes(cursor, tamano):
+    lote = []
+    try:
+        for doc in cursor:
+            lote.append(doc)
+            if len(lote) >= tamano:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+    finally:
+        if hasattr(cursor, "close"):
+            cursor.close()
+
+
+def _celda_csv(valor):
+    if valor is None:
+        return ""
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return valor
+
+
+def _filas_csv(filas):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(filas)
+    return buffer.getvalue()
+
+
+def generar_csv(cursor, columnas, tamano=LOTE_EXPORTACION):
+    """Genera el CSV como texto, un bloque por lote (el primero con el encabezado)."""
+    nombres = [nombre for nombre, _ in columnas]
+    yield _filas_csv([nombres])
+    for lote in _lotes(cursor, tamano):
+        yield _filas_csv([[_celda_csv(doc.get(nombre)) for nombre in nombres] for doc in lote])
+
+
+def esquema_arrow(columnas):
+    tipos = {
+        "texto": pa.string(),
+        "entero": pa.int64(),
+        "decimal": pa.float64(),
+        # ventas.fecha se guarda como medianoche UTC
+        "fecha": pa.timestamp("ms", tz="UTC")
+    }
+    return pa.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas])
+
+
+class _Sumidero:
+    """Archivo de solo escritura que guarda los bytes hasta que se retiran con vaciar()."""
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos = b"".join(self.partes)
+        self.partes = []
+        return datos
+
+
+def generar_parquet(cursor, columnas, tamano=LOTE_EXPORTACION):
+    """
+    Genera el archivo Parquet por partes: cada lote se convierte en un row group y sus
+    bytes se entregan en cuanto se escriben; el footer (esquema e índices) sale al final.
+    """
+    esquema = esquema_arrow(columnas)
+    sumidero = _Sumidero()
+    with pq.ParquetWriter(pa.PythonFile(sumidero, mode="w"), esquema, compression="zstd") as escritor:
+        for lote in _lotes(cursor, tamano):
+            arreglos = [pa.array([doc.get(campo.name) for doc in lote], type=campo.type) for campo in esquema]
+            escritor.write_batch(pa.RecordBatch.from_arrays(arreglos, schema=esquema))
+            datos = sumidero.vaciar()
+            if datos:
+                yield datos
+    yield sumidero.vaciar()
+
+
+def respuesta_exportacion(cursor, columnas, formato, nombre):
+    """
+    Respuesta HTTP que exporta `cursor` como archivo adjunto `nombre`.csv|parquet.
+    Si el cursor falla a mitad de camino la descarga queda truncada (un Parquet sin
+    footer no se puede abrir), a diferencia de NDJSON no hay línea final de error.
+
+    Args:
+        cursor: Cursor de PyMongo o cualquier iterable de documentos.
+        columnas (list): [(campo, tipo)] a exportar, en orden (ver columnas_exportacion).
+    """
+    try:
+        tamano = obtener_batch_size(LOTE_EXPORTACION)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if hasattr(cursor, "batch_size"):
+        cursor.batch_size(tamano)
+    generar = generar_parquet if formato == "parquet" else generar_csv
+    return Response(
+        stream_with_context(generar(cursor, columnas, tamano)),
+        mimetype=TIPOS_MIME[formato],
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}.{formato}"',
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+class _Contador:
+    """Envuelve un cursor y cuenta los documentos que pasan."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.total = 0
+
+    def __iter__(self):
+        for doc in self.cursor:
+            self.total += 1
+            yield doc
+
+    def close(self):
+        if hasattr(self.cursor, "close"):
+            self.cursor.close()
+
+
+def _cursor_tareas(args):
+    match = ReporteModel.compilar_filtro_tareas({"estado": args.estado}) if args.estado else None
+    return ReporteModel.generar_reporte_tareas(match=match, modo=args.modo, como_cursor=True)
+
+
+# reporte -> (cursor(args), columnas)
+REPORTES = {
+    "tareas": (_cursor_tareas, ReporteModel.COLUMNAS_EXPORTACION),
+    "ventas-detallado": (
+        lambda args: SupermarketReporteModel.generar_reporte_ventas_detallado(
+            como_cursor=True, desde=args.desde, hasta=args.hasta),
+        SupermarketReporteModel.COLUMNAS_DETALLADO
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta un reporte a CSV o Parquet por lotes")
+    parser.add_argument("reporte", choices=list(REPORTES))
+    parser.add_argument("--formato", default="csv", choices=FORMATOS)
+    parser.add_argument("--salida", help="archivo de salida (por defecto <reporte>.<formato>)")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--lote", type=int, default=LOTE_EXPORTACION, help="filas por lote / row group")
+    parser.add_argument("--estado", help="solo tareas: filtro de estado (como /reportes/tareas/filtro)")
+    parser.add_argument("--modo", default="directo", choices=ReporteModel.MODOS, help="solo tareas")
+    parser.add_argument("--desde", help="solo ventas-detallado: fecha inicial AAAA-MM-DD")
+    parser.add_argument("--hasta", help="solo ventas-detallado: fecha final AAAA-MM-DD, inclusiva")
+    args = parser.parse_args()
+    if args.lote < 1:
+        parser.error("--lote debe ser positivo")
+    try:
+        validar_formato(args.formato)
+    except ValueError as e:
+        parser.error(str(e))
+    salida = args.salida or f"{args.reporte}.{args.formato}"
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        inicializar_modelos()
+        obtener_cursor, columnas = REPORTES[args.reporte]
+        try:
+            cursor = _Contador(obtener_cursor(args))
+        except ValueError as e:
+            parser.error(str(e))
+        generar = generar_parquet if args.formato == "parquet" else generar_csv
+        inicio = time.perf_counter()
+        bytes_escritos = 0
+        with open(salida, "wb") as archivo:
+            for parte in generar(cursor, columnas, args.lote):
+                datos = parte.encode("utf-8") if isinstance(parte, str) else parte
+                archivo.write(datos)
+                bytes_escritos += len(datos)
+        segundos = time.perf_counter() - inicio
+        print(f"[OK] {cursor.total} filas, {bytes_escritos} bytes en {round(segundos, 3)}s -> {salida}")
+    finally:
+        ConexionMongo.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Generador determinista de datos sintéticos para pruebas de escala de ambos esquemas.
+
+Produce tareas/responsables/proyectos/estados_tarea/tipo_documento y
+ventas/productos/clientes/categorias/proveedores con integridad referencial
+(todo id_* y *_id apunta a un documento existente) y con las mismas columnas
+y tipos que declaran los convertidores de importar.py. La misma semilla y los
+mismos parámetros generan siempre los mismos datos. Los items de cada venta
+llevan la copia del producto (precio_unitario, categoria_id, nombre) como los
+que registra la API.
+
+Sesgos configurables:
+- popularidad de productos, clientes y responsables con distribución Zipf
+  (exponente 0 = uniforme);
+- items por venta con distribución geométrica de media --items-media,
+  truncada en --items-max.
+
+Salida: CSV en <salida>/BD Tareas y <salida>/BD Supermarket (importables con
+`importar.py --directorio-tareas ... --directorio-supermarket ...`) o
+directamente en MongoDB con --uri.
+
+Uso:
+    python import/generar_datos.py --tareas 100000 --ventas 1000000 --salida /tmp/escala
+    python import/generar_datos.py --ventas 10000000 --zipf-productos 1.2 --uri mongodb://localhost:27017/
+"""
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as hora, timedelta
+
+from importar import (
+    BASES, BATCH_SIZE_POR_DEFECTO, COLECCIONES_SUPERMARKET, COLECCIONES_TAREAS,
+    actualizar_rollups, crear_indices, insertar_en_lotes, write_concern_desde
+)
+from conexion import ConexionMongo
+from versioning import Versiones
+
+ESTADOS_TAREA = ["Pendiente", "Terminada", "Vencida"]
+TIPOS_DOCUMENTO = ["CC", "TI", "CE", "PAS"]
+CATEGORIAS = [
+    ("Lácteos", "Productos derivados de la leche"),
+    ("Granos", "Arroz, fríjoles, lentejas y otros granos básicos"),
+    ("Frutas", "Frutas frescas nacionales e importadas"),
+    ("Verduras", "Hortalizas y verduras frescas"),
+    ("Carnes", "Res, cerdo y pollo"),
+    ("Panadería", "Pan y productos horneados"),
+    ("Bebidas", "Jugos, gaseosas y agua"),
+    ("Aseo", "Productos de limpieza del hogar"),
+    ("Cuidado personal", "Higiene y cuidado personal"),
+    ("Snacks", "Pasabocas y dulces"),
+]
+NOMBRES = ["Ana", "Andrés", "Angie", "Belinda", "Camilo", "Carlos", "Daniela", "Diego", "Elena", "Felipe",
+           "Gloria", "Hernán", "Isabel", "Jorge", "Juan", "Laura", "Luis", "María", "Natalia", "Óscar",
+           "Paula", "Ricardo", "Sandra", "Sofía", "Tomás", "Valentina"]
+APELLIDOS = ["Aragón", "Brito", "Castro", "Díaz", "Espinosa", "Gómez", "Herrera", "López", "Martínez",
+             "Moreno", "Pérez", "Ramírez", "Rodríguez", "Sánchez", "Tabares", "Torres", "Vargas"]
+PROFESIONES = ["Ingeniero", "Geólogo", "Tester", "Arquitecto", "Topógrafo", "Analista"]
+CARGOS = ["Colaborador", "Líder", "Coordinador"]
+CIUDADES = ["Bogotá", "Medellín", "Cali", "Barranquilla", "Mocoa", "Pasto"]
+DOMINIOS = ["gmail.com", "hotmail.com", "yahoo.com"]
+
+FECHA_BASE = date(2023, 1, 1)
+
+
+class Zipf:
+    """
+    Muestreo de ids con probabilidad proporcional a 1 / rango^s. Los rangos se
+    asignan a los ids con una permutación de la semilla, así los más populares
+    no son siempre los de id bajo.
+    """
+
+    def __init__(self, ids, exponente, rnd):
+        self.ids = list(ids)
+        rnd.shuffle(self.ids)
+        pesos = (1.0 / (rango ** exponente) for rango in range(1, len(self.ids) + 1))
+        self.acumulados = list(itertools.accumulate(pesos))
+        self.total = self.acumulados[-1]
+
+    def muestra(self, rnd):
+        return self.ids[bisect.bisect_left(self.acumulados, rnd.random() * self.total)]
+
+
+def _items_por_venta(rnd, media, maximo):
+    """Geométrica con media `media` (>= 1) truncada en `maximo`."""
+    if media <= 1:
+        return 1
+    p = 1.0 / media
+    return min(maximo, 1 + int(math.log(1.0 - rnd.random()) / math.log(1.0 - p)))
+
+
+def _persona(rnd):
+    return rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+
+
+def _correo(nombre, apellido, numero, rnd):
+    return f"{nombre.lower()}.{apellido.lower()}{numero}@{rnd.choice(DOMINIOS)}"
+
+
+def _iso(fecha):
+    return f"{fecha.isoformat()}T00:00:00.000Z"
+
+
+def generar_tareas(p, rnd):
+    """Genera (colección, iterable de documentos) de la base de tareas."""
+    yield "proyectos", (
+        {
+            "_id": i,
+            "nombre_proyecto": f"Proyecto {i} en {rnd.choice(CIUDADES)}",
+            "fecha_inicio": _iso(inicio := FECHA_BASE + timedelta(days=rnd.randint(0, 700))),
+            "fecha_fin": _iso(inicio + timedelta(days=rnd.randint(30, 400))),
+            "descripcion_proyecto": f"Descripción del proyecto {i}",
+            "costo": rnd.randint(10000, 99999)
+        }
+        for i in range(1, p.proyectos + 1)
+    )
+
+    def responsables():
+        for i in range(1, p.responsables + 1):
+            nombre, apellido = _persona(rnd)
+            yield {
+                "_id": i,
+                "documento": str(rnd.randint(10_000_000, 99_999_999)),
+                "tipo_documento": rnd.randint(1, len(TIPOS_DOCUMENTO)),
+                "nombre_responsable": nombre,
+                "apellido_responsable": apellido,
+                # Una pequeña fracción queda en "sin clasificar" (17 años o menos)
+                "edad": rnd.randint(16, 70),
+                "celular": f"+57{rnd.randint(3000000000, 3999999999)}",
+                "correo": _correo(nombre, apellido, i, rnd),
+                "profesion": rnd.choice(PROFESIONES),
+                "cargo": rnd.choice(CARGOS)
+            }
+    yield "responsables", responsables()
+
+    yield "estados_tarea", ({"_id": i, "estado_tarea": e} for i, e in enumerate(ESTADOS_TAREA, start=1))
+    yield "tipo_documento", ({"_id": i, "tipo_documento": t} for i, t in enumerate(TIPOS_DOCUMENTO, start=1))
+
+    def tareas():
+        popularidad = Zipf(range(1, p.responsables + 1), p.zipf_responsables, rnd)
+        for i in range(1, p.tareas + 1):
+            inicio = FECHA_BASE + timedelta(days=rnd.randint(0, 900))
+            estado = rnd.randint(1, len(ESTADOS_TAREA))
+            yield {
+                "_id": i,
+                "nombre_tarea": f"Tarea {i}",
+                "fecha_inicio": inicio.isoformat(),
+                "fecha_fin": (inicio + timedelta(days=rnd.randint(1, 60))).isoformat(),
+                "id_proyecto": rnd.randint(1, p.proyectos),
+                "id_responsable": popularidad.muestra(rnd),
+                "id_estado_tarea": estado,
+                # Solo las tareas terminadas tienen tiempo de ejecución
+                "tiempo_ejecucion": round(rnd.uniform(1, 200), 1) if estado == 2 else None
+            }
+    yield "tareas", tareas()
+
+
+def generar_supermarket(p, rnd):
+    """Genera (colección, iterable de documentos) de la base supermarket."""
+    categorias = CATEGORIAS[:p.categorias] + [
+        (f"Categoría {i}", f"Descripción de la categoría {i}") for i in range(len(CATEGORIAS) + 1, p.categorias + 1)
+    ]
+    yield "categorias", (
+        {"_id": i, "nombre": nombre, "descripcion": descripcion}
+        for i, (nombre, descripcion) in enumerate(categorias, start=1)
+    )
+    yield "proveedores", (
+        {
+            "_id": i,
+            "nombre": f"Proveedor {i}",
+            "telefono": str(rnd.randint(3000000000, 3999999999)),
+            "direccion": f"Cra {rnd.randint(1, 120)} #{rnd.randint(1, 99)}-{rnd.randint(1, 99)} {rnd.choice(CIUDADES)}"
+        }
+        for i in range(1, p.proveedores + 1)
+    )
+
+    def clientes():
+        for i in range(1, p.clientes + 1):
+            nombre, apellido = _persona(rnd)
+            yield {
+                "_id": i,
+                "nombre": f"{nombre} {apellido}",
+                "email": _correo(nombre, apellido, i, rnd),
+                "telefono": str(rnd.randint(3000000000, 3999999999))
+            }
+    yield "clientes", clientes()
+
+    # Precio y categoría se copian en los items de cada venta (y el precio da el total)
+    precios = [0] * (p.productos + 1)
+    categorias_producto = [0] * (p.productos + 1)
+
+    def productos():
+        for i in range(1, p.productos + 1):
+            precios[i] = rnd.randint(5, 400) * 100
+            categorias_producto[i] = rnd.randint(1, p.categorias)
+            yield {
+                "_id": i,
+                "nombre": f"Producto {i}",
+                "categoria_id": categorias_producto[i],
+                "precio": float(precios[i]),
+                "stock": rnd.randint(0, 500),
+                "proveedor_id": rnd.randint(1, p.proveedores)
+            }
+    yield "productos", productos()
+
+    def ventas():
+        populares = Zipf(range(1, p.productos + 1), p.zipf_productos, rnd)
+        compradores = Zipf(range(1, p.clientes + 1), p.zipf_clientes, rnd)
+        dias = max(p.dias, 1)
+        for i in range(1, p.ventas + 1):
+            items = {}
+            for _ in range(_items_por_venta(rnd, p.items_media, p.items_max)):
+                producto = populares.muestra(rnd)
+                items[producto] = items.get(producto, 0) + rnd.randint(1, 5)
+            lista = [
+                {"producto_id": producto, "cantidad": cantidad, "precio_unitario": float(precios[producto]),
+                 "categoria_id": categorias_producto[producto], "nombre": f"Producto {producto}"}
+                for producto, cantidad in items.items()
+            ]
+            yield {
+                "_id": i,
+                "cliente_id": compradores.muestra(rnd),
+                "fecha": datetime.combine(FECHA_BASE + timedelta(days=rnd.randrange(dias)), hora()),
+                "items": lista,
+                "total": float(sum(precios[item["producto_id"]] * item["cantidad"] for item in lista))
+            }
+    yield "ventas", ventas()
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False, separators=(",", ":"))
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, datetime):
+        # Las fechas de ventas son días completos: mismo formato que ventas.csv
+        return valor.date().isoformat()
+    return valor
+
+
+def escribir_csv(directorio, colecciones, generadas):
+    """Escribe cada colección generada en su archivo CSV (mismos nombres que BD Tareas/BD Supermarket)."""
+    os.makedirs(directorio, exist_ok=True)
+    archivos = {nombre: (archivo, [c for c, _ in columnas]) for nombre, archivo, columnas in colecciones}
+    for nombre, documentos in generadas:
+        archivo, columnas = archivos[nombre]
+        inicio = time.perf_counter()
+        filas = 0
+        with open(os.path.join(directorio, archivo), "w", encoding="utf-8", newline="") as salida:
+            escritor = csv.writer(salida)
+            escritor.writerow(columnas)
+            for doc in documentos:
+                escritor.writerow([_valor_csv(doc[c]) for c in columnas])
+                filas += 1
+        print(f"[OK] {filas} {nombre} -> {archivo} en {round(time.perf_counter() - inicio, 3)}s")
+
+
+def escribir_mongo(db, generadas, batch_size, write_concern):
+    """Reemplaza cada colección con los documentos generados, en lotes."""
+    for nombre, documentos in generadas:
+        collection = db.get_collection(nombre, write_concern=write_concern)
+        collection.drop()
+        inicio = time.perf_counter()
+        insertados, errores = insertar_en_lotes(collection, documentos, batch_size)
+        Versiones.incrementar(collection)
+        segundos = time.perf_counter() - inicio
+        velocidad = round(insertados / segundos) if segundos > 0 else insertados
+        print(f"[OK] {insertados} {nombre} en {round(segundos, 3)}s ({velocidad} filas/s)"
+              + (f", {errores} rechazadas" if errores else ""))
+
+
+def completar_parametros(p):
+    """Deriva las cardinalidades que no se indicaron a partir de --tareas y --ventas."""
+    p.responsables = p.responsables or max(15, p.tareas // 20)
+    p.proyectos = p.proyectos or max(10, p.tareas // 100)
+    p.clientes = p.clientes or max(30, p.ventas // 10)
+    p.productos = p.productos or max(30, min(p.ventas // 20, 100_000))
+    p.proveedores = p.proveedores or max(10, p.productos // 50)
+    p.categorias = p.categorias or len(CATEGORIAS)
+    return p
+
+
+GENERADORES = {
+    "tareas": (generar_tareas, COLECCIONES_TAREAS, "BD Tareas"),
+    "supermarket": (generar_supermarket, COLECCIONES_SUPERMARKET, "BD Supermarket"),
+}
+
+
+def aleatorio(p, base):
+    """Una semilla derivada por base: generar una sola base da los mismos datos que generar ambas."""
+    return random.Random(f"{p.semilla}:{base}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos de Tareas y Supermarket a escala")
+    parser.add_argument("bases", nargs="*", help=f"{' y/o '.join(BASES)} (por defecto todas)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--tareas", type=int, default=1000)
+    parser.add_argument("--ventas", type=int, default=1000)
+    parser.add_argument("--responsables", type=int)
+    parser.add_argument("--proyectos", type=int)
+    parser.add_argument("--clientes", type=int)
+    parser.add_argument("--productos", type=int)
+    parser.add_argument("--proveedores", type=int)
+    parser.add_argument("--categorias", type=int)
+    parser.add_argument("--dias", type=int, default=730, help="rango de fechas de las ventas")
+    parser.add_argument("--zipf-productos", type=float, default=1.1)
+    parser.add_argument("--zipf-clientes", type=float, default=0.8)
+    parser.add_argument("--zipf-responsables", type=float, default=0.5)
+    parser.add_argument("--items-media", type=float, default=3.0)
+    parser.add_argument("--items-max", type=int, default=20)
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--salida", help="directorio donde escribir 'BD Tareas' y 'BD Supermarket'")
+    destino.add_argument("--uri", help="escribir directamente en MongoDB")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE_POR_DEFECTO)
+    parser.add_argument("--w", default="1")
+    parser.add_argument("--sin-indices", action="store_true")
+    return parser
+
+
+def parametros(**cambios):
+    """Parámetros con los valores por defecto de la línea de comandos (para uso desde otros scripts)."""
+    p = crear_parser().parse_args(["--uri", ""])
+    for nombre, valor in cambios.items():
+        setattr(p, nombre, valor)
+    return completar_parametros(p)
+
+
+def main():
+    parser = crear_parser()
+    p = completar_parametros(parser.parse_args())
+
+    desconocidas = [b for b in p.bases if b not in BASES]
+    if desconocidas:
+        parser.error(f"bases desconocidas: {', '.join(desconocidas)}")
+
+    bases = p.bases or list(BASES)
+    if p.uri:
+        ConexionMongo.init({"MONGO_URI": p.uri})
+    try:
+        for base in bases:
+            generar, colecciones, carpeta = GENERADORES[base]
+            rnd = aleatorio(p, base)
+            print(f"\nGenerando {base}...")
+            if p.uri:
+                escribir_mongo(ConexionMongo.client[BASES[base][0]], generar(p, rnd), p.batch_size,
+                               write_concern_desde(p.w))
+                if base == "supermarket":
+                    actualizar_rollups(BASES[base][0])
+            else:
+                escribir_csv(os.path.join(p.salida, carpeta), colecciones, generar(p, rnd))
+        if p.uri and not p.sin_indices:
+            crear_indices(bases)
+    finally:
+        if p.uri:
+            ConexionMongo.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
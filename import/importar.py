@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Importador unificado de los CSV de Tareas y Supermarket a MongoDB.
+
+Cada CSV se lee en streaming (nunca se carga completo en memoria), cada fila
+pasa por un convertidor tipado según las columnas declaradas para su colección
+y los documentos se envían en lotes con insert_many(ordered=False), de modo que
+la carga queda limitada por el disco y la red y no por la latencia de una ida
+y vuelta por documento. Los índices de los modelos se crean al final, sobre
+las colecciones ya cargadas.
+
+Uso:
+    python import/importar.py                          # ambas bases de datos
+    python import/importar.py supermarket --batch-size 5000
+    python import/importar.py tareas --w majority --j
+    python import/importar.py --delta                  # solo filas nuevas, cambiadas o eliminadas
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from conexion import ConexionMongo  # noqa: E402
+from versioning import Versiones  # noqa: E402
+
+BATCH_SIZE_POR_DEFECTO = 1000
+
+# Clave donde csv.DictReader deja los valores sobrantes de una fila
+_RESTO = "__resto__"
+
+
+# Convertidores de columna
+def entero(valor):
+    return int(valor)
+
+
+def decimal(valor):
+    return float(valor)
+
+
+def decimal_opcional(valor):
+    return float(valor) if valor else None
+
+
+def texto(valor):
+    return valor
+
+
+def lista_json(valor):
+    return json.loads(valor)
+
+
+def fecha_dia(valor):
+    """AAAA-MM-DD -> datetime a medianoche (fecha BSON, ordenable y con rangos por índice)."""
+    return datetime.strptime(valor, "%Y-%m-%d")
+
+
+# (colección, archivo CSV, [(columna, convertidor)]) en orden de importación
+COLECCIONES_TAREAS = [
+    ("proyectos", "proyecto.csv", [
+        ("_id", entero), ("nombre_proyecto", texto), ("fecha_inicio", texto),
+        ("fecha_fin", texto), ("descripcion_proyecto", texto), ("costo", entero)
+    ]),
+    ("responsables", "responsable.csv", [
+        ("_id", entero), ("documento", texto), ("tipo_documento", entero),
+        ("nombre_responsable", texto), ("apellido_responsable", texto), ("edad", entero),
+        ("celular", texto), ("correo", texto), ("profesion", texto), ("cargo", texto)
+    ]),
+    ("estados_tarea", "estado_tarea.csv", [
+        ("_id", entero), ("estado_tarea", texto)
+    ]),
+    ("tipo_documento", "tipo_documento.csv", [
+        ("_id", entero), ("tipo_documento", texto)
+    ]),
+    ("tareas", "tarea.csv", [
+        ("_id", entero), ("nombre_tarea", texto), ("fecha_inicio", texto), ("fecha_fin", texto),
+        ("id_proyecto", entero), ("id_responsable", entero), ("id_estado_tarea", entero),
+        ("tiempo_ejecucion", decimal_opcional)
+    ]),
+]
+
+COLECCIONES_SUPERMARKET = [
+    ("categorias", "categorias.csv", [
+        ("_id", entero), ("nombre", texto), ("descripcion", texto)
+    ]),
+    ("proveedores", "proveedores.csv", [
+        ("_id", entero), ("nombre", texto), ("telefono", texto), ("direccion", texto)
+    ]),
+    ("clientes", "clientes.csv", [
+        ("_id", entero), ("nombre", texto), ("email", texto), ("telefono", texto)
+    ]),
+    ("productos", "productos.csv", [
+        ("_id", entero), ("nombre", texto), ("categoria_id", entero), ("precio", decimal),
+        ("stock", entero), ("proveedor_id", entero)
+    ]),
+    ("ventas", "ventas.csv", [
+        ("_id", entero), ("cliente_id", entero), ("fecha", fecha_dia), ("items", lista_json), ("total", decimal)
+    ]),
+]
+
+# base -> (nombre de la base de datos, directorio por defecto, colecciones)
+BASES = {
+    "tareas": ("mi_db", os.path.join(RAIZ, "BD Tareas"), COLECCIONES_TAREAS),
+    "supermarket": ("supermarket", os.path.join(RAIZ, "BD Supermarket"), COLECCIONES_SUPERMARKET),
+}
+
+
+def convertir_fila(fila, columnas):
+    """
+    Documento tipado a partir de una fila de csv.DictReader. Si la fila trae más
+    valores que columnas (una coma sin comillas en el texto final, como en
+    categorias.csv), los sobrantes se devuelven a la última columna.
+    """
+    resto = fila.pop(_RESTO, None)
+    if resto:
+        ultima = columnas[-1][0]
+        fila[ultima] = ",".join([fila[ultima]] + resto)
+    return {campo: convertir(fila[campo]) for campo, convertir in columnas}
+
+
+def leer_documentos(ruta, columnas):
+    """Genera los documentos de un CSV uno a uno."""
+    # newline="" para que los campos entre comillas con saltos de línea se lean completos
+    with open(ruta, "r", encoding="utf-8", newline="") as archivo:
+        for numero, fila in enumerate(csv.DictReader(archivo, restkey=_RESTO), start=2):
+            try:
+                yield convertir_fila(fila, columnas)
+            except (ValueError, TypeError, KeyError) as e:
+                raise ValueError(f"{os.path.basename(ruta)}, línea {numero}: {e}")
+
+
+def _insertar_lote(collection, lote):
+    """Inserta un lote sin orden; retorna (insertados, errores)."""
+    try:
+        return len(collection.insert_many(lote, ordered=False).inserted_ids), 0
+    except BulkWriteError as e:
+        return e.details.get("nInserted", 0), len(e.details.get("writeErrors", []))
+
+
+def insertar_en_lotes(collection, documentos, batch_size=BATCH_SIZE_POR_DEFECTO):
+    """
+    Envía `documentos` (cualquier iterable) en lotes de `batch_size`.
+
+    Returns:
+        tuple: (documentos insertados, documentos rechazados)
+    """
+    insertados = errores = 0
+    lote = []
+    for doc in documentos:
+        lote.append(doc)
+        if len(lote) >= batch_size:
+            i, e = _insertar_lote(collection, lote)
+            insertados, errores, lote = insertados + i, errores + e, []
+    if lote:
+        i, e = _insertar_lote(collection, lote)
+        insertados, errores = insertados + i, errores + e
+    return insertados, errores
+
+
+def importar_coleccion(db, nombre, ruta, columnas, batch_size=BATCH_SIZE_POR_DEFECTO, write_concern=None):
+    """
+    Reemplaza el contenido de una colección con el de su CSV.
+
+    Returns:
+        dict: filas insertadas, rechazadas, segundos y filas por segundo.
+    """
+    collection = db.get_collection(nombre, write_concern=write_concern)
+    collection.drop()
+    inicio = time.perf_counter()
+    insertados, errores = insertar_en_lotes(collection, leer_documentos(ruta, columnas), batch_size)
+    segundos = time.perf_counter() - inicio
+    # Los ETag y las dimensiones en caché de la API dependen de esta colección
+    Versiones.incrementar(collection)
+    return {
+        "coleccion": nombre,
+        "filas": insertados,
+        "errores": errores,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(insertados / segundos) if segundos > 0 else insertados
+    }
+
+
+def importar_base(db, directorio, colecciones, batch_size=BATCH_SIZE_POR_DEFECTO, write_concern=None):
+    """Importa las colecciones de una base de datos e imprime el avance de cada una."""
+    resultados = []
+    for nombre, archivo, columnas in colecciones:
+        print(f"Importando {nombre}...")
+        resultado = importar_coleccion(db, nombre, os.path.join(directorio, archivo), columnas,
+                                       batch_size, write_concern)
+        estado = "[OK]" if not resultado["errores"] else f"[{resultado['errores']} rechazadas]"
+        print(f"{estado} {resultado['filas']} {nombre} en {resultado['segundos']}s "
+              f"({resultado['filas_por_segundo']} filas/s)")
+        resultados.append(resultado)
+    return resultados
+
+
+def crear_indices(bases):
+    """Crea los índices declarados en los modelos una vez cargados los datos."""
+    import indexes
+    indexes.inicializar_modelos(BASES["tareas"][0], BASES["supermarket"][0])
+    modelos = []
+    if "tareas" in bases:
+        modelos += indexes.MODELOS_TAREAS
+    if "supermarket" in bases:
+        modelos += indexes.MODELOS_SUPERMARKET
+    return indexes.aplicar_indices(modelos)
+
+
+def completar_items_ventas(nombre_db=None, ids=None, batch_size=BATCH_SIZE_POR_DEFECTO):
+    """
+    Copia precio, categoría y nombre del producto en los items de las ventas
+    cargadas desde ventas.csv (que solo trae producto_id y cantidad). Con `ids`
+    solo revisa esas ventas (importación delta); si no, todas las que falten.
+    """
+    from supermarket_models import VentaModel
+    supermarket = ConexionMongo.base_datos(nombre_db or BASES["supermarket"][0])
+    VentaModel.init(supermarket)
+    inicio = time.perf_counter()
+    if ids is None:
+        completadas = VentaModel.completar_items()
+    else:
+        completadas = sum(VentaModel.completar_items({"_id": {"$in": ids[desde:desde + batch_size]}})
+                          for desde in range(0, len(ids), batch_size))
+    print(f"[OK] items de {completadas} ventas con copia del producto en {round(time.perf_counter() - inicio, 3)}s")
+
+
+def actualizar_rollups(nombre_db=None, fechas=None, clientes=None):
+    """
+    Pone al día los rollups de ventas_diarias y los resúmenes de clientes_stats después
+    de cargar ventas: completos (importación completa) o solo los días y clientes
+    indicados (importación delta).
+    """
+    from supermarket_models import VentaDiariaModel, ClienteStatsModel
+    supermarket = ConexionMongo.base_datos(nombre_db or BASES["supermarket"][0])
+    VentaDiariaModel.init(supermarket)
+    ClienteStatsModel.init(supermarket)
+    inicio = time.perf_counter()
+    if fechas is None:
+        VentaDiariaModel.reconstruir()
+        print(f"[OK] rollups de ventas_diarias reconstruidos en {round(time.perf_counter() - inicio, 3)}s")
+    elif fechas:
+        dias = VentaDiariaModel.recalcular_fechas(fechas)
+        print(f"[OK] rollups de ventas_diarias: {dias} días recalculados en {round(time.perf_counter() - inicio, 3)}s")
+    inicio = time.perf_counter()
+    if clientes is None:
+        ClienteStatsModel.reconstruir()
+        print(f"[OK] clientes_stats reconstruido en {round(time.perf_counter() - inicio, 3)}s")
+    elif clientes:
+        recalculados = ClienteStatsModel.recalcular_clientes(clientes)
+        print(f"[OK] clientes_stats: {recalculados} clientes recalculados en {round(time.perf_counter() - inicio, 3)}s")
+
+
+def actualizar_reporte_tareas(nombre_db=None, cambios=None):
+    """
+    Pone al día la vista materializada reporte_tareas después de cargar mi_db: completa
+    con $merge (importación completa) o solo las tareas afectadas por los ids de
+    `cambios` ({colección: ids}, importación delta).
+    """
+    import indexes
+    from models import ReporteModel
+    indexes.inicializar_modelos(nombre_db or BASES["tareas"][0], BASES["supermarket"][0])
+    inicio = time.perf_counter()
+    if cambios is None:
+        ReporteModel.refrescar_reporte_materializado()
+        print(f"[OK] vista reporte_tareas reconstruida en {round(time.perf_counter() - inicio, 3)}s")
+    elif any(cambios.values()):
+        eliminados = ReporteModel.refrescar_reporte_materializado(
+            ids_tareas=list(cambios.get("tareas", ())),
+            ids_responsables=list(cambios.get("responsables", ())),
+            ids_proyectos=list(cambios.get("proyectos", ())),
+            ids_estados=list(cambios.get("estados_tarea", ()))
+        )
+        print(f"[OK] vista reporte_tareas: {sum(map(len, cambios.values()))} ids refrescados, "
+              f"{eliminados} filas eliminadas en {round(time.perf_counter() - inicio, 3)}s")
+
+
+class IdsAfectados:
+    """Observador de la importación delta: junta los _id reemplazados o eliminados de una colección."""
+
+    def __init__(self):
+        self.ids = set()
+
+    def __call__(self, ids):
+        self.ids.update(ids)
+
+
+# Colecciones de mi_db de las que se arma la vista reporte_tareas
+COLECCIONES_REPORTE_TAREAS = ("tareas", "responsables", "proyectos", "estados_tarea")
+
+
+class FechasAfectadas:
+    """
+    Observador de la importación delta de ventas: junta la fecha y el cliente
+    anteriores de cada venta antes de reemplazarla o eliminarla y, al final, los nuevos.
+    """
+
+    def __init__(self, collection, batch_size=BATCH_SIZE_POR_DEFECTO):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.ids = []
+        self.fechas = set()
+        self.clientes = set()
+
+    def _leer(self, ids):
+        for d in self.collection.find({"_id": {"$in": ids}}, {"fecha": 1, "cliente_id": 1}):
+            if "fecha" in d:
+                self.fechas.add(d["fecha"])
+            if "cliente_id" in d:
+                self.clientes.add(d["cliente_id"])
+
+    def __call__(self, ids):
+        self.ids.extend(ids)
+        self._leer(ids)
+
+    def todas(self):
+        for inicio in range(0, len(self.ids), self.batch_size):
+            self._leer(self.ids[inicio:inicio + self.batch_size])
+        return self.fechas
+
+
+def write_concern_desde(w, j=False):
+    """WriteConcern a partir de --w ("1", "0", "majority"...) y --j."""
+    return WriteConcern(w=int(w) if str(w).isdigit() else w, j=True if j else None)
+
+
+def importar(bases=("tareas", "supermarket"), uri="mongodb://localhost:27017/", batch_size=BATCH_SIZE_POR_DEFECTO,
+             w=1, j=False, directorios=None, indices=True, delta=False):
+    """
+    Punto de entrada reutilizable (lo usan import_data.py e import_supermarket.py).
+
+    Args:
+        bases: "tareas" y/o "supermarket".
+        directorios (dict): directorio de CSV por base; por defecto BD Tareas / BD Supermarket.
+        indices (bool): crear los índices de los modelos al terminar.
+        delta (bool): aplicar solo las diferencias contra el manifiesto de la corrida
+            anterior en lugar de vaciar y recargar (ver importar_delta.py).
+    """
+    directorios = directorios or {}
+    write_concern = write_concern_desde(w, j)
+    ConexionMongo.init({"MONGO_URI": uri})
+    try:
+        resumen = {}
+        for base in bases:
+            nombre_db, directorio, colecciones = BASES[base]
+            print(f"\nImportando {base} ({nombre_db}){' en modo delta' if delta else ''}...")
+            db = ConexionMongo.client[nombre_db]
+            if delta:
+                from importar_delta import importar_base_delta
+                observadores = {}
+                if base == "supermarket":
+                    observadores["ventas"] = FechasAfectadas(db.ventas, batch_size)
+                else:
+                    observadores = {nombre: IdsAfectados() for nombre in COLECCIONES_REPORTE_TAREAS}
+                resumen[base] = importar_base_delta(db, directorios.get(base) or directorio, colecciones,
+                                                    batch_size, write_concern, observadores=observadores)
+                if base == "tareas":
+                    actualizar_reporte_tareas(nombre_db, {n: o.ids for n, o in observadores.items()})
+                if "ventas" in observadores:
+                    completar_items_ventas(nombre_db, observadores["ventas"].ids, batch_size)
+                    afectadas = observadores["ventas"]
+                    actualizar_rollups(nombre_db, afectadas.todas(), afectadas.clientes)
+            else:
+                resumen[base] = importar_base(db, directorios.get(base) or directorio,
+                                              colecciones, batch_size, write_concern)
+                if base == "supermarket":
+                    completar_items_ventas(nombre_db)
+                    actualizar_rollups(nombre_db)
+                else:
+                    actualizar_reporte_tareas(nombre_db)
+        if indices:
+            crear_indices(bases)
+
+        print("\n[SUCCESS] Importacion completada")
+        for base, resultados in resumen.items():
+            filas = sum(r["filas"] for r in resultados)
+            segundos = sum(r["segundos"] for r in resultados)
+            print(f"- {base}: {filas} documentos en {round(segundos, 3)}s")
+            for r in resultados:
+                print(f"    {r['coleccion']}: {r['filas']}")
+        return resumen
+    finally:
+        ConexionMongo.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa los CSV de Tareas y Supermarket a MongoDB")
+    parser.add_argument("bases", nargs="*", help=f"{' y/o '.join(BASES)} (por defecto todas)")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE_POR_DEFECTO)
+    parser.add_argument("--w", default="1", help='write concern: 0, 1, ..., "majority"')
+    parser.add_argument("--j", action="store_true", help="esperar la confirmación del journal")
+    parser.add_argument("--directorio-tareas")
+    parser.add_argument("--directorio-supermarket")
+    parser.add_argument("--sin-indices", action="store_true", help="no crear los índices al terminar")
+    parser.add_argument("--delta", action="store_true",
+                        help="no vaciar las colecciones: aplicar solo filas nuevas, cambiadas o eliminadas")
+    args = parser.parse_args()
+
+    desconocidas = [b for b in args.bases if b not in BASES]
+    if desconocidas:
+        parser.error(f"bases desconocidas: {', '.join(desconocidas)}")
+
+    if args.batch_size < 1:
+        parser.error("--batch-size debe ser positivo")
+
+    importar(
+        args.bases or list(BASES),
+        uri=args.uri,
+        batch_size=args.batch_size,
+        w=args.w,
+        j=args.j,
+        directorios={"tareas": args.directorio_tareas, "supermarket": args.directorio_supermarket},
+        indices=not args.sin_indices,
+        delta=args.delta
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Importación incremental (delta) de los CSV sin vaciar las colecciones.
+
+Un manifiesto JSON junto a los CSV (`.manifiesto_importacion.json`) guarda por
+colección el checksum del archivo y una huella de cada fila (_id -> hash del
+documento convertido). En cada corrida:
+
+- el manifiesto de una colección solo se usa si todos los _id que registró siguen
+  en ella (los documentos que la API agregó después no lo invalidan);
+- si el checksum del archivo no cambió, la colección no se toca;
+- las filas nuevas o con huella distinta se escriben con ReplaceOne(upsert=True);
+- los _id que estaban en el manifiesto y ya no aparecen en el CSV se eliminan. Sin
+  un manifiesto confiable no se elimina nada: los documentos que no están en el CSV
+  se reportan como sobrantes.
+
+Las colecciones nunca se vacían, así la API sigue respondiendo con datos
+completos durante la importación. Se usa desde importar.py con --delta.
+"""
+import hashlib
+import json
+import os
+import time
+
+from pymongo import DeleteMany, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from importar import leer_documentos
+from versioning import Versiones
+
+NOMBRE_MANIFIESTO = ".manifiesto_importacion.json"
+TAMANO_BLOQUE = 1 << 20
+
+
+def checksum_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def huella(doc):
+    """Hash corto y estable del documento convertido (independiente del orden de las claves)."""
+    contenido = json.dumps(doc, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def cargar_manifiesto(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, "r", encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def guardar_manifiesto(ruta, manifiesto):
+    """Escritura atómica: un manifiesto a medio escribir no debe sobrevivir a un fallo."""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporal, ruta)
+
+
+def _escribir(collection, operaciones, totales):
+    """Ejecuta un lote sin orden y acumula los contadores; retorna las posiciones rechazadas."""
+    if not operaciones:
+        return []
+    rechazadas = []
+    try:
+        resultado = collection.bulk_write(operaciones, ordered=False)
+        detalles = resultado.bulk_api_result
+    except BulkWriteError as e:
+        detalles = e.details
+        rechazadas = [error["index"] for error in detalles.get("writeErrors", [])]
+        totales["errores"] += len(rechazadas)
+    totales["insertadas"] += detalles.get("nUpserted", 0)
+    totales["actualizadas"] += detalles.get("nModified", 0)
+    # Filas reescritas sin diferencias (solo ocurre sin manifiesto previo)
+    totales["sin_cambios"] += detalles.get("nMatched", 0) - detalles.get("nModified", 0)
+    totales["eliminadas"] += detalles.get("nRemoved", 0)
+    return rechazadas
+
+
+def _escribir_reemplazos(collection, operaciones, claves, filas, totales, antes_de_escribir=None):
+    if antes_de_escribir and operaciones:
+        antes_de_escribir([json.loads(clave) for clave in claves])
+    # Las filas rechazadas quedan sin huella para que la próxima corrida las reintente
+    for posicion in _escribir(collection, operaciones, totales):
+        filas[claves[posicion]] = None
+
+
+def manifiesto_confiable(collection, anterior, batch_size=1000):
+    """
+    True si todos los _id que registró la entrada del manifiesto siguen en la colección.
+    Las filas rechazadas (huella None) no cuentan: pueden no haberse escrito nunca.
+    """
+    if not anterior or "filas" not in anterior:
+        return False
+    claves = [clave for clave, valor in anterior["filas"].items() if valor is not None]
+    for inicio in range(0, len(claves), batch_size):
+        ids = [json.loads(clave) for clave in claves[inicio:inicio + batch_size]]
+        if collection.count_documents({"_id": {"$in": ids}}) != len(ids):
+            return False
+    return True
+
+
+def _eliminar(collection, ids, totales, antes_de_escribir=None):
+    if antes_de_escribir:
+        antes_de_escribir(ids)
+    _escribir(collection, [DeleteMany({"_id": {"$in": ids}})], totales)
+
+
+def importar_coleccion_delta(db, nombre, ruta, columnas, anterior=None, batch_size=1000, write_concern=None,
+                             antes_de_escribir=None):
+    """
+    Aplica a una colección solo las diferencias entre su CSV y el manifiesto anterior.
+
+    Args:
+        anterior (dict): entrada del manifiesto de la corrida previa
+            ({"checksum": ..., "filas": {_id en JSON: huella}}) o None.
+        antes_de_escribir (callable): Recibe la lista de _id de cada lote antes de
+            reemplazarlo o eliminarlo (p. ej. para recalcular los rollups de esas ventas).
+
+    Returns:
+        tuple: (resultado de la colección, nueva entrada del manifiesto)
+    """
+    collection = db.get_collection(nombre, write_concern=write_concern)
+    inicio = time.perf_counter()
+    totales = {"insertadas": 0, "actualizadas": 0, "eliminadas": 0, "sin_cambios": 0, "errores": 0, "sobrantes": 0}
+    checksum = checksum_archivo(ruta)
+
+    # El manifiesto solo vale si la colección sigue teniendo las filas que registró
+    if not manifiesto_confiable(collection, anterior, batch_size):
+        anterior = None
+
+    if anterior and anterior.get("checksum") == checksum:
+        totales["sin_cambios"] = len(anterior["filas"])
+        resultado = {"coleccion": nombre, "archivo_sin_cambios": True, **totales,
+                     "segundos": round(time.perf_counter() - inicio, 3)}
+        return resultado, anterior
+
+    filas_anteriores = anterior["filas"] if anterior else None
+    filas = {}
+    operaciones = []
+    claves = []
+    for doc in leer_documentos(ruta, columnas):
+        clave = json.dumps(doc["_id"])
+        filas[clave] = huella(doc)
+        if filas_anteriores is not None and filas_anteriores.get(clave) == filas[clave]:
+            totales["sin_cambios"] += 1
+            continue
+        operaciones.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        claves.append(clave)
+        if len(operaciones) >= batch_size:
+            _escribir_reemplazos(collection, operaciones, claves, filas, totales, antes_de_escribir)
+            operaciones, claves = [], []
+    _escribir_reemplazos(collection, operaciones, claves, filas, totales, antes_de_escribir)
+
+    # Sin manifiesto previo no se sabe qué _id vinieron del CSV: los demás solo se cuentan
+    if filas_anteriores is None:
+        totales["sobrantes"] = sum(
+            1 for doc in collection.find({}, {"_id": 1}) if json.dumps(doc["_id"], default=str) not in filas
+        )
+        filas_anteriores = {}
+    desaparecidos = []
+    for clave in filas_anteriores:
+        if clave not in filas:
+            desaparecidos.append(json.loads(clave))
+            if len(desaparecidos) >= batch_size:
+                _eliminar(collection, desaparecidos, totales, antes_de_escribir)
+                desaparecidos = []
+    if desaparecidos:
+        _eliminar(collection, desaparecidos, totales, antes_de_escribir)
+
+    if totales["insertadas"] or totales["actualizadas"] or totales["eliminadas"]:
+        Versiones.incrementar(collection)
+
+    resultado = {"coleccion": nombre, "archivo_sin_cambios": False, **totales,
+                 "segundos": round(time.perf_counter() - inicio, 3)}
+    # Si hubo rechazos no se guarda el checksum, así la próxima corrida vuelve a revisar el archivo
+    nueva = {"checksum": checksum if not totales["errores"] else None, "filas": filas}
+    return resultado, nueva
+
+
+def importar_base_delta(db, directorio, colecciones, batch_size=1000, write_concern=None, ruta_manifiesto=None,
+                        observadores=None):
+    """
+    Importa en modo delta las colecciones de una base de datos y actualiza su manifiesto.
+    `observadores` ({colección: callable}) se pasan como antes_de_escribir de cada colección.
+    """
+    observadores = observadores or {}
+    ruta_manifiesto = ruta_manifiesto or os.path.join(directorio, NOMBRE_MANIFIESTO)
+    manifiesto = cargar_manifiesto(ruta_manifiesto)
+    entradas = manifiesto.setdefault(db.name, {})
+    resultados = []
+    for nombre, archivo, columnas in colecciones:
+        print(f"Comparando {nombre}...")
+        resultado, entrada = importar_coleccion_delta(
+            db, nombre, os.path.join(directorio, archivo), columnas, entradas.get(nombre), batch_size, write_concern,
+            observadores.get(nombre)
+        )
+        entradas[nombre] = entrada
+        # Se guarda después de cada colección para no repetir trabajo si la corrida se interrumpe
+        guardar_manifiesto(ruta_manifiesto, manifiesto)
+        if resultado["archivo_sin_cambios"]:
+            print(f"[OK] {nombre}: archivo sin cambios")
+        else:
+            print(f"[OK] {nombre}: {resultado['insertadas']} nuevas, {resultado['actualizadas']} actualizadas, "
+                  f"{resultado['eliminadas']} eliminadas, {resultado['sin_cambios']} sin cambios "
+                  f"en {resultado['segundos']}s")
+        if resultado["sobrantes"]:
+            print(f"[WARN] {nombre}: {resultado['sobrantes']} documentos que no están en el CSV se conservaron "
+                  f"(sin manifiesto previo no se eliminan)")
+        resultado["filas"] = len(entrada["filas"])
+        resultados.append(resultado)
+    return resultados
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Importación en paralelo de un CSV muy grande (p. ej. ventas.csv) repartido entre procesos.
+
+El archivo se mapea en memoria (mmap) y se divide en rangos de bytes alineados a
+registros: cada corte se desplaza al siguiente salto de línea que no esté dentro
+de un campo entre comillas (paridad de comillas desde el corte anterior; las
+comillas escapadas "" suman dos y no alteran la paridad), así los campos de
+varias líneas como el JSON de items nunca quedan partidos. Cada rango se
+convierte y se inserta en un proceso del pool con los mismos convertidores y
+lotes que importar.py, de modo que el parseo del CSV y los json.loads escalan
+con los núcleos. Al final se comprueba que la colección tenga tantas filas como
+las leídas por los procesos.
+
+Uso:
+    python import/importar_paralelo.py supermarket ventas --procesos 8
+    python import/importar_paralelo.py supermarket ventas --archivo /datos/ventas.csv --particiones 64
+"""
+import argparse
+import csv
+import io
+import mmap
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import Manager
+
+# importar agrega la raíz del repositorio a sys.path (conexion, versioning, indexes)
+import importar
+from importar import BASES, BATCH_SIZE_POR_DEFECTO, convertir_fila, insertar_en_lotes, write_concern_desde
+from conexion import ConexionMongo
+from versioning import Versiones
+
+# Por debajo de este tamaño no vale la pena abrir otra partición; por encima del
+# máximo se abren más particiones para acotar la memoria de cada proceso
+TAMANO_MINIMO_PARTICION = 1 << 20
+TAMANO_MAXIMO_PARTICION = 64 << 20
+BLOQUE_CONTEO = 16 << 20
+
+
+def _contar_comillas(mm, inicio, fin):
+    """Comillas en [inicio, fin) contadas por bloques, sin copiar el rango completo."""
+    total = 0
+    for desde in range(inicio, fin, BLOQUE_CONTEO):
+        total += mm[desde:min(desde + BLOQUE_CONTEO, fin)].count(b'"')
+    return total
+
+
+def siguiente_registro(mm, inicio, corte):
+    """
+    Primer inicio de registro en o después de `corte`, sabiendo que `inicio` es
+    inicio de registro: el salto de línea que cierra un registro es el primero
+    después del corte con un número par de comillas desde `inicio`.
+    """
+    comillas = _contar_comillas(mm, inicio, corte)
+    posicion = corte
+    while True:
+        salto = mm.find(b"\n", posicion)
+        if salto == -1:
+            return len(mm)
+        comillas += _contar_comillas(mm, posicion, salto)
+        if comillas % 2 == 0:
+            return salto + 1
+        posicion = salto + 1
+
+
+def particionar(mm, inicio_datos, particiones):
+    """Divide [inicio_datos, len(mm)) en hasta `particiones` rangos alineados a registros."""
+    total = len(mm)
+    tamano = max((total - inicio_datos) // max(particiones, 1), 1)
+    rangos = []
+    inicio = inicio_datos
+    while inicio < total:
+        if len(rangos) == particiones - 1:
+            fin = total
+        else:
+            fin = siguiente_registro(mm, inicio, min(inicio + tamano, total))
+        rangos.append((inicio, fin))
+        inicio = fin
+    return rangos
+
+
+def _leer_encabezado(mm):
+    fin = siguiente_registro(mm, 0, 0)
+    encabezado = mm[:fin].decode("utf-8-sig")
+    return next(csv.reader(io.StringIO(encabezado))), fin
+
+
+def cargar_particion(numero, ruta, inicio, fin, nombres, base, coleccion, uri, batch_size, w, j, progreso):
+    """
+    Trabajo de un proceso: convierte e inserta los registros de [inicio, fin).
+
+    Returns:
+        dict: número de partición, filas leídas, insertadas, rechazadas y segundos.
+    """
+    nombre_db, _, colecciones = BASES[base]
+    columnas = next(c for nombre, _, c in colecciones if nombre == coleccion)
+    ConexionMongo.init({"MONGO_URI": uri, "MONGO_MAX_POOL_SIZE": 2})
+    collection = ConexionMongo.client[nombre_db].get_collection(coleccion, write_concern=write_concern_desde(w, j))
+    comienzo = time.perf_counter()
+    leidas = 0
+
+    def documentos():
+        nonlocal leidas
+        with open(ruta, "rb") as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            texto = io.StringIO(mm[inicio:fin].decode("utf-8"), newline="")
+        for fila in csv.DictReader(texto, fieldnames=nombres, restkey="__resto__"):
+            leidas += 1
+            if leidas % batch_size == 0:
+                progreso.put((numero, leidas))
+            yield convertir_fila(fila, columnas)
+
+    try:
+        insertadas, errores = insertar_en_lotes(collection, documentos(), batch_size)
+    finally:
+        ConexionMongo.cerrar()
+    progreso.put((numero, leidas))
+    return {
+        "particion": numero,
+        "leidas": leidas,
+        "insertadas": insertadas,
+        "errores": errores,
+        "segundos": round(time.perf_counter() - comienzo, 3)
+    }
+
+
+def importar_paralelo(base, coleccion, ruta=None, uri="mongodb://localhost:27017/", procesos=None,
+                      particiones=None, batch_size=BATCH_SIZE_POR_DEFECTO, w=1, j=False, indices=True):
+    """
+    Reemplaza `coleccion` con el contenido de su CSV cargado en paralelo.
+
+    Returns:
+        dict: resumen por partición, totales y resultado de la verificación final.
+    """
+    nombre_db, directorio, colecciones = BASES[base]
+    archivo = next((a for nombre, a, _ in colecciones if nombre == coleccion), None)
+    if archivo is None:
+        raise ValueError(f"La base '{base}' no tiene la colección '{coleccion}'")
+    ruta = ruta or os.path.join(directorio, archivo)
+    procesos = procesos or os.cpu_count() or 1
+    particiones = particiones or procesos * 2
+
+    with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        nombres, inicio_datos = _leer_encabezado(mm)
+        tamano = len(mm) - inicio_datos
+        particiones = max(particiones, -(-tamano // TAMANO_MAXIMO_PARTICION))
+        particiones = max(1, min(particiones, tamano // TAMANO_MINIMO_PARTICION or 1))
+        rangos = particionar(mm, inicio_datos, particiones)
+
+    ConexionMongo.init({"MONGO_URI": uri})
+    db = ConexionMongo.client[nombre_db]
+    db[coleccion].drop()
+    print(f"Importando {coleccion} desde {ruta}: {len(rangos)} particiones en {procesos} procesos")
+
+    comienzo = time.perf_counter()
+    resultados = []
+    with Manager() as manager, ProcessPoolExecutor(max_workers=procesos) as pool:
+        progreso = manager.Queue()
+        pendientes = {
+            pool.submit(cargar_particion, numero, ruta, inicio, fin, nombres, base, coleccion,
+                        uri, batch_size, w, j, progreso)
+            for numero, (inicio, fin) in enumerate(rangos)
+        }
+        while pendientes:
+            hechos, pendientes = wait(pendientes, timeout=1.0, return_when=FIRST_COMPLETED)
+            _mostrar_progreso(progreso, comienzo)
+            for futuro in hechos:
+                resultado = futuro.result()
+                resultados.append(resultado)
+                print(f"[particion {resultado['particion']}] {resultado['insertadas']} filas "
+                      f"en {resultado['segundos']}s")
+        _mostrar_progreso(progreso, comienzo)
+    segundos = time.perf_counter() - comienzo
+
+    leidas = sum(r["leidas"] for r in resultados)
+    insertadas = sum(r["insertadas"] for r in resultados)
+    en_coleccion = db[coleccion].count_documents({})
+    Versiones.incrementar(db[coleccion])
+    if base == "supermarket" and coleccion == "ventas":
+        importar.completar_items_ventas(nombre_db, batch_size=batch_size)
+        importar.actualizar_rollups(nombre_db)
+    ConexionMongo.cerrar()
+    if indices:
+        ConexionMongo.init({"MONGO_URI": uri})
+        importar.crear_indices([base])
+        ConexionMongo.cerrar()
+
+    resumen = {
+        "coleccion": coleccion,
+        "particiones": sorted(resultados, key=lambda r: r["particion"]),
+        "leidas": leidas,
+        "insertadas": insertadas,
+        "en_coleccion": en_coleccion,
+        "consistente": leidas == insertadas == en_coleccion,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(insertadas / segundos) if segundos > 0 else insertadas
+    }
+    estado = "[OK]" if resumen["consistente"] else "[ERROR] inconsistencia:"
+    print(f"{estado} leidas={leidas} insertadas={insertadas} en_coleccion={en_coleccion} "
+          f"en {resumen['segundos']}s ({resumen['filas_por_segundo']} filas/s)")
+    return resumen
+
+
+def _mostrar_progreso(progreso, comienzo):
+    """Imprime el último avance reportado por cada partición desde la llamada anterior."""
+    ultimos = {}
+    while True:
+        try:
+            numero, filas = progreso.get_nowait()
+        except queue.Empty:
+            break
+        ultimos[numero] = max(filas, ultimos.get(numero, 0))
+    transcurrido = time.perf_counter() - comienzo
+    for numero in sorted(ultimos):
+        print(f"  particion {numero}: {ultimos[numero]} filas leidas ({round(transcurrido, 1)}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa un CSV grande en paralelo con varios procesos")
+    parser.add_argument("base", choices=list(BASES))
+    parser.add_argument("coleccion")
+    parser.add_argument("--archivo", help="ruta del CSV (por defecto el de la colección en BD Tareas/BD Supermarket)")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--particiones", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE_POR_DEFECTO)
+    parser.add_argument("--w", default="1")
+    parser.add_argument("--j", action="store_true")
+    parser.add_argument("--sin-indices", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        resumen = importar_paralelo(
+            args.base, args.coleccion, args.archivo, uri=args.uri, procesos=args.procesos,
+            particiones=args.particiones, batch_size=args.batch_size, w=args.w, j=args.j,
+            indices=not args.sin_indices
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    sys.exit(0 if resumen["consistente"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Aprovisionamiento de índices y asesor de índices para ambas bases de datos.
+
+Cada modelo declara sus índices en el atributo de clase `indices`:
+- una lista de IndexModel para la colección del modelo, o
+- un dict {coleccion: [IndexModel, ...]} para los modelos de reportes,
+  cuya `collection` es la base de datos completa.
+
+Uso:
+    python indexes.py aplicar      # crea los índices registrados (idempotente)
+    python indexes.py asesor       # ejecuta explain sobre las consultas registradas
+"""
+import argparse
+import json
+
+from pymongo.errors import OperationFailure
+
+from models import UserModel, ProyectoModel, TareaModel, ResponsableModel, EstadoTareaModel, ReporteModel
+from supermarket_models import (
+    CategoriaModel, ProveedorModel, ClienteModel,
+    ProductoModel, VentaModel, VentaDiariaModel, ClienteStatsModel, SupermarketReporteModel
+)
+from cache import DimensionCache
+from conexion import ConexionMongo
+from optimizador import optimizar_comando
+from paginacion import Pagina
+
+MODELOS_TAREAS = [UserModel, ProyectoModel, TareaModel, ResponsableModel, EstadoTareaModel, ReporteModel]
+MODELOS_SUPERMARKET = [
+    CategoriaModel, ProveedorModel, ClienteModel, ProductoModel, VentaModel, VentaDiariaModel, ClienteStatsModel,
+    SupermarketReporteModel
+]
+MODELOS = MODELOS_TAREAS + MODELOS_SUPERMARKET
+
+# Documentos examinados por documento retornado a partir de los cuales el índice usado
+# (o su ausencia) se considera poco selectivo
+MAX_EXAMINADOS_POR_RETORNADO = 10
+# Etapas que resumen muchos documentos en pocos: con ellas la relación anterior no mide el índice
+ETAPAS_AGRUPACION = {"$group", "$bucket", "$bucketAuto", "$sortByCount"}
+
+
+def _destinos(modelo):
+    """Genera pares (colección, [IndexModel]) declarados por un modelo."""
+    if isinstance(modelo.indices, dict):
+        for nombre, indices in modelo.indices.items():
+            yield modelo.collection[nombre], indices
+    else:
+        yield modelo.collection, modelo.indices
+
+
+def aplicar_indices(modelos=MODELOS):
+    """
+    Crea los índices registrados. create_indexes es idempotente: los índices que ya
+    existen con la misma especificación no se vuelven a construir.
+
+    Returns:
+        dict: {"bd.coleccion": [nombres de índices]} y {"errores": {...}} si alguno falló.
+    """
+    resultado = {}
+    errores = {}
+    for modelo in modelos:
+        for coleccion, indices in _destinos(modelo):
+            if not indices:
+                continue
+            destino = f"{coleccion.database.name}.{coleccion.name}"
+            try:
+                resultado[destino] = coleccion.create_indexes(indices)
+            except OperationFailure as e:
+                errores[destino] = str(e)
+    if errores:
+        resultado["errores"] = errores
+    return resultado
+
+
+def consultas_registradas():
+    """
+    Consultas representativas de cada modelo para el asesor: (nombre, colección, comando).
+    Los pipelines salen de los mismos métodos que usan los modelos, así no se desfasan,
+    y se registran sin optimizar (ver optimizador.optimizar_comando).
+    """
+    db_tareas = ReporteModel.collection
+    db_supermarket = SupermarketReporteModel.collection
+    filtro_estado = ReporteModel.compilar_filtro_tareas({"estado": "Pendiente"})
+    rango = {"desde": "2025-09-01", "hasta": "2025-09-30"}
+    return [
+        ("ReporteModel.generar_reporte_tareas", db_tareas.tareas,
+         {"aggregate": "tareas", "pipeline": ReporteModel.pipeline_reporte_tareas(), "cursor": {}}),
+        ("ReporteModel.generar_reporte_tareas[estado]", db_tareas.tareas,
+         {"aggregate": "tareas", "pipeline": ReporteModel.pipeline_reporte_tareas(filtro_estado), "cursor": {}}),
+        ("ReporteModel.generar_reporte_tareas[pagina]", db_tareas.tareas,
+         {"aggregate": "tareas", "cursor": {},
+          "pipeline": ReporteModel.pipeline_reporte_tareas(pagina=Pagina(100))}),
+        ("ReporteModel.generar_reporte_tareas[materializado]", db_tareas[ReporteModel.VISTA_MATERIALIZADA],
+         {"find": ReporteModel.VISTA_MATERIALIZADA, "filter": {}, "sort": {"nombre_responsable": 1}}),
+        ("ReporteModel.generar_reporte_tareas[materializado, pagina]", db_tareas[ReporteModel.VISTA_MATERIALIZADA],
+         {"find": ReporteModel.VISTA_MATERIALIZADA, "filter": {}, "sort": dict(ReporteModel.ORDEN_PAGINAS), "limit": 101}),
+        ("SupermarketReporteModel.generar_reporte_ventas_detallado", db_supermarket.ventas,
+         {"aggregate": "ventas", "pipeline": SupermarketReporteModel.pipeline_reporte_ventas_detallado(), "cursor": {}}),
+        ("SupermarketReporteModel.generar_reporte_ventas_detallado[pagina]", db_supermarket.ventas,
+         {"aggregate": "ventas", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_reporte_ventas_detallado(pagina=Pagina(100))}),
+        ("SupermarketReporteModel.generar_reporte_ventas_detallado[rango]", db_supermarket.ventas,
+         {"aggregate": "ventas", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_reporte_ventas_detallado(**rango)}),
+        ("SupermarketReporteModel.generar_reporte_ventas_por_categoria", db_supermarket.ventas_diarias,
+         {"aggregate": "ventas_diarias", "pipeline": SupermarketReporteModel.pipeline_reporte_ventas_por_categoria(),
+          "cursor": {}}),
+        ("SupermarketReporteModel.generar_reporte_ventas_por_categoria[rango]", db_supermarket.ventas_diarias,
+         {"aggregate": "ventas_diarias", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_reporte_ventas_por_categoria(**rango)}),
+        ("SupermarketReporteModel.generar_reporte_ventas_por_producto[rango]", db_supermarket.ventas_diarias,
+         {"aggregate": "ventas_diarias", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_reporte_ventas_por_producto(**rango)}),
+        ("SupermarketReporteModel.generar_ventas_con_productos_unidos", db_supermarket.ventas,
+         {"aggregate": "ventas", "pipeline": SupermarketReporteModel.pipeline_ventas_con_productos_unidos(), "cursor": {}}),
+        ("SupermarketReporteModel.generar_ventas_con_productos_unidos[rango]", db_supermarket.ventas,
+         {"aggregate": "ventas", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_ventas_con_productos_unidos(**rango)}),
+        ("SupermarketReporteModel.generar_top_productos[rango]", db_supermarket.ventas_diarias,
+         {"aggregate": "ventas_diarias", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_top_productos(10, **rango)}),
+        ("SupermarketReporteModel.generar_top_clientes[rango]", db_supermarket.ventas,
+         {"aggregate": "ventas", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_top_clientes(10, **rango)}),
+        ("SupermarketReporteModel.generar_top_clientes[categoria]", db_supermarket.ventas,
+         {"aggregate": "ventas", "cursor": {},
+          "pipeline": SupermarketReporteModel.pipeline_top_clientes(10, categoria=1)}),
+        ("ProductoModel.get_productos_por_categoria", db_supermarket.productos,
+         {"find": "productos", "filter": {"categoria_id": 1}}),
+        ("VentaModel.get_ventas_por_cliente", db_supermarket.ventas,
+         {"find": "ventas", "filter": {"cliente_id": 1}, "sort": dict(VentaModel.ORDEN_HISTORIAL)}),
+        ("VentaModel.get_ventas_por_cliente[pagina]", db_supermarket.ventas,
+         {"find": "ventas", "filter": {"cliente_id": 1}, "sort": dict(VentaModel.ORDEN_HISTORIAL), "limit": 101}),
+        ("ProductoModel.get_productos_por_categoria[pagina]", db_supermarket.productos,
+         {"find": "productos", "filter": {"categoria_id": 1}, "sort": {"_id": 1}, "limit": 101}),
+        ("VentaModel.get_all_ventas[fecha]", db_supermarket.ventas,
+         {"find": "ventas", "filter": {}, "sort": {"fecha": -1}}),
+        ("VentaModel.get_all_ventas[rango]", db_supermarket.ventas,
+         {"find": "ventas", "filter": VentaDiariaModel.filtro_fechas(**rango)}),
+    ]
+
+
+def _recorrer(nodo):
+    """Recorre recursivamente un documento de explain."""
+    if isinstance(nodo, dict):
+        yield nodo
+        for valor in nodo.values():
+            yield from _recorrer(valor)
+    elif isinstance(nodo, list):
+        for valor in nodo:
+            yield from _recorrer(valor)
+
+
+def diagnosticar(explain):
+    """
+    Busca en un explain las etapas que indican índices faltantes y los planes que
+    examinan muchos más documentos de los que retornan (solo sin agrupación: un
+    $group retorna pocos documentos aunque el índice sea selectivo).
+
+    Returns:
+        dict: problemas encontrados y contadores de executionStats.
+    """
+    problemas = []
+    agrupa = False
+    for nodo in _recorrer(explain):
+        etapa = nodo.get("stage")
+        # GROUP es el $group empujado al plan de consulta (motor SBE)
+        if etapa == "GROUP" or ETAPAS_AGRUPACION.intersection(nodo):
+            agrupa = True
+        if etapa == "COLLSCAN":
+            problemas.append("COLLSCAN")
+        elif etapa == "SORT":
+            problemas.append("SORT en memoria")
+        elif "$sort" in nodo and isinstance(nodo["$sort"], dict) and "sortKey" in nodo["$sort"]:
+            # Etapa $sort del pipeline que no pudo resolverse con un índice
+            problemas.append("$sort en memoria")
+        elif etapa == "EQ_LOOKUP" and nodo.get("strategy") not in (None, "IndexedLoopJoin"):
+            problemas.append(f"$lookup con {nodo.get('strategy')}")
+
+    estadisticas = {"nReturned": 0, "totalDocsExamined": 0, "totalKeysExamined": 0}
+    for nodo in _recorrer(explain):
+        if "executionStats" in nodo and isinstance(nodo["executionStats"], dict):
+            for clave in estadisticas:
+                estadisticas[clave] += nodo["executionStats"].get(clave, 0)
+
+    examinados = estadisticas["totalDocsExamined"]
+    if not agrupa and examinados > MAX_EXAMINADOS_POR_RETORNADO * max(estadisticas["nReturned"], 1):
+        problemas.append("índice poco selectivo (docsExamined/nReturned alto)")
+
+    return {"problemas": sorted(set(problemas)), "estadisticas": estadisticas}
+
+
+def asesorar(verbosity="executionStats"):
+    """Ejecuta explain sobre cada consulta registrada y diagnostica el plan."""
+    informe = []
+    for nombre, coleccion, comando in consultas_registradas():
+        try:
+            explain = coleccion.database.command("explain", optimizar_comando(coleccion, comando),
+                                                 verbosity=verbosity)
+            diagnostico = diagnosticar(explain)
+        except OperationFailure as e:
+            diagnostico = {"problemas": [f"error: {e}"], "estadisticas": {}}
+        informe.append({"consulta": nombre, "coleccion": coleccion.name, **diagnostico})
+    return informe
+
+
+def inicializar_modelos(db_tareas="mi_db", db_supermarket="supermarket"):
+    """Inicializa todos los modelos con la conexión compartida (para uso fuera de la app)."""
+    tareas = ConexionMongo.base_datos(db_tareas)
+    supermarket = ConexionMongo.base_datos(db_supermarket)
+    for modelo in MODELOS_TAREAS:
+        modelo.init(tareas)
+    for modelo in MODELOS_SUPERMARKET:
+        modelo.init(supermarket)
+    DimensionCache.init(tareas, supermarket)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índices de las bases de datos mi_db y supermarket")
+    parser.add_argument("accion", choices=["aplicar", "asesor"])
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    args = parser.parse_args()
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    inicializar_modelos()
+
+    if args.accion == "aplicar":
+        print(json.dumps(aplicar_indices(), indent=2, ensure_ascii=False))
+    else:
+        hay_problemas = False
+        for entrada in asesorar():
+            estado = "OK" if not entrada["problemas"] else ", ".join(entrada["problemas"])
+            hay_problemas = hay_problemas or bool(entrada["problemas"])
+            stats = entrada["estadisticas"]
+            print(f"{entrada['consulta']:<60} {estado}")
+            if stats:
+                print(f"    docs examinados: {stats['totalDocsExamined']}, "
+                      f"keys examinadas: {stats['totalKeysExamined']}, "
+                      f"retornados: {stats['nReturned']}")
+        ConexionMongo.cerrar()
+        raise SystemExit(1 if hay_problemas else 0)
+
+    ConexionMongo.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Proveedor JSON de la aplicación con soporte nativo para tipos BSON.
+
+Serializa ObjectId, datetime, Decimal128 e Int64 sin recorrer los documentos
+en Python para convertir `_id`. Si `orjson` está instalado se usa como backend
+(implementado en C); si no, se usa el módulo `json` de la librería estándar.
+Se registra una sola vez con `app.json = BSONJSONProvider(app)` y lo comparten
+todos los blueprints, jsonify y las respuestas en streaming.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from bson import Decimal128, ObjectId
+from bson.int64 import Int64
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+def convertir_bson(obj):
+    """Convierte los tipos BSON (y algunos de Python) que JSON no soporta."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Int64):
+        return int(obj)
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no es serializable a JSON")
+
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask que entiende tipos BSON y usa orjson si está disponible.
+    """
+    default = staticmethod(convertir_bson)
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        # orjson solo soporta indentación de 2 espacios; con otros argumentos se usa json
+        if orjson is not None and set(kwargs) <= {"indent", "separators"}:
+            opciones = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                opciones |= orjson.OPT_SORT_KEYS
+            if kwargs.get("indent"):
+                opciones |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=convertir_bson, option=opciones).decode("utf-8")
+        return super().dumps(obj, **kwargs)
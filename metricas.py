@@ -0,0 +1,279 @@
+"""
+Métricas de la API en formato de texto de Prometheus (GET /metrics).
+
+- Peticiones HTTP: histograma de latencia y bytes de respuesta por ruta
+  (la regla de Flask, p. ej. /supermarket/productos/categoria/<int:categoria_id>,
+  para que los ids no disparen la cardinalidad) y método, más un contador por
+  código de estado.
+- Comandos de MongoDB: un CommandListener de PyMongo registra la latencia de
+  cada comando por base de datos, colección y nombre (aggregate en tareas,
+  find en productos...), los documentos retornados en el primer lote o en
+  getMore y los comandos fallidos.
+- Pool de conexiones: se exportan los contadores de EstadisticasPool
+  (conexiones abiertas y en uso, checkouts y tiempo de espera acumulado).
+
+Cada observación es una búsqueda binaria sobre los buckets y un incremento
+bajo un lock, sin asignar memoria por petición más allá de las etiquetas, así
+puede quedar activo en producción. Se desactiva con METRICAS_HABILITADAS=False.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+TIPO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres, valores, extra=""):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monótono con etiquetas."""
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def incrementar(self, valores=(), cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def lineas(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for clave, valor in sorted(valores.items()):
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos, suma y conteo por combinación de etiquetas."""
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # valores de etiquetas -> [conteos por bucket (+Inf al final), suma]
+        self._series = {}
+
+    def observar(self, valor, valores=()):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def lineas(self):
+        with self._lock:
+            series = {clave: (list(conteos), suma) for clave, (conteos, suma) in self._series.items()}
+        limites = self.buckets + (float("inf"),)
+        for clave, (conteos, suma) in sorted(series.items()):
+            acumulado = 0
+            for limite, conteo in zip(limites, conteos):
+                acumulado += conteo
+                le = 'le="' + _numero(limite) + '"'
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}"
+
+
+class ListenerComandos(monitoring.CommandListener):
+    """
+    CommandListener que alimenta las métricas de comandos. La colección solo
+    viene en el evento de inicio: se guarda por (conexión, request_id) hasta
+    que llega el evento de fin.
+    """
+
+    def __init__(self, metricas):
+        self.metricas = metricas
+        self._colecciones = {}
+
+    def started(self, event):
+        valor = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            valor = event.command.get("collection")
+        coleccion = valor if isinstance(valor, str) else ""
+        self._colecciones[(event.connection_id, event.request_id)] = coleccion
+
+    def _etiquetas(self, event):
+        coleccion = self._colecciones.pop((event.connection_id, event.request_id), "")
+        return event.database_name, coleccion, event.command_name
+
+    def succeeded(self, event):
+        etiquetas = self._etiquetas(event)
+        self.metricas.duracion_comandos.observar(event.duration_micros / 1e6, etiquetas)
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        if cursor:
+            lote = cursor.get("firstBatch", cursor.get("nextBatch")) or ()
+            self.metricas.documentos_comandos.incrementar(etiquetas, len(lote))
+
+    def failed(self, event):
+        etiquetas = self._etiquetas(event)
+        self.metricas.duracion_comandos.observar(event.duration_micros / 1e6, etiquetas)
+        self.metricas.errores_comandos.incrementar(etiquetas)
+
+
+class Metricas:
+    """
+    Registro compartido de métricas. Se inicializa una sola vez desde app.py:
+    Metricas.init(app) instala los hooks de Flask y Metricas.listener_comandos() se pasa a
+    ConexionMongo.init(..., listeners=[...]).
+    """
+    duracion_peticiones = Histograma(
+        "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("ruta", "metodo")
+    )
+    bytes_respuestas = Histograma(
+        "http_response_size_bytes", "Bytes enviados por respuesta", ("ruta", "metodo"), BUCKETS_BYTES
+    )
+    peticiones = Contador(
+        "http_requests_total", "Peticiones HTTP por ruta, método y código de estado", ("ruta", "metodo", "estado")
+    )
+    errores_peticiones = Contador(
+        "http_request_errors_total", "Peticiones que terminaron con error (5xx o excepción)", ("ruta", "metodo")
+    )
+    duracion_comandos = Histograma(
+        "mongodb_command_duration_seconds", "Latencia de los comandos de MongoDB",
+        ("base_datos", "coleccion", "comando")
+    )
+    documentos_comandos = Contador(
+        "mongodb_command_documents_returned_total", "Documentos retornados en los lotes de cursor",
+        ("base_datos", "coleccion", "comando")
+    )
+    errores_comandos = Contador(
+        "mongodb_command_errors_total", "Comandos de MongoDB fallidos", ("base_datos", "coleccion", "comando")
+    )
+    listener = None
+
+    @staticmethod
+    def init(app):
+        """Registra los hooks de petición en `app` (todas las rutas de todos los blueprints)."""
+        app.before_request(_iniciar_peticion)
+        app.after_request(_terminar_peticion)
+        app.teardown_request(_fallo_peticion)
+
+    @staticmethod
+    def listener_comandos():
+        """CommandListener para ConexionMongo.init (uno solo por proceso)."""
+        if Metricas.listener is None:
+            Metricas.listener = ListenerComandos(Metricas)
+        return Metricas.listener
+
+    @staticmethod
+    def exportar(estadisticas_pool=None):
+        """Todas las métricas en formato de texto de Prometheus."""
+        lineas = []
+        for metrica in (Metricas.duracion_peticiones, Metricas.bytes_respuestas, Metricas.peticiones,
+                        Metricas.errores_peticiones, Metricas.duracion_comandos, Metricas.documentos_comandos,
+                        Metricas.errores_comandos):
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        if estadisticas_pool is not None:
+            lineas.extend(_lineas_pool(estadisticas_pool))
+        return "\n".join(lineas) + "\n"
+
+    @staticmethod
+    def respuesta(estadisticas_pool=None):
+        return Response(Metricas.exportar(estadisticas_pool), content_type=TIPO_PROMETHEUS)
+
+
+def _lineas_pool(estadisticas):
+    # Lectura sin lock: son enteros y flotantes sueltos, basta con una foto aproximada
+    metricas = [
+        ("mongodb_pool_connections_open", "gauge", "Conexiones abiertas en el pool", estadisticas.abiertas),
+        ("mongodb_pool_connections_in_use", "gauge", "Conexiones en uso", estadisticas.en_uso),
+        ("mongodb_pool_connections_in_use_max", "gauge", "Máximo de conexiones en uso", estadisticas.max_en_uso),
+        ("mongodb_pool_checkouts_total", "counter", "Checkouts de conexiones", estadisticas.checkouts),
+        ("mongodb_pool_checkout_failures_total", "counter", "Checkouts fallidos (timeout de la cola, errores)",
+         estadisticas.checkouts_fallidos),
+        ("mongodb_pool_wait_seconds_total", "counter", "Tiempo total esperando una conexión del pool",
+         estadisticas.espera_total_ms / 1000),
+        ("mongodb_pool_wait_seconds_max", "gauge", "Espera máxima por una conexión del pool",
+         estadisticas.espera_max_ms / 1000),
+        ("mongodb_pool_cleared_total", "counter", "Veces que se limpió el pool", estadisticas.pools_limpiados),
+    ]
+    for nombre, tipo, ayuda, valor in metricas:
+        yield f"# HELP {nombre} {ayuda}"
+        yield f"# TYPE {nombre} {tipo}"
+        yield f"{nombre} {_numero(valor)}"
+
+
+def _ruta_actual():
+    regla = request.url_rule
+    return (regla.rule if regla is not None else "sin_ruta"), request.method
+
+
+def _iniciar_peticion():
+    g._metricas_inicio = time.perf_counter()
+
+
+def _terminar_peticion(response):
+    inicio = g.pop("_metricas_inicio", None)
+    if inicio is None:
+        return response
+    etiquetas = _ruta_actual()
+    Metricas.peticiones.incrementar(etiquetas + (str(response.status_code),))
+    if response.status_code >= 500:
+        Metricas.errores_peticiones.incrementar(etiquetas)
+
+    if not response.is_streamed:
+        Metricas.duracion_peticiones.observar(time.perf_counter() - inicio, etiquetas)
+        Metricas.bytes_respuestas.observar(response.calculate_content_length() or 0, etiquetas)
+        return response
+
+    # En streaming (NDJSON) la latencia y los bytes se registran al terminar de enviar el cuerpo
+    cuerpo = response.response
+
+    def contar():
+        enviados = 0
+        try:
+            for parte in cuerpo:
+                # Werkzeug codifica las partes str en UTF-8: se cuentan bytes, no caracteres
+                enviados += len(parte.encode("utf-8") if isinstance(parte, str) else parte)
+                yield parte
+        finally:
+            Metricas.duracion_peticiones.observar(time.perf_counter() - inicio, etiquetas)
+            Metricas.bytes_respuestas.observar(enviados, etiquetas)
+            if hasattr(cuerpo, "close"):
+                cuerpo.close()
+
+    response.response = contar()
+    return response
+
+
+def _fallo_peticion(error):
+    # Excepción que se propagó sin pasar por after_request (p. ej. con PROPAGATE_EXCEPTIONS)
+    inicio = g.pop("_metricas_inicio", None)
+    if inicio is None or error is None:
+        return
+    etiquetas = _ruta_actual()
+    Metricas.duracion_peticiones.observar(time.perf_counter() - inicio, etiquetas)
+    Metricas.peticiones.incrementar(etiquetas + ("500",))
+    Metricas.errores_peticiones.incrementar(etiquetas)
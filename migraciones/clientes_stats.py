@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migración: construye la colección clientes_stats (resumen de compras por cliente)
+y el índice (cliente_id, fecha, _id) de ventas que sirve el historial de cada cliente.
+
+Después de esta migración el resumen se mantiene solo: POST /supermarket/ventas lo
+actualiza con cada venta y las importaciones lo reconstruyen o recalculan. Repetirla
+es seguro: $out reemplaza la colección completa.
+
+Uso:
+    python migraciones/clientes_stats.py
+    python migraciones/clientes_stats.py --uri mongodb://localhost:27017/ --db supermarket
+"""
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from conexion import ConexionMongo  # noqa: E402
+from supermarket_models import VentaModel, ClienteStatsModel  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye clientes_stats y el índice del historial de clientes")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="supermarket")
+    args = parser.parse_args()
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        db = ConexionMongo.base_datos(args.db)
+        VentaModel.init(db)
+        ClienteStatsModel.init(db)
+        inicio = time.perf_counter()
+        VentaModel.collection.create_indexes(VentaModel.indices)
+        print(f"[OK] índices de ventas en {round(time.perf_counter() - inicio, 3)}s")
+        inicio = time.perf_counter()
+        ClienteStatsModel.reconstruir()
+        clientes = ClienteStatsModel.collection.estimated_document_count()
+        print(f"[OK] clientes_stats: {clientes} clientes en {round(time.perf_counter() - inicio, 3)}s")
+    finally:
+        ConexionMongo.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
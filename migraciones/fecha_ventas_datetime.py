@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Migración: convierte ventas.fecha de texto "AAAA-MM-DD" a fecha BSON
+(medianoche UTC) y reconstruye los rollups de ventas_diarias con la nueva clave.
+
+Con fechas BSON los filtros ?desde=&hasta= son recorridos de rango sobre el
+índice de fecha y el orden por fecha es cronológico. La conversión se hace en
+el servidor con un update por pipeline ($dateFromString, MongoDB 4.2+) por
+rangos de _id, y solo toca las ventas cuya fecha sigue siendo texto: es
+idempotente y puede interrumpirse.
+
+La próxima importación con --delta verá todas las filas de ventas.csv como
+modificadas (su documento convertido cambió) y las reescribirá una vez.
+
+Uso:
+    python migraciones/fecha_ventas_datetime.py
+    python migraciones/fecha_ventas_datetime.py --uri mongodb://localhost:27017/ --db supermarket --lote 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from conexion import ConexionMongo  # noqa: E402
+from supermarket_models import VentaModel, VentaDiariaModel  # noqa: E402
+from versioning import Versiones  # noqa: E402
+
+FECHA_TEXTO = {"fecha": {"$type": "string"}}
+CONVERSION = [{
+    "$set": {
+        "fecha": {"$dateFromString": {"dateString": "$fecha", "format": "%Y-%m-%d", "timezone": "UTC"}}
+    }
+}]
+
+
+def migrar(db, lote=10000):
+    """
+    Convierte las fechas por rangos de _id.
+
+    Returns:
+        int: Número de ventas convertidas.
+    """
+    VentaModel.init(db)
+    convertidas = 0
+    ultimo = None
+    while True:
+        filtro = {"_id": {"$gt": ultimo}} if ultimo is not None else {}
+        ids = [doc["_id"] for doc in VentaModel.collection.find(filtro, {"_id": 1}).sort("_id", 1).limit(lote)]
+        if not ids:
+            return convertidas
+        rango = {"_id": {"$gte": ids[0], "$lte": ids[-1]}, **FECHA_TEXTO}
+        convertidas += VentaModel.collection.update_many(rango, CONVERSION).modified_count
+        ultimo = ids[-1]
+        print(f"  ... hasta _id {ultimo}: {convertidas} ventas convertidas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte ventas.fecha a fecha BSON y reconstruye ventas_diarias")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="supermarket")
+    parser.add_argument("--lote", type=int, default=10000, help="ventas revisadas por cada update")
+    args = parser.parse_args()
+    if args.lote < 1:
+        parser.error("--lote debe ser positivo")
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        db = ConexionMongo.base_datos(args.db)
+        inicio = time.perf_counter()
+        convertidas = migrar(db, args.lote)
+        if convertidas:
+            Versiones.incrementar(VentaModel.collection)
+        print(f"[OK] {convertidas} ventas convertidas en {round(time.perf_counter() - inicio, 3)}s")
+
+        # Los rollups guardan la fecha de la venta en su clave: se recalculan con el tipo nuevo
+        VentaDiariaModel.init(db)
+        inicio = time.perf_counter()
+        VentaDiariaModel.reconstruir()
+        print(f"[OK] rollups de ventas_diarias reconstruidos en {round(time.perf_counter() - inicio, 3)}s")
+        VentaModel.collection.create_indexes(VentaModel.indices)
+    finally:
+        ConexionMongo.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Migración: copia precio_unitario, categoria_id y nombre del producto en los
+items de las ventas existentes que no los tienen.
+
+Los reportes de ventas leen esos campos del item en lugar de unir cada item con
+'productos'. Las ventas registradas por la API y las importadas ya los traen;
+esta migración completa las que se cargaron antes. Es idempotente: solo toca
+ventas con algún item sin copia, así que puede repetirse o interrumpirse.
+
+El precio copiado es el actual del producto (el precio cobrado en ventas
+antiguas no se conoce), por eso los rollups diarios no cambian.
+
+Uso:
+    python migraciones/snapshot_items_ventas.py
+    python migraciones/snapshot_items_ventas.py --uri mongodb://localhost:27017/ --db supermarket --lote 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from conexion import ConexionMongo  # noqa: E402
+from supermarket_models import VentaModel  # noqa: E402
+
+
+def migrar(db, lote=5000):
+    """
+    Completa los items por rangos de _id para que cada $merge sea acotado.
+
+    Returns:
+        int: Número de ventas completadas.
+    """
+    VentaModel.init(db)
+    completadas = 0
+    ultimo = None
+    while True:
+        filtro = {"_id": {"$gt": ultimo}} if ultimo is not None else {}
+        ids = [doc["_id"] for doc in VentaModel.collection.find(filtro, {"_id": 1}).sort("_id", 1).limit(lote)]
+        if not ids:
+            return completadas
+        completadas += VentaModel.completar_items({"_id": {"$gte": ids[0], "$lte": ids[-1]}})
+        ultimo = ids[-1]
+        print(f"  ... hasta _id {ultimo}: {completadas} ventas completadas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copia los datos del producto en los items de las ventas existentes")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="supermarket")
+    parser.add_argument("--lote", type=int, default=5000, help="ventas revisadas por cada $merge")
+    args = parser.parse_args()
+    if args.lote < 1:
+        parser.error("--lote debe ser positivo")
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        db = ConexionMongo.base_datos(args.db)
+        inicio = time.perf_counter()
+        completadas = migrar(db, args.lote)
+        pendientes = VentaModel.collection.count_documents(VentaModel.SIN_SNAPSHOT)
+        print(f"[OK] {completadas} ventas completadas en {round(time.perf_counter() - inicio, 3)}s")
+        if pendientes:
+            print(f"[AVISO] {pendientes} ventas tienen items de productos inexistentes (quedan fuera de los reportes)")
+    finally:
+        ConexionMongo.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,13 @@
 from bson.objectid import ObjectId
+from pymongo import ASCENDING, IndexModel
+from cache import DimensionCache
+from versioning import Versiones
+from proyeccion import etapa_project, proyeccion_find
+from paginacion import (
+    ORDEN_ID, ResultadoPagina, contar_pipeline, etapas_pagina, incluir_orden, paginar_find, paginar_lista
+)
+from explain import explicar_aggregate, explicar_find
+from optimizador import ejecutar
 
 class UserModel:
     """
@@ -6,6 +15,8 @@ class UserModel:
     Implementa operaciones CRUD usando métodos estáticos.
     """
     collection = None  # atributo de clase que guardará la referencia a la colección
+    # Índices secundarios de la colección (ver indexes.py)
+    indices = []
 
     @staticmethod
     def init(mongo):
@@ -13,26 +24,37 @@ class UserModel:
 
     @staticmethod
     def create_user(data):
-        return UserModel.collection.insert_one(data).inserted_id
+        user_id = UserModel.collection.insert_one(data).inserted_id
+        Versiones.incrementar(UserModel.collection)
+        return user_id
 
     @staticmethod
-    def get_all_users():
-        return list(UserModel.collection.find())
+    def get_all_users(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(UserModel.collection, {}, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = UserModel.collection.find({}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
-    def get_user(user_id):
-        return UserModel.collection.find_one({"_id": ObjectId(user_id)})
+    def get_user(user_id, campos=None):
+        return UserModel.collection.find_one({"_id": ObjectId(user_id)}, proyeccion_find(campos))
 
     @staticmethod
     def update_user(user_id, data):
-        return UserModel.collection.update_one(
+        result = UserModel.collection.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": data}
         )
+        if result.modified_count > 0:
+            Versiones.incrementar(UserModel.collection)
+        return result
 
     @staticmethod
     def delete_user(user_id):
-        return UserModel.collection.delete_one({"_id": ObjectId(user_id)})
+        result = UserModel.collection.delete_one({"_id": ObjectId(user_id)})
+        if result.deleted_count > 0:
+            Versiones.incrementar(UserModel.collection)
+        return result
 
 
 class ProyectoModel:
@@ -40,14 +62,18 @@ class ProyectoModel:
     Modelo de dominio para la colección 'proyectos' en MongoDB.
     """
     collection = None
+    indices = []
 
     @staticmethod
     def init(mongo):
         ProyectoModel.collection = mongo.db.proyectos
 
     @staticmethod
-    def get_all_proyectos():
-        return list(ProyectoModel.collection.find())
+    def get_all_proyectos(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(ProyectoModel.collection, {}, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = ProyectoModel.collection.find({}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
     def get_proyecto(proyecto_id):
@@ -59,14 +85,22 @@ class TareaModel:
     Modelo de dominio para la colección 'tareas' en MongoDB.
     """
     collection = None
+    indices = [
+        IndexModel([("id_estado_tarea", ASCENDING)]),
+        IndexModel([("id_proyecto", ASCENDING)]),
+        IndexModel([("id_responsable", ASCENDING)])
+    ]
 
     @staticmethod
     def init(mongo):
         TareaModel.collection = mongo.db.tareas
 
     @staticmethod
-    def get_all_tareas():
-        return list(TareaModel.collection.find())
+    def get_all_tareas(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(TareaModel.collection, {}, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = TareaModel.collection.find({}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
     def get_tarea(tarea_id):
@@ -78,14 +112,21 @@ class ResponsableModel:
     Modelo de dominio para la colección 'responsables' en MongoDB.
     """
     collection = None
+    indices = [
+        IndexModel([("edad", ASCENDING)]),
+        IndexModel([("nombre_responsable", ASCENDING)])
+    ]
 
     @staticmethod
     def init(mongo):
         ResponsableModel.collection = mongo.db.responsables
 
     @staticmethod
-    def get_all_responsables():
-        return list(ResponsableModel.collection.find())
+    def get_all_responsables(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(ResponsableModel.collection, {}, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = ResponsableModel.collection.find({}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
     def get_responsable(responsable_id):
@@ -97,14 +138,18 @@ class EstadoTareaModel:
     Modelo de dominio para la colección 'estados_tarea' en MongoDB.
     """
     collection = None
+    indices = []
 
     @staticmethod
     def init(mongo):
         EstadoTareaModel.collection = mongo.db.estados_tarea
 
     @staticmethod
-    def get_all_estados():
-        return list(EstadoTareaModel.collection.find())
+    def get_all_estados(campos=None, como_cursor=False, pagina=None):
+        # Las dimensiones viven en memoria: siempre se retorna una lista
+        if pagina is not None:
+            return paginar_lista(DimensionCache.get("estados_tarea").todos(incluir_orden(campos, ORDEN_ID)), pagina)
+        return DimensionCache.get("estados_tarea").todos(campos)
 
     @staticmethod
     def get_estado(estado_id):
@@ -116,38 +161,192 @@ class ReporteModel:
     Modelo para generar reportes complejos usando pipelines de agregación.
     """
     collection = None
+    # La colección de este modelo es la base de datos: los índices se declaran por colección
+    indices = {
+        "reporte_tareas": [
+            # Sirve el orden del reporte y las páginas por cursor (nombre_responsable, _id)
+            IndexModel([("nombre_responsable", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("id_responsable", ASCENDING)]),
+            IndexModel([("id_proyecto", ASCENDING)]),
+            IndexModel([("id_estado_tarea", ASCENDING)])
+        ]
+    }
+
+    # Rangos de edad (exclusivo, inclusivo] de cada grupo etáreo, iguales a los del $cond del pipeline
+    GRUPOS_ETAREOS = {
+        "adulto joven": (17, 30),
+        "adulto medio": (30, 50),
+        "adulto mayor": (50, None),
+    }
+
+    # Vista materializada del reporte de tareas, mantenida con $merge
+    VISTA_MATERIALIZADA = "reporte_tareas"
+    PROYECCION_MATERIALIZADA = {
+        "_id": 0,
+        "id_proyecto": 0,
+        "id_responsable": 0,
+        "id_estado_tarea": 0,
+        "refresco": 0
+    }
+    MODOS = ("directo", "materializado")
+    # Columnas del reporte y su tipo para ?format=csv|parquet (ver exportar.py)
+    COLUMNAS_EXPORTACION = [
+        ("nombre_tarea", "texto"),
+        ("estado_tarea", "texto"),
+        ("nombre_proyecto", "texto"),
+        ("nombre_responsable", "texto"),
+        ("apellido_responsable", "texto"),
+        ("edad", "entero"),
+        ("grupo_etareo", "texto")
+    ]
+
+    # Colecciones de las que se construye la vista materializada
+    FUENTES = ("tareas", "proyectos", "responsables", "estados_tarea")
+
+    # Clave de orden de las páginas de la vista: el _id de la tarea desempata
+    ORDEN_PAGINAS = [("nombre_responsable", 1), ("_id", 1)]
+    # En modo directo las páginas se cortan sobre 'tareas', antes de los $lookup
+    ORDEN_PAGINAS_DIRECTO = ORDEN_ID
+    PROYECCION_PAGINAS = {
+        "id_proyecto": 0,
+        "id_responsable": 0,
+        "id_estado_tarea": 0,
+        "refresco": 0
+    }
 
     @staticmethod
     def init(mongo):
         ReporteModel.collection = mongo.db
 
     @staticmethod
-    def generar_reporte_tareas(filtrar_estados=None):
+    def _parsear_enteros(valor, nombre):
+        """Convierte "1,2,3" en [1, 2, 3]; lanza ValueError si algún valor no es entero."""
+        try:
+            return [int(v) for v in str(valor).split(",") if v.strip()]
+        except ValueError:
+            raise ValueError(f"El parámetro '{nombre}' debe ser un entero o una lista de enteros separados por coma")
+
+    @staticmethod
+    def _parsear_entero(valor, nombre):
+        """Convierte un parámetro de consulta en entero; lanza ValueError si no lo es."""
+        try:
+            return int(valor)
+        except ValueError:
+            raise ValueError(f"El parámetro '{nombre}' debe ser un entero")
+
+    @staticmethod
+    def _ids_estados(nombres):
+        """Obtiene los _id de los estados a partir de sus nombres (desde la caché de dimensiones)."""
+        return DimensionCache.get("estados_tarea").ids_por_nombres(nombres)
+
+    @staticmethod
+    def _filtro_edad(params):
         """
-        Pipeline de agregación para generar el reporte de tareas con todas las especificaciones.
-        
+        Construye el filtro sobre responsables.edad a partir de edad_min, edad_max y grupo_etareo.
+        Retorna None si no se pidió ningún filtro de edad.
+        """
+        condiciones = []
+
+        if params.get("edad_min"):
+            condiciones.append({"edad": {"$gte": ReporteModel._parsear_entero(params["edad_min"], "edad_min")}})
+        if params.get("edad_max"):
+            condiciones.append({"edad": {"$lte": ReporteModel._parsear_entero(params["edad_max"], "edad_max")}})
+
+        grupo = params.get("grupo_etareo")
+        if grupo:
+            if grupo == "sin clasificar":
+                condiciones.append({"edad": {"$not": {"$gt": 17}}})
+            elif grupo in ReporteModel.GRUPOS_ETAREOS:
+                minimo, maximo = ReporteModel.GRUPOS_ETAREOS[grupo]
+                rango = {"$gt": minimo}
+                if maximo is not None:
+                    rango["$lte"] = maximo
+                condiciones.append({"edad": rango})
+            else:
+                validos = list(ReporteModel.GRUPOS_ETAREOS) + ["sin clasificar"]
+                raise ValueError(f"grupo_etareo inválido: '{grupo}'. Valores permitidos: {', '.join(validos)}")
+
+        if not condiciones:
+            return None
+        return condiciones[0] if len(condiciones) == 1 else {"$and": condiciones}
+
+    @staticmethod
+    def compilar_filtro_tareas(params):
+        """
+        Traduce los parámetros de consulta del reporte a un $match sobre los campos
+        crudos (indexados) de 'tareas', para que se aplique antes de cualquier $lookup.
+
+        Parámetros soportados (todos opcionales):
+            estado: nombre del estado o lista separada por coma ("all" = sin filtro)
+            id_proyecto, id_responsable: entero o lista separada por coma
+            edad_min, edad_max: rango inclusivo de edad del responsable
+            grupo_etareo: "adulto joven", "adulto medio", "adulto mayor" o "sin clasificar"
+
+        Los filtros de edad se resuelven primero contra 'responsables' y se convierten
+        en un $in sobre id_responsable.
+
+        Returns:
+            dict: Condición para $match (vacía si no hay filtros).
+        """
+        match = {}
+
+        estado = params.get("estado")
+        if estado and estado != "all":
+            nombres = [e.strip() for e in estado.split(",") if e.strip()]
+            match["id_estado_tarea"] = {"$in": ReporteModel._ids_estados(nombres)}
+
+        if params.get("id_proyecto"):
+            match["id_proyecto"] = {"$in": ReporteModel._parsear_enteros(params["id_proyecto"], "id_proyecto")}
+
+        responsables = None
+        if params.get("id_responsable"):
+            responsables = ReporteModel._parsear_enteros(params["id_responsable"], "id_responsable")
+
+        filtro_edad = ReporteModel._filtro_edad(params)
+        if filtro_edad is not None:
+            por_edad = [r["_id"] for r in ReporteModel.collection.responsables.find(filtro_edad, {"_id": 1})]
+            if responsables is None:
+                responsables = por_edad
+            else:
+                por_edad = set(por_edad)
+                responsables = [r for r in responsables if r in por_edad]
+
+        if responsables is not None:
+            match["id_responsable"] = {"$in": responsables}
+
+        return match
+
+    @staticmethod
+    def pipeline_reporte_tareas(match=None, refresco=None, campos=None, pagina=None):
+        """
+        Construye el pipeline del reporte de tareas.
+
         Args:
-            filtrar_estados (list): Lista de estados a filtrar. Si es None, muestra todas las tareas.
+            match (dict): Condición sobre los campos crudos de 'tareas' que se aplica
+                como primera etapa, antes de los $lookup.
+            refresco: Marca del refresco en curso. Si se indica, el pipeline conserva
+                _id y los ids crudos y termina en un $merge hacia la vista materializada
+                en lugar de ordenar.
+            campos (list): Campos del reporte a retornar ($project final).
+            pagina (Pagina): Solo esa página, por _id de tarea: el keyset, el $sort y el
+                $limit van antes de los $lookup. Las tareas sin proyecto o responsable se
+                conservan con `_completa: false` para que el cursor avance sobre ellas.
         """
         pipeline = []
-        
-        # Agregar filtro por estado si se especifica
-        if filtrar_estados:
-            # Primero necesitamos obtener los ObjectIds de los estados
-            estados_collection = ReporteModel.collection.estados_tarea
-            estados_ids = []
-            for estado_nombre in filtrar_estados:
-                estado_doc = estados_collection.find_one({"estado_tarea": estado_nombre})
-                if estado_doc:
-                    estados_ids.append(estado_doc["_id"])
-            
-            if estados_ids:
-                pipeline.append({
-                    "$match": {
-                        "id_estado_tarea": {"$in": estados_ids}
-                    }
-                })
-        
+
+        # El nombre del estado sale de la caché de dimensiones en vez de un $lookup + $unwind;
+        # como ese $unwind descartaba las tareas sin estado válido, se filtran aquí por id
+        estados = DimensionCache.get("estados_tarea")
+        match = dict(match or {})
+        match.setdefault("id_estado_tarea", {"$in": estados.ids()})
+        pipeline.append({"$match": match})
+        if pagina is not None:
+            pipeline.extend(etapas_pagina(pagina, ReporteModel.ORDEN_PAGINAS_DIRECTO))
+
+        estado_tarea = estados.expresion_nombre("$id_estado_tarea")
+        if estado_tarea is None:
+            estado_tarea = {"$literal": None}
+
         pipeline.extend([
             {
                 "$lookup": {
@@ -165,23 +364,28 @@ class ReporteModel:
                     "as": "responsable"
                 }
             },
-            {
-                "$lookup": {
-                    "from": "estados_tarea",
-                    "localField": "id_estado_tarea",
-                    "foreignField": "_id",
-                    "as": "estado"
-                }
-            },
-            {
-                "$unwind": "$proyecto"
-            },
-            {
-                "$unwind": "$responsable"
-            },
-            {
-                "$unwind": "$estado"
-            },
+        ])
+        if pagina is None:
+            pipeline.extend([
+                {"$unwind": "$proyecto"},
+                {"$unwind": "$responsable"}
+            ])
+        else:
+            pipeline.extend([
+                {
+                    "$addFields": {
+                        "_completa": {
+                            "$and": [
+                                {"$gt": [{"$size": "$proyecto._id"}, 0]},
+                                {"$gt": [{"$size": "$responsable._id"}, 0]}
+                            ]
+                        }
+                    }
+                },
+                {"$unwind": {"path": "$proyecto", "preserveNullAndEmptyArrays": True}},
+                {"$unwind": {"path": "$responsable", "preserveNullAndEmptyArrays": True}}
+            ])
+        pipeline.extend([
             {
                 "$addFields": {
                     "grupo_etareo": {
@@ -215,21 +419,193 @@ class ReporteModel:
                     }
                 }
             },
+        ])
+
+        proyeccion = {
+            "_id": 0,
+            "nombre_tarea": "$nombre_tarea",
+            "estado_tarea": estado_tarea,
+            "nombre_proyecto": "$proyecto.nombre_proyecto",
+            "nombre_responsable": "$responsable.nombre_responsable",
+            "apellido_responsable": "$responsable.apellido_responsable",
+            "edad": "$responsable.edad",
+            "grupo_etareo": "$grupo_etareo"
+        }
+
+        if pagina is not None:
+            proyeccion.update({"_id": 1, "_completa": 1})
+            pipeline.append({"$project": proyeccion})
+            if campos:
+                pipeline.append(etapa_project(incluir_orden(campos, ReporteModel.ORDEN_PAGINAS_DIRECTO) + ["_completa"]))
+            return pipeline
+
+        if refresco is None:
+            pipeline.extend([
+                {"$project": proyeccion},
+                {"$sort": {"nombre_responsable": 1}}
+            ])
+            if campos:
+                pipeline.append(etapa_project(campos))
+            return pipeline
+
+        # Para la vista materializada se conservan el _id de la tarea y los ids crudos,
+        # así los filtros compilados y los refrescos incrementales funcionan sobre ella
+        proyeccion.update({
+            "_id": 1,
+            "id_proyecto": 1,
+            "id_responsable": 1,
+            "id_estado_tarea": 1,
+            "refresco": {"$literal": refresco}
+        })
+        pipeline.extend([
+            {"$project": proyeccion},
             {
-                "$project": {
-                    "_id": 0,
-                    "nombre_tarea": "$nombre_tarea",
-                    "estado_tarea": "$estado.estado_tarea",
-                    "nombre_proyecto": "$proyecto.nombre_proyecto",
-                    "nombre_responsable": "$responsable.nombre_responsable",
-                    "apellido_responsable": "$responsable.apellido_responsable",
-                    "edad": "$responsable.edad",
-                    "grupo_etareo": "$grupo_etareo"
+                "$merge": {
+                    "into": ReporteModel.VISTA_MATERIALIZADA,
+                    "on": "_id",
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
                 }
-            },
-            {
-                "$sort": {"nombre_responsable": 1}
             }
         ])
+        return pipeline
+
+    @staticmethod
+    def refrescar_reporte_materializado(ids_tareas=None, ids_responsables=None, ids_proyectos=None, ids_estados=None):
+        """
+        Recalcula la vista materializada 'reporte_tareas' con $merge (MongoDB 4.2+).
+
+        Sin argumentos se recalcula completa. Si se indican ids, solo se recalculan las
+        tareas afectadas por esas tareas, responsables, proyectos o estados, y se eliminan
+        de la vista las que ya no existen o perdieron su proyecto/responsable; los ids
+        deben cubrir todo lo que cambió desde el refresco anterior.
+
+        Al terminar se registran las versiones de las fuentes leídas antes de empezar
+        (ver vista_vigente).
+
+        Returns:
+            int: Número de documentos eliminados de la vista.
+        """
+        condiciones = []
+        if ids_tareas:
+            condiciones.append({"_id": {"$in": list(ids_tareas)}})
+        if ids_responsables:
+            condiciones.append({"id_responsable": {"$in": list(ids_responsables)}})
+        if ids_proyectos:
+            condiciones.append({"id_proyecto": {"$in": list(ids_proyectos)}})
+        if ids_estados:
+            condiciones.append({"id_estado_tarea": {"$in": list(ids_estados)}})
+
+        completo = all(ids is None for ids in (ids_tareas, ids_responsables, ids_proyectos, ids_estados))
+        if not completo and not condiciones:
+            return 0
+        match = None if completo else {"$or": condiciones}
+
+        db = ReporteModel.collection
+        vista = db[ReporteModel.VISTA_MATERIALIZADA]
+        vista.create_indexes(ReporteModel.indices[ReporteModel.VISTA_MATERIALIZADA])
+
+        versiones = Versiones.obtener(ReporteModel._fuentes())
+        refresco = ObjectId()
+        ejecutar(db.tareas, ReporteModel.pipeline_reporte_tareas(match, refresco=refresco))
+
+        # Lo que quedó dentro del alcance del refresco sin la marca nueva ya no sale del join
+        obsoletos = dict(match or {})
+        obsoletos["refresco"] = {"$ne": refresco}
+        eliminados = vista.delete_many(obsoletos).deleted_count
+        Versiones.incrementar(vista)
+        Versiones.registrar_fuentes(vista, versiones)
+        return eliminados
+
+    @staticmethod
+    def _fuentes():
+        return [ReporteModel.collection[nombre] for nombre in ReporteModel.FUENTES]
+
+    @staticmethod
+    def vista_vigente():
+        """
+        True si la vista materializada existe y ninguna de sus fuentes cambió desde su
+        último refresco (según los contadores de _versiones).
+        """
+        return Versiones.vigente(ReporteModel.collection[ReporteModel.VISTA_MATERIALIZADA], ReporteModel._fuentes())
+
+    @staticmethod
+    def generar_reporte_tareas(filtrar_estados=None, match=None, modo="directo", campos=None, como_cursor=False,
+                               pagina=None, explain=None):
+        """
+        Pipeline de agregación para generar el reporte de tareas con todas las especificaciones.
         
-        return list(ReporteModel.collection.tareas.aggregate(pipeline))
\ No newline at end of file
+        Args:
+            filtrar_estados (list): Lista de estados a filtrar. Si es None, muestra todas las tareas.
+            match (dict): Filtro ya compilado con compilar_filtro_tareas.
+            modo (str): "directo" ejecuta el join completo; "materializado" lee la vista
+                'reporte_tareas' con un único recorrido por el índice de nombre_responsable.
+                Si la vista no existe o alguna fuente cambió desde su último refresco, se
+                responde en modo directo.
+            campos (list): Campos del reporte a retornar. En modo materializado se
+                proyectan en el find(), lo que permite consultas cubiertas por índice.
+            como_cursor (bool): Retorna el cursor sin materializarlo (para streaming).
+            pagina (Pagina): Retorna solo esa página (ResultadoPagina) en vez del reporte completo.
+                En modo materializado se ordena por (nombre_responsable, _id); en modo
+                directo, por el _id de la tarea.
+            explain (str): Verbosidad de explain. Si se indica, retorna el plan de la consulta
+                que se ejecutaría (ver explain.py) en lugar de los datos.
+        """
+        if modo not in ReporteModel.MODOS:
+            raise ValueError(f"modo inválido: '{modo}'. Valores permitidos: {', '.join(ReporteModel.MODOS)}")
+
+        if filtrar_estados:
+            match = dict(match or {})
+            match.update(ReporteModel.compilar_filtro_tareas({"estado": ",".join(filtrar_estados)}))
+
+        if modo == "materializado" and not ReporteModel.vista_vigente():
+            modo = "directo"
+
+        if pagina is not None:
+            if modo == "materializado":
+                return ReporteModel._pagina_reporte_tareas(match, campos, pagina, explain)
+            return ReporteModel._pagina_reporte_directo(match, campos, pagina, explain)
+
+        if modo == "materializado":
+            proyeccion = proyeccion_find(campos) or ReporteModel.PROYECCION_MATERIALIZADA
+            vista = ReporteModel.collection[ReporteModel.VISTA_MATERIALIZADA]
+            if explain:
+                return explicar_find(vista, match, proyeccion, [("nombre_responsable", 1)], verbosidad=explain)
+            cursor = vista.find(match or {}, proyeccion).sort("nombre_responsable", 1)
+        else:
+            pipeline = ReporteModel.pipeline_reporte_tareas(match, campos=campos)
+            if explain:
+                return explicar_aggregate(ReporteModel.collection.tareas, pipeline, explain)
+            cursor = ejecutar(ReporteModel.collection.tareas, pipeline)
+        return cursor if como_cursor else list(cursor)
+
+    @staticmethod
+    def _pagina_reporte_tareas(match, campos, pagina, explain=None):
+        """
+        Una página del reporte ordenada por (nombre_responsable, _id), servida por un
+        recorrido de rango sobre el índice compuesto de la vista materializada.
+        """
+        orden = ReporteModel.ORDEN_PAGINAS
+        campos = incluir_orden(campos, orden)
+        proyeccion = proyeccion_find(campos) or ReporteModel.PROYECCION_PAGINAS
+        vista = ReporteModel.collection[ReporteModel.VISTA_MATERIALIZADA]
+        return paginar_find(vista, match, proyeccion, pagina, orden, explain)
+
+    @staticmethod
+    def _pagina_reporte_directo(match, campos, pagina, explain=None):
+        """
+        Una página del join ordenada por el _id de la tarea: el keyset, el $sort y el
+        $limit recorren el índice de _id de 'tareas' y solo esa página pasa por los $lookup.
+
+        Las tareas que el join descarta (sin proyecto o responsable) cuentan para el cursor
+        pero no se retornan, así que una página puede traer menos de `limit` filas.
+        """
+        tareas = ReporteModel.collection.tareas
+        pipeline = ReporteModel.pipeline_reporte_tareas(match, campos=campos, pagina=pagina)
+        if explain:
+            return explicar_aggregate(tareas, pipeline, explain)
+        docs = list(ejecutar(tareas, pipeline))
+        total = contar_pipeline(tareas, ReporteModel.pipeline_reporte_tareas(match)) if pagina.con_total else None
+        resultado = ResultadoPagina(docs, pagina, ReporteModel.ORDEN_PAGINAS_DIRECTO, total)
+        resultado.data = [doc for doc in resultado.data if doc.pop("_completa")]
+        return resultado
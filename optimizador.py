@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Optimizador de los pipelines de agregación de los modelos.
+
+Los pipelines se escriben para que se lean bien; antes de ejecutarlos, todos
+los modelos los pasan por `ejecutar()`, que aplica estas reescrituras hasta
+que ninguna cambia nada:
+
+- unir_match: dos $match seguidos se combinan en uno.
+- adelantar_match: un $match se mueve antes de $sort, $lookup, $unwind,
+  $addFields/$set, $unset y $project cuando no usa ningún campo que esa etapa
+  crea, modifica o descarta. Así filtra antes de los joins.
+- proyectar_lookup: un $lookup sin sub-pipeline se convierte en la forma con
+  `pipeline: [{$project}]` (MongoDB 5.0+), que trae de la colección foránea
+  solo los campos que usan las etapas siguientes.
+- agrupar_top_n: $sort + $limit después de un $group (rankings) se expresa como
+  un $group con el acumulador $topN (MongoDB 5.2+), que conserva solo n
+  documentos y así aparece en el explain.
+
+Además agrega las opciones del aggregate: allowDiskUse si hay etapas
+bloqueantes ($sort, $group...) y un batchSize mayor al de PyMongo para los
+pipelines que retornan documentos.
+
+Las reescrituras son conservadoras: si no se puede demostrar que la etapa no
+cambia el resultado, el pipeline queda igual. Para comprobarlo sobre datos
+reales, `verificar` ejecuta el pipeline original y el optimizado de cada
+consulta registrada (indexes.consultas_registradas) y compara los resultados:
+
+    python optimizador.py verificar
+    python optimizador.py verificar --uri mongodb://localhost:27017/ --solo ventas
+    python optimizador.py mostrar SupermarketReporteModel.generar_reporte_ventas_detallado
+"""
+import argparse
+import copy
+import sys
+import time
+
+from bson import json_util
+
+# Etapas que necesitan ver todos sus documentos antes de emitir (pueden usar disco)
+ETAPAS_BLOQUEANTES = {"$sort", "$group", "$bucket", "$bucketAuto", "$sortByCount", "$setWindowFields", "$facet"}
+ETAPAS_ESCRITURA = {"$out", "$merge"}
+# Etapas después de las cuales un campo que no mencionan deja de existir
+ETAPAS_CIERRE = {"$group", "$replaceRoot", "$replaceWith", "$count", "$bucket", "$bucketAuto", "$sortByCount"}
+
+# Documentos por lote del cursor (PyMongo pide 101 en el primero y luego hasta 16 MB)
+TAMANO_LOTE = 1000
+# Primera versión con $lookup que combina localField/foreignField y pipeline
+VERSION_LOOKUP_CONCISO = (5, 0)
+# Primera versión con los acumuladores $topN/$bottomN
+VERSION_TOP_N = (5, 2)
+
+_versiones = {}
+
+
+def version_servidor(client):
+    """(mayor, menor) del servidor, consultado una vez por cliente. None si no se puede saber."""
+    clave = id(client)
+    if clave not in _versiones:
+        try:
+            _versiones[clave] = tuple(client.server_info()["versionArray"][:2])
+        except Exception:
+            _versiones[clave] = None
+    return _versiones[clave]
+
+
+def ejecutar(collection, pipeline, **opciones):
+    """`collection.aggregate` del pipeline optimizado, con las opciones de opciones_aggregate()."""
+    pipeline = optimizar(pipeline, version_servidor(collection.database.client))
+    return collection.aggregate(pipeline, **{**opciones_aggregate(pipeline), **opciones})
+
+
+def comando_aggregate(collection, pipeline):
+    """Comando aggregate (para explain) equivalente a lo que ejecutaría ejecutar()."""
+    pipeline = optimizar(pipeline, version_servidor(collection.database.client))
+    opciones = opciones_aggregate(pipeline)
+    comando = {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}}
+    if "batchSize" in opciones:
+        comando["cursor"]["batchSize"] = opciones["batchSize"]
+    if opciones.get("allowDiskUse"):
+        comando["allowDiskUse"] = True
+    return comando
+
+
+def optimizar_comando(collection, comando):
+    """El comando con su pipeline optimizado si es un aggregate; igual si es un find."""
+    if "aggregate" not in comando:
+        return comando
+    return comando_aggregate(collection, comando["pipeline"])
+
+
+def opciones_aggregate(pipeline):
+    """allowDiskUse si alguna etapa es bloqueante; batchSize si el pipeline retorna documentos."""
+    operadores = [_operador(etapa) for etapa in pipeline]
+    opciones = {}
+    if ETAPAS_BLOQUEANTES.intersection(operadores):
+        opciones["allowDiskUse"] = True
+    if not ETAPAS_ESCRITURA.intersection(operadores):
+        opciones["batchSize"] = TAMANO_LOTE
+    return opciones
+
+
+def optimizar(pipeline, version=None, aplicadas=None):
+    """
+    Aplica las reescrituras hasta llegar a un punto fijo. No modifica `pipeline`.
+
+    Args:
+        version (tuple): (mayor, menor) del servidor; sin ella no se usan las formas
+            que requieren MongoDB 5.0+ ($lookup conciso, $topN).
+        aplicadas (list): Si se indica, se le agregan los nombres de las reglas aplicadas.
+    """
+    etapas = copy.deepcopy(list(pipeline))
+    cambio = True
+    while cambio:
+        cambio = False
+        for nombre, regla, version_minima in REGLAS:
+            if version_minima and (version is None or version < version_minima):
+                continue
+            nuevas = regla(etapas)
+            if nuevas is None:
+                continue
+            etapas = nuevas
+            cambio = True
+            if aplicadas is not None and nombre not in aplicadas:
+                aplicadas.append(nombre)
+    return etapas
+
+
+def _operador(etapa):
+    return next(iter(etapa))
+
+
+def _ruta_unwind(valor):
+    ruta = valor["path"] if isinstance(valor, dict) else valor
+    return ruta[1:] if isinstance(ruta, str) and ruta.startswith("$") else None
+
+
+def _relacionados(a, b):
+    """True si una ruta es prefijo de la otra (o son iguales)."""
+    return a == b or a.startswith(b + ".") or b.startswith(a + ".")
+
+
+def _campos_match(condicion):
+    """Rutas que usa una condición de $match; None si usa $expr, $where, $text u otros operadores."""
+    campos = set()
+    for clave, valor in condicion.items():
+        if clave in ("$and", "$or", "$nor"):
+            for sub in valor:
+                sub_campos = _campos_match(sub)
+                if sub_campos is None:
+                    return None
+                campos |= sub_campos
+        elif clave == "$comment":
+            continue
+        elif clave.startswith("$"):
+            return None
+        else:
+            campos.add(clave)
+    return campos
+
+
+def _modo_project(proyeccion):
+    """Modo de un $project: "exclusion" si solo excluye campos, "inclusion" en otro caso."""
+    valores = [v for k, v in proyeccion.items() if k != "_id"] or [proyeccion.get("_id", 1)]
+    return "exclusion" if all(v in (0, False) for v in valores) else "inclusion"
+
+
+def _cruza(campos, etapa):
+    """True si un $match sobre `campos` no puede moverse antes de `etapa`."""
+    operador = _operador(etapa)
+    valor = etapa[operador]
+    if operador == "$sort":
+        return False
+    if operador == "$lookup":
+        return any(_relacionados(campo, valor["as"]) for campo in campos)
+    if operador == "$unwind":
+        tocados = [_ruta_unwind(valor)]
+        if isinstance(valor, dict) and valor.get("includeArrayIndex"):
+            tocados.append(valor["includeArrayIndex"])
+        return None in tocados or any(_relacionados(c, t) for c in campos for t in tocados)
+    if operador in ("$addFields", "$set"):
+        return any(_relacionados(c, t) for c in campos for t in valor)
+    if operador == "$unset":
+        tocados = [valor] if isinstance(valor, str) else valor
+        return any(_relacionados(c, t) for c in campos for t in tocados)
+    if operador == "$project":
+        if _modo_project(valor) == "exclusion":
+            return any(_relacionados(c, t) for c in campos for t in valor if valor[t] in (0, False))
+        for campo in campos:
+            if campo == "_id" or campo.startswith("_id."):
+                if valor.get("_id", 1) not in (1, True):
+                    return True
+                continue
+            # El campo tiene que pasar tal cual: incluido con 1 o como "$campo"
+            origen = next((k for k in valor if campo == k or campo.startswith(k + ".")), None)
+            if origen is None or valor[origen] not in (1, True, "$" + origen):
+                return True
+            if any(k != origen and _relacionados(campo, k) for k in valor):
+                return True
+        return False
+    return True
+
+
+def unir_match(etapas):
+    for i in range(len(etapas) - 1):
+        if _operador(etapas[i]) == "$match" and _operador(etapas[i + 1]) == "$match":
+            a, b = etapas[i]["$match"], etapas[i + 1]["$match"]
+            unido = {**a, **b} if not set(a) & set(b) else {"$and": [a, b]}
+            return etapas[:i] + [{"$match": unido}] + etapas[i + 2:]
+    return None
+
+
+def adelantar_match(etapas):
+    for i in range(1, len(etapas)):
+        if _operador(etapas[i]) != "$match":
+            continue
+        campos = _campos_match(etapas[i]["$match"])
+        if campos is None or _cruza(campos, etapas[i - 1]):
+            continue
+        return etapas[:i - 1] + [etapas[i], etapas[i - 1]] + etapas[i + 1:]
+    return None
+
+
+def _campos_usados(etapas, nombre):
+    """
+    Campos de primer nivel de `nombre` que usan `etapas`; None si se usa el
+    documento completo, si llega a la salida o si no se puede saber.
+    """
+    campos = set()
+
+    def recorrer(valor):
+        if isinstance(valor, str):
+            if valor == "$" + nombre:
+                return False
+            if valor.startswith("$" + nombre + "."):
+                campos.add(valor[len(nombre) + 2:].split(".")[0])
+            return True
+        if isinstance(valor, dict):
+            for clave, sub in valor.items():
+                if clave == nombre:
+                    return False
+                if clave.startswith(nombre + "."):
+                    campos.add(clave[len(nombre) + 1:].split(".")[0])
+                if not recorrer(sub):
+                    return False
+            return True
+        if isinstance(valor, list):
+            return all(recorrer(sub) for sub in valor)
+        return True
+
+    for etapa in etapas:
+        operador = _operador(etapa)
+        valor = etapa[operador]
+        if operador in ETAPAS_ESCRITURA or operador in ("$facet", "$unionWith"):
+            return None
+        if operador == "$unwind" and _ruta_unwind(valor) == nombre:
+            continue
+        if operador == "$lookup":
+            local = valor.get("localField", "")
+            if local == nombre:
+                return None
+            if local.startswith(nombre + "."):
+                campos.add(local[len(nombre) + 1:].split(".")[0])
+            if valor.get("as") == nombre:
+                return campos
+            if not recorrer({k: v for k, v in valor.items() if k not in ("localField", "foreignField", "from", "as")}):
+                return None
+            continue
+        if not recorrer(valor):
+            return None
+        if operador in ETAPAS_CIERRE or (operador == "$project" and _modo_project(valor) == "inclusion"):
+            return campos
+    return None
+
+
+def proyectar_lookup(etapas):
+    for i, etapa in enumerate(etapas):
+        if _operador(etapa) != "$lookup":
+            continue
+        union = etapa["$lookup"]
+        if "pipeline" in union or "localField" not in union:
+            continue
+        campos = _campos_usados(etapas[i + 1:], union["as"])
+        if campos is None:
+            continue
+        proyeccion = {campo: 1 for campo in sorted(campos)}
+        if "_id" not in campos:
+            proyeccion["_id"] = 0 if proyeccion else 1
+        nuevo = {"$lookup": {**union, "pipeline": [{"$project": proyeccion}]}}
+        return etapas[:i] + [nuevo] + etapas[i + 1:]
+    return None
+
+
+def agrupar_top_n(etapas):
+    # Solo detrás de un $group: ahí ningún índice puede servir el $sort
+    for i in range(1, len(etapas) - 1):
+        if (_operador(etapas[i - 1]) != "$group" or _operador(etapas[i]) != "$sort"
+                or _operador(etapas[i + 1]) != "$limit"):
+            continue
+        top = {"$topN": {"n": etapas[i + 1]["$limit"], "sortBy": etapas[i]["$sort"], "output": "$$ROOT"}}
+        nuevas = [
+            {"$group": {"_id": None, "top": top}},
+            {"$unwind": "$top"},
+            {"$replaceWith": "$top"}
+        ]
+        return etapas[:i] + nuevas + etapas[i + 2:]
+    return None
+
+
+# (nombre, regla, versión mínima del servidor)
+REGLAS = [
+    ("unir_match", unir_match, None),
+    ("adelantar_match", adelantar_match, None),
+    ("proyectar_lookup", proyectar_lookup, VERSION_LOOKUP_CONCISO),
+    ("agrupar_top_n", agrupar_top_n, VERSION_TOP_N),
+]
+
+
+def _canonico(doc):
+    return json_util.dumps(doc, sort_keys=True)
+
+
+def _claves_orden(pipeline):
+    """Campos del último $sort si ninguna etapa posterior cambia el orden de los documentos."""
+    for etapa in reversed(pipeline):
+        operador = _operador(etapa)
+        if operador == "$sort":
+            return list(etapa["$sort"])
+        if operador not in ("$project", "$addFields", "$set", "$unset", "$limit", "$match"):
+            return None
+    return None
+
+
+def comparar(collection, pipeline, version=None):
+    """
+    Ejecuta `pipeline` original y optimizado y compara los resultados: como multiconjunto
+    y, si el pipeline termina ordenado, también la secuencia de claves de orden.
+    Las etapas $out/$merge finales no se ejecutan: se comparan los documentos que escribirían.
+
+    Returns:
+        dict: equivalente, reglas aplicadas, filas y milisegundos de cada versión.
+    """
+    if pipeline and _operador(pipeline[-1]) in ETAPAS_ESCRITURA:
+        pipeline = pipeline[:-1]
+    aplicadas = []
+    optimizado = optimizar(pipeline, version, aplicadas)
+
+    inicio = time.perf_counter()
+    original = list(collection.aggregate(pipeline, allowDiskUse=True))
+    ms_original = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    nuevo = list(collection.aggregate(optimizado, **opciones_aggregate(optimizado)))
+    ms_optimizado = (time.perf_counter() - inicio) * 1000
+
+    equivalente = sorted(map(_canonico, original)) == sorted(map(_canonico, nuevo))
+    claves = _claves_orden(pipeline)
+    if equivalente and claves:
+        orden = lambda docs: [_canonico([doc.get(c) for c in claves]) for doc in docs]  # noqa: E731
+        equivalente = orden(original) == orden(nuevo)
+    return {
+        "equivalente": equivalente,
+        "reglas": aplicadas,
+        "filas": len(original),
+        "filas_optimizado": len(nuevo),
+        "ms_original": round(ms_original, 3),
+        "ms_optimizado": round(ms_optimizado, 3)
+    }
+
+
+def verificar(solo=None):
+    """Compara original y optimizado para cada aggregate de indexes.consultas_registradas()."""
+    import indexes
+
+    resultados = []
+    for nombre, collection, comando in indexes.consultas_registradas():
+        if "aggregate" not in comando or (solo and solo.lower() not in nombre.lower()):
+            continue
+        version = version_servidor(collection.database.client)
+        resultados.append({"consulta": nombre, **comparar(collection, comando["pipeline"], version)})
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimizador de los pipelines de los reportes")
+    parser.add_argument("accion", choices=["verificar", "mostrar"])
+    parser.add_argument("consulta", nargs="?", help="nombre (o parte) de la consulta registrada")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--solo", help="verificar solo las consultas cuyo nombre contiene este texto")
+    args = parser.parse_args()
+
+    import indexes
+    from conexion import ConexionMongo
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        indexes.inicializar_modelos()
+        if args.accion == "mostrar":
+            for nombre, collection, comando in indexes.consultas_registradas():
+                if "aggregate" not in comando or (args.consulta and args.consulta.lower() not in nombre.lower()):
+                    continue
+                aplicadas = []
+                optimizado = optimizar(comando["pipeline"], version_servidor(collection.database.client), aplicadas)
+                print(f"# {nombre}: {', '.join(aplicadas) or 'sin cambios'}")
+                print(json_util.dumps(optimizado, indent=2, ensure_ascii=False))
+            return 0
+
+        fallidas = 0
+        for r in verificar(args.solo or args.consulta):
+            estado = "OK" if r["equivalente"] else "DIFERENTE"
+            fallidas += not r["equivalente"]
+            print(f"{r['consulta']:<62} {estado:<10} {', '.join(r['reglas']) or 'sin cambios'}")
+            print(f"    filas: {r['filas']} / {r['filas_optimizado']}, "
+                  f"ms: {r['ms_original']} -> {r['ms_optimizado']}")
+        return 1 if fallidas else 0
+    finally:
+        ConexionMongo.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
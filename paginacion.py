@@ -0,0 +1,170 @@
+"""
+Paginación por cursor (keyset) para listados y reportes.
+
+`?limit=N` pide una página de N documentos y la respuesta incluye `siguiente`,
+un cursor opaco con los valores de la clave de orden del último documento.
+`?after=<cursor>` continúa desde ahí con un filtro de rango sobre la clave de
+orden (nunca con $skip), así cada página cuesta O(página) a cualquier
+profundidad. El total es opcional (`?total=1`) y se calcula con un conteo aparte.
+"""
+import base64
+import binascii
+
+from bson import json_util
+from flask import request
+
+from explain import explicar_find
+from optimizador import ejecutar
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 10000
+
+# Orden de los listados simples: por _id
+ORDEN_ID = [("_id", 1)]
+
+_ETAPAS_SIN_FILTRO = {"$project", "$addFields", "$sort"}
+
+
+class Pagina:
+    """Tamaño de página, posición (valores de la clave de orden) y si se pide el total."""
+
+    def __init__(self, limite, despues=None, con_total=False):
+        self.limite = limite
+        self.despues = despues
+        self.con_total = con_total
+
+
+class ResultadoPagina:
+    """Página ya recortada con el cursor a la siguiente (None si es la última)."""
+
+    def __init__(self, docs, pagina, orden, total=None):
+        # Los modelos piden limite + 1 documentos para saber si hay otra página
+        self.data = docs[:pagina.limite]
+        self.limite = pagina.limite
+        self.total = total
+        self.siguiente = None
+        if len(docs) > pagina.limite and self.data:
+            self.siguiente = codificar_cursor([_valor(self.data[-1], campo) for campo, _ in orden])
+
+    def sobre(self, **extra):
+        """Respuesta JSON de la página con los campos adicionales del endpoint."""
+        respuesta = {"success": True}
+        respuesta.update(extra)
+        respuesta.update({"limit": self.limite, "siguiente": self.siguiente, "data": self.data})
+        if self.total is not None:
+            respuesta["total"] = self.total
+        return respuesta
+
+
+def _valor(doc, campo):
+    valor = doc
+    for parte in campo.split("."):
+        valor = valor.get(parte) if isinstance(valor, dict) else None
+    return valor
+
+
+def codificar_cursor(valores):
+    texto = json_util.dumps(valores)
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json_util.loads(base64.urlsafe_b64decode(cursor + relleno).decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Cursor 'after' inválido")
+    if not isinstance(valores, list):
+        raise ValueError("Cursor 'after' inválido")
+    return valores
+
+
+def pagina_solicitada():
+    """Lee ?limit=, ?after= y ?total= de la petición. None si no se pidió paginación."""
+    limite = request.args.get("limit")
+    despues = request.args.get("after")
+    if not limite and not despues:
+        return None
+    try:
+        limite = int(limite) if limite else LIMITE_POR_DEFECTO
+    except ValueError:
+        raise ValueError("El parámetro 'limit' debe ser un entero")
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        raise ValueError(f"limit debe estar entre 1 y {LIMITE_MAXIMO}")
+    con_total = request.args.get("total", "").lower() in ("1", "true")
+    return Pagina(limite, decodificar_cursor(despues) if despues else None, con_total)
+
+
+def filtro_keyset(orden, valores):
+    """
+    Condición "estrictamente después de `valores`" para una clave de orden compuesta.
+    Para [(a, 1), (b, -1)] produce {$or: [{a: {$gt: va}}, {a: va, b: {$lt: vb}}]}.
+    """
+    if len(valores) != len(orden):
+        raise ValueError("Cursor 'after' inválido para este listado")
+    condiciones = []
+    for i, (campo, direccion) in enumerate(orden):
+        condicion = {orden[j][0]: valores[j] for j in range(i)}
+        condicion[campo] = {"$gt" if direccion == 1 else "$lt": valores[i]}
+        condiciones.append(condicion)
+    return {"$or": condiciones}
+
+
+def combinar_filtros(*filtros):
+    filtros = [f for f in filtros if f]
+    if not filtros:
+        return {}
+    return filtros[0] if len(filtros) == 1 else {"$and": filtros}
+
+
+def incluir_orden(campos, orden):
+    """Asegura que una proyección incluya los campos de la clave de orden (para el cursor)."""
+    if not campos:
+        return campos
+    return campos + [campo for campo, _ in orden if campo not in campos]
+
+
+def paginar_find(collection, filtro, proyeccion, pagina, orden=ORDEN_ID, explain=None):
+    """
+    Página de un find() servida por un recorrido de rango sobre el índice de la clave de orden.
+    Con `explain` (verbosidad) retorna el plan de esa consulta en vez de la página.
+    """
+    condicion = filtro_keyset(orden, pagina.despues) if pagina.despues is not None else None
+    if explain:
+        return explicar_find(collection, combinar_filtros(filtro, condicion), proyeccion, orden,
+                             pagina.limite + 1, explain)
+    cursor = collection.find(combinar_filtros(filtro, condicion), proyeccion)
+    docs = list(cursor.sort(orden).limit(pagina.limite + 1))
+    total = collection.count_documents(filtro or {}) if pagina.con_total else None
+    return ResultadoPagina(docs, pagina, orden, total)
+
+
+def etapas_pagina(pagina, orden):
+    """Etapas $match (keyset) + $sort + $limit para paginar un pipeline."""
+    etapas = []
+    if pagina.despues is not None:
+        etapas.append({"$match": filtro_keyset(orden, pagina.despues)})
+    etapas.append({"$sort": dict(orden)})
+    etapas.append({"$limit": pagina.limite + 1})
+    return etapas
+
+
+def contar_pipeline(collection, pipeline):
+    """
+    Total de un reporte: el mismo pipeline terminado en $count, sin las etapas
+    que no cambian el número de filas ($project, $addFields, $sort).
+    """
+    etapas = [etapa for etapa in pipeline if not _ETAPAS_SIN_FILTRO.intersection(etapa)]
+    resultado = list(ejecutar(collection, etapas + [{"$count": "total"}]))
+    return resultado[0]["total"] if resultado else 0
+
+
+def paginar_lista(docs, pagina, orden=ORDEN_ID):
+    """Página en memoria para datos que ya están en caché (dimensiones)."""
+    clave = lambda doc: tuple(_valor(doc, campo) for campo, _ in orden)  # noqa: E731
+    docs = sorted(docs, key=clave)
+    if pagina.despues is not None:
+        despues = tuple(pagina.despues)
+        docs = [doc for doc in docs if clave(doc) > despues]
+    total = len(docs) if pagina.con_total else None
+    return ResultadoPagina(docs[:pagina.limite + 1], pagina, orden, total)
@@ -0,0 +1,77 @@
+"""
+Parámetro de proyección `?fields=` compartido por todos los blueprints.
+
+`?fields=nombre,precio` se traduce en una proyección de MongoDB para find()
+o en un $project final para los pipelines de agregación, de modo que los
+campos que no se piden no se leen, no viajan por la red y no se serializan.
+`_id` solo se incluye si se pide explícitamente, lo que permite que las
+consultas sobre campos indexados se resuelvan solo con el índice (covered query).
+"""
+import re
+
+from flask import request
+
+_CAMPO_VALIDO = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def parsear_campos(valor):
+    """
+    Convierte "a,b,c.d" en ["a", "b", "c.d"].
+
+    Returns:
+        list | None: None si no se pidió proyección.
+    Raises:
+        ValueError: si algún nombre de campo no es válido (p. ej. contiene '$').
+    """
+    if not valor:
+        return None
+    campos = []
+    for campo in valor.split(","):
+        campo = campo.strip()
+        if not campo:
+            continue
+        if not _CAMPO_VALIDO.match(campo):
+            raise ValueError(f"Campo inválido en 'fields': '{campo}'")
+        if campo not in campos:
+            campos.append(campo)
+    return campos or None
+
+
+def campos_solicitados():
+    """Lee y valida ?fields= de la petición actual."""
+    return parsear_campos(request.args.get("fields"))
+
+
+def proyeccion_find(campos):
+    """Proyección para find(); None si no hay campos."""
+    if not campos:
+        return None
+    proyeccion = {campo: 1 for campo in campos}
+    if "_id" not in proyeccion:
+        proyeccion["_id"] = 0
+    return proyeccion
+
+
+def etapa_project(campos):
+    """Etapa $project final para un pipeline de agregación."""
+    return {"$project": proyeccion_find(campos)}
+
+
+def proyectar_documento(doc, campos):
+    """Aplica la proyección en memoria (para datos que ya están en caché)."""
+    if not campos:
+        return doc
+    resultado = {}
+    for campo in campos:
+        partes = campo.split(".")
+        valor = doc
+        for parte in partes:
+            if not isinstance(valor, dict) or parte not in valor:
+                break
+            valor = valor[parte]
+        else:
+            destino = resultado
+            for parte in partes[:-1]:
+                destino = destino.setdefault(parte, {})
+            destino[partes[-1]] = valor
+    return resultado
@@ -1,171 +1,196 @@
 #!/usr/bin/env python3
 """
-Script para mostrar el pipeline de agregación completo
+Script para mostrar el pipeline de agregación que ejecutan los modelos y,
+opcionalmente, cómo lo ejecuta MongoDB (explain).
+
+El pipeline sale de los mismos métodos que usan los endpoints
+(ReporteModel.pipeline_reporte_tareas, SupermarketReporteModel...), así que
+nunca se desfasa de lo que corre la API. También se muestra la versión que
+envía optimizador.py y las reescrituras que aplicó.
+
+Uso:
+    python show_pipeline.py                                   # reporte de tareas
+    python show_pipeline.py tareas --estado Pendiente --explain
+    python show_pipeline.py tareas --modo materializado --explain
+    python show_pipeline.py ventas-detallado --explain executionStats --json
+    python show_pipeline.py ventas-detallado --desde 2025-09-01 --hasta 2025-09-30 --explain
 """
-import json
-from pymongo import MongoClient
+import argparse
+
+from bson import json_util
+
+from conexion import ConexionMongo
+from explain import VERBOSIDADES, describir_pipeline
+from indexes import inicializar_modelos
+from optimizador import optimizar, version_servidor
+from models import ReporteModel
+from supermarket_models import SupermarketReporteModel
+
+
+def _filtro_tareas(args):
+    params = {
+        "estado": args.estado,
+        "id_proyecto": args.id_proyecto,
+        "id_responsable": args.id_responsable,
+        "grupo_etareo": args.grupo_etareo,
+    }
+    return ReporteModel.compilar_filtro_tareas({k: v for k, v in params.items() if v})
+
+
+def _rango(args):
+    return {"desde": args.desde, "hasta": args.hasta}
+
 
-def show_pipeline():
+# reporte -> (pipeline(args), explain(args, verbosidad))
+REPORTES = {
+    "tareas": (
+        lambda args: ReporteModel.pipeline_reporte_tareas(_filtro_tareas(args)),
+        lambda args, verbosidad: ReporteModel.generar_reporte_tareas(
+            match=_filtro_tareas(args), modo=args.modo, explain=verbosidad)
+    ),
+    "ventas-detallado": (
+        lambda args: SupermarketReporteModel.pipeline_reporte_ventas_detallado(**_rango(args)),
+        lambda args, verbosidad: SupermarketReporteModel.generar_reporte_ventas_detallado(
+            explain=verbosidad, **_rango(args))
+    ),
+    "ventas-por-categoria": (
+        lambda args: SupermarketReporteModel.pipeline_reporte_ventas_por_categoria(**_rango(args)),
+        lambda args, verbosidad: SupermarketReporteModel.generar_reporte_ventas_por_categoria(
+            explain=verbosidad, **_rango(args))
+    ),
+    "top-productos": (
+        lambda args: SupermarketReporteModel.pipeline_top_productos(args.n, args.categoria, **_rango(args)),
+        lambda args, verbosidad: SupermarketReporteModel.generar_top_productos(
+            args.n, args.categoria, explain=verbosidad, **_rango(args))
+    ),
+    "top-clientes": (
+        lambda args: SupermarketReporteModel.pipeline_top_clientes(args.n, args.categoria, **_rango(args)),
+        lambda args, verbosidad: SupermarketReporteModel.generar_top_clientes(
+            args.n, args.categoria, explain=verbosidad, **_rango(args))
+    ),
+    "ventas-con-productos": (
+        lambda args: SupermarketReporteModel.pipeline_ventas_con_productos_unidos(**_rango(args)),
+        lambda args, verbosidad: SupermarketReporteModel.generar_ventas_con_productos_unidos(
+            explain=verbosidad, **_rango(args))
+    ),
+}
+
+
+def show_pipeline(pipeline, titulo):
     """
-    Muestra el pipeline de agregación completo con explicaciones
+    Muestra los pasos y el JSON del pipeline
     """
     print("=" * 80)
-    print("[PIPELINE] PIPELINE DE AGREGACION PARA REPORTE DE TAREAS")
+    print(f"[PIPELINE] {titulo}")
     print("=" * 80)
-    
-   
-    pipeline = [
-
-        # {
-        #     "$match": {
-        #         "id_estado_tarea": {
-        #             "$in": [ObjectId("estado_pendiente_id"), ObjectId("estado_terminada_id")]
-        #         }
-        #     }
-        # },
-
-        {
-            "$lookup": {
-                "from": "proyectos",
-                "localField": "id_proyecto", 
-                "foreignField": "_id",
-                "as": "proyecto"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "responsables",
-                "localField": "id_responsable",
-                "foreignField": "_id", 
-                "as": "responsable"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "estados_tarea",
-                "localField": "id_estado_tarea",
-                "foreignField": "_id",
-                "as": "estado"
-            }
-        },
-        {
-            "$unwind": "$proyecto"
-        },
-        {
-            "$unwind": "$responsable"
-        },
-        {
-            "$unwind": "$estado"
-        },
-        {
-            "$addFields": {
-                "grupo_etareo": {
-                    "$cond": {
-                        "if": {
-                            "$and": [
-                                {"$gt": ["$responsable.edad", 17]},
-                                {"$lte": ["$responsable.edad", 30]}
-                            ]
-                        },
-                        "then": "adulto joven",
-                        "else": {
-                            "$cond": {
-                                "if": {
-                                    "$and": [
-                                        {"$gt": ["$responsable.edad", 30]},
-                                        {"$lte": ["$responsable.edad", 50]}
-                                    ]
-                                },
-                                "then": "adulto medio",
-                                "else": {
-                                    "$cond": {
-                                        "if": {"$gt": ["$responsable.edad", 50]},
-                                        "then": "adulto mayor",
-                                        "else": "sin clasificar"
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "nombre_tarea": "$nombre_tarea",
-                "estado_tarea": "$estado.estado_tarea",
-                "nombre_proyecto": "$proyecto.nombre_proyecto",
-                "nombre_responsable": "$responsable.nombre_responsable",
-                "apellido_responsable": "$responsable.apellido_responsable",
-                "edad": "$responsable.edad",
-                "grupo_etareo": "$grupo_etareo"
-            }
-        },
-        {
-            "$sort": {"nombre_responsable": 1}
-        }
-    ]
-    
+
     print("\n[STEPS] PASOS DEL PIPELINE:")
     print("-" * 50)
-    
-    steps = [
-        ("0. $match (OPCIONAL)", "Filtra tareas por estado - COMENTADO para mostrar todas"),
-        ("1. $lookup (proyectos)", "Une tareas con proyectos usando id_proyecto"),
-        ("2. $lookup (responsables)", "Une tareas con responsables usando id_responsable"),
-        ("3. $lookup (estados)", "Une tareas con estados usando id_estado_tarea"),
-        ("4. $unwind (proyecto)", "Aplana el array de proyecto (1 documento por tarea)"),
-        ("5. $unwind (responsable)", "Aplana el array de responsable (1 documento por tarea)"),
-        ("6. $unwind (estado)", "Aplana el array de estado (1 documento por tarea)"),
-        ("7. $addFields (grupo_etareo)", "Calcula grupo etáreo usando $cond con if/else anidados"),
-        ("8. $project", "Selecciona solo los campos requeridos en el reporte"),
-        ("9. $sort", "Ordena alfabéticamente por nombre del responsable")
-    ]
-    
-    for step, description in steps:
-        print(f"  {step:<25} - {description}")
-    
-    print("\n[FILTER] FILTRO POR ESTADO:")
+    for paso in describir_pipeline(pipeline):
+        print(f"  {paso}")
+
+    print("\n[JSON] PIPELINE COMPLETO (JSON):")
     print("-" * 50)
-    print("  • COMENTADO: Muestra TODAS las tareas (pendientes, terminadas, vencidas)")
-    print("  • DESCOMENTADO: Muestra solo tareas PENDIENTES y TERMINADAS")
-    print("  • Para activar: Descomenta la sección $match en el pipeline")
-    print("  • Para desactivar: Comenta la sección $match en el pipeline")
-    
-    print("\n[CONDITIONS] CONDICIONES DEL GRUPO ETAREO:")
+    print(json_util.dumps(pipeline, indent=2, ensure_ascii=False))
+
+
+def show_optimizado(pipeline):
+    """
+    Muestra el pipeline que realmente se ejecuta tras las reescrituras del optimizador
+    """
+    aplicadas = []
+    optimizado = optimizar(pipeline, version_servidor(ConexionMongo.client), aplicadas)
+    print("\n[OPT] PIPELINE OPTIMIZADO:")
     print("-" * 50)
-    print("  • 18-30 años: 'adulto joven'")
-    print("  • 31-50 años: 'adulto medio'") 
-    print("  • 51+ años: 'adulto mayor'")
-    print("  • Otros: 'sin clasificar'")
-    
-    print("\n[FIELDS] CAMPOS DEL REPORTE FINAL:")
+    print(f"  reescrituras: {', '.join(aplicadas) or 'ninguna'}")
+    if aplicadas:
+        for paso in describir_pipeline(optimizado):
+            print(f"  {paso}")
+
+
+def show_explain(plan, completo=False):
+    """
+    Muestra el resumen del plan de ejecución por etapa
+    """
+    print("\n" + "=" * 80)
+    print(f"[EXPLAIN] {plan['coleccion']} ({plan['verbosidad']}, motor {plan['motor']}, "
+          f"{plan['tiempo_total_ms']} ms)")
+    print("=" * 80)
+
+    print(f"\n  {'etapa':<22} {'docs entrada':>13} {'docs salida':>12} {'ms propios':>11}  indices / estrategia")
+    for etapa in plan["etapas"]:
+        detalle = ", ".join(etapa.get("indices", []))
+        if etapa.get("estrategia"):
+            detalle = f"{etapa['estrategia']} {detalle}".strip()
+        print(f"  {etapa['etapa']:<22} {_celda(etapa.get('docs_entrada')):>13} {_celda(etapa.get('docs_salida')):>12} "
+              f"{_celda(etapa.get('tiempo_propio_ms', etapa.get('tiempo_ms'))):>11}  {detalle}")
+        for nodo in etapa.get("plan", []):
+            extra = ", ".join(nodo.get("indices", []))
+            if nodo.get("estrategia"):
+                extra = f"{nodo['estrategia']} -> {nodo.get('coleccion_foranea')} {extra}".strip()
+            print(f"    - {nodo['etapa']:<18} {'':>13} {_celda(nodo.get('docs_salida')):>12} "
+                  f"{_celda(nodo.get('tiempo_ms')):>11}  {extra}")
+
+    print("\n[LOOKUP] ESTRATEGIAS DE JOIN:")
     print("-" * 50)
-    fields = [
-        "nombre_tarea",
-        "estado_tarea", 
-        "nombre_proyecto",
-        "nombre_responsable",
-        "apellido_responsable",
-        "edad",
-        "grupo_etareo"
-    ]
-    
-    for field in fields:
-        print(f"  • {field}")
-    
-    print("\n[JSON] PIPELINE COMPLETO (JSON):")
+    for lookup in plan["lookups"] or [{"coleccion_foranea": "(sin $lookup o sin executionStats)"}]:
+        print(f"  • {lookup.get('coleccion_foranea')}: {lookup.get('estrategia', '-')} "
+              f"{', '.join(lookup.get('indices', []))}".rstrip())
+
+    print("\n[STATS] TOTALES:")
     print("-" * 50)
-    print(json.dumps(pipeline, indent=2, ensure_ascii=False))
-    
+    for clave, valor in plan["estadisticas"].items():
+        print(f"  • {clave}: {valor}")
+    print(f"  • problemas: {', '.join(plan['problemas']) or 'ninguno'}")
+
+    if completo:
+        print("\n[JSON] EXPLAIN COMPLETO:")
+        print("-" * 50)
+        print(json_util.dumps(plan["explain"], indent=2, ensure_ascii=False))
+
+
+def _celda(valor):
+    return "-" if valor is None else valor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muestra el pipeline real de un reporte y su plan de ejecución")
+    parser.add_argument("reporte", nargs="?", default="tareas", choices=list(REPORTES))
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--explain", nargs="?", const="executionStats", choices=VERBOSIDADES,
+                        help="ejecutar explain con esta verbosidad (por defecto executionStats)")
+    parser.add_argument("--json", action="store_true", help="imprimir también el explain completo")
+    parser.add_argument("--modo", default="directo", choices=ReporteModel.MODOS, help="solo para el reporte de tareas")
+    parser.add_argument("--estado", help="filtros del reporte de tareas (como /reportes/tareas/filtro)")
+    parser.add_argument("--id-proyecto")
+    parser.add_argument("--id-responsable")
+    parser.add_argument("--grupo-etareo")
+    parser.add_argument("--desde", help="fecha inicial AAAA-MM-DD de los reportes de ventas (como ?desde=)")
+    parser.add_argument("--hasta", help="fecha final AAAA-MM-DD, inclusiva")
+    parser.add_argument("--n", help="tamaño de los rankings top-productos y top-clientes")
+    parser.add_argument("--categoria", help="id o nombre de categoría de los rankings")
+    args = parser.parse_args()
+
+    ConexionMongo.init({"MONGO_URI": args.uri})
+    try:
+        inicializar_modelos()
+        pipeline, explicar = REPORTES[args.reporte]
+        try:
+            show_pipeline(pipeline(args), f"PIPELINE DEL REPORTE {args.reporte.upper()}")
+            show_optimizado(pipeline(args))
+            if args.explain:
+                show_explain(explicar(args, args.explain), args.json)
+        except ValueError as e:
+            parser.error(str(e))
+    finally:
+        ConexionMongo.cerrar()
+
     print("\n[USAGE] COMO USAR:")
     print("-" * 50)
-    print("  • API: GET http://localhost:5000/reportes/tareas")
+    print("  • API: GET http://localhost:5000/reportes/tareas?explain=executionStats")
     print("  • Pipeline: GET http://localhost:5000/pipeline")
-    print("  • MongoDB: db.tareas.aggregate([...pipeline...])")
-    
     print("\n" + "=" * 80)
 
+
 if __name__ == "__main__":
-    show_pipeline()
+    main()
@@ -0,0 +1,83 @@
+"""
+Respuestas en streaming (NDJSON) para los endpoints de listados y reportes.
+
+Se activa con el header `Accept: application/x-ndjson` o con `?stream=1`.
+Cada documento se escribe en su propia línea a medida que llega del cursor
+de PyMongo; la última línea es el sobre {"success": ..., "total": ...}.
+"""
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+TIPO_NDJSON = "application/x-ndjson"
+BATCH_SIZE_POR_DEFECTO = 500
+BATCH_SIZE_MAXIMO = 10000
+
+
+def quiere_stream():
+    """Indica si el cliente pidió la respuesta en modo streaming."""
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        return True
+    return any(tipo == TIPO_NDJSON for tipo, _ in request.accept_mimetypes)
+
+
+def obtener_batch_size(por_defecto=BATCH_SIZE_POR_DEFECTO):
+    """Lee ?batch_size= (documentos por lote del cursor y por escritura al cliente)."""
+    valor = request.args.get("batch_size")
+    if not valor:
+        return por_defecto
+    try:
+        batch_size = int(valor)
+    except ValueError:
+        raise ValueError("El parámetro 'batch_size' debe ser un entero")
+    if not 1 <= batch_size <= BATCH_SIZE_MAXIMO:
+        raise ValueError(f"batch_size debe estar entre 1 y {BATCH_SIZE_MAXIMO}")
+    return batch_size
+
+
+def _linea(doc):
+    # Mismo serializador que jsonify (ver json_provider.py), en modo compacto
+    return current_app.json.dumps(doc) + "\n"
+
+
+def respuesta_stream(cursor, **sobre):
+    """
+    Construye una respuesta NDJSON que recorre `cursor` por lotes.
+
+    Args:
+        cursor: Cursor de PyMongo (find o aggregate) o cualquier iterable de documentos.
+        **sobre: Campos adicionales para la línea final (p. ej. filtro_aplicado).
+    """
+    try:
+        batch_size = obtener_batch_size()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if hasattr(cursor, "batch_size"):
+        cursor.batch_size(batch_size)
+
+    def generar():
+        total = 0
+        lote = []
+        try:
+            for doc in cursor:
+                lote.append(_linea(doc))
+                total += 1
+                if len(lote) >= batch_size:
+                    yield "".join(lote)
+                    lote = []
+        except Exception as e:
+            lote.append(_linea({"success": False, "error": str(e), "total": total}))
+            yield "".join(lote)
+            return
+        finally:
+            if hasattr(cursor, "close"):
+                cursor.close()
+
+        trailer = {"success": True, "total": total}
+        trailer.update(sobre)
+        lote.append(_linea(trailer))
+        yield "".join(lote)
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype=TIPO_NDJSON,
+        headers={"X-Accel-Buffering": "no"}
+    )
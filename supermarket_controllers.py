@@ -4,24 +4,45 @@ Controladores para la base de datos Supermarket
 from flask import Blueprint, jsonify, request
 from supermarket_models import (
     CategoriaModel, ProveedorModel, ClienteModel, 
-    ProductoModel, VentaModel, SupermarketReporteModel
+    ProductoModel, VentaModel, VentaDiariaModel, ClienteStatsModel, SupermarketReporteModel
 )
+from streaming import quiere_stream, respuesta_stream
+from versioning import condicional
+from proyeccion import campos_solicitados
+from paginacion import LIMITE_POR_DEFECTO, Pagina, pagina_solicitada
+from explain import explain_solicitado
+from exportar import columnas_exportacion, formato_solicitado, respuesta_exportacion
 
 # Blueprint para Supermarket
 supermarket_bp = Blueprint("supermarket", __name__)
 
+
+def rango_solicitado():
+    """?desde=&hasta= (AAAA-MM-DD, inclusivos); el modelo los valida y los traduce a un $match sobre fecha."""
+    return {"desde": request.args.get("desde"), "hasta": request.args.get("hasta")}
+
+
 # Endpoints para Categorías
 @supermarket_bp.route("/supermarket/categorias", methods=["GET"])
 def get_categorias():
     try:
-        categorias = CategoriaModel.get_all_categorias()
-        for c in categorias:
-            c["_id"] = str(c["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(CategoriaModel.get_all_categorias(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(CategoriaModel.get_all_categorias(campos, como_cursor=True))
+        categorias = CategoriaModel.get_all_categorias(campos)
         return jsonify({
             "success": True,
             "total": len(categorias),
             "data": categorias
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -32,14 +53,23 @@ def get_categorias():
 @supermarket_bp.route("/supermarket/proveedores", methods=["GET"])
 def get_proveedores():
     try:
-        proveedores = ProveedorModel.get_all_proveedores()
-        for p in proveedores:
-            p["_id"] = str(p["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(ProveedorModel.get_all_proveedores(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(ProveedorModel.get_all_proveedores(campos, como_cursor=True))
+        proveedores = ProveedorModel.get_all_proveedores(campos)
         return jsonify({
             "success": True,
             "total": len(proveedores),
             "data": proveedores
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -50,14 +80,75 @@ def get_proveedores():
 @supermarket_bp.route("/supermarket/clientes", methods=["GET"])
 def get_clientes():
     try:
-        clientes = ClienteModel.get_all_clientes()
-        for c in clientes:
-            c["_id"] = str(c["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(ClienteModel.get_all_clientes(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(ClienteModel.get_all_clientes(campos, como_cursor=True))
+        clientes = ClienteModel.get_all_clientes(campos)
         return jsonify({
             "success": True,
             "total": len(clientes),
             "data": clientes
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@supermarket_bp.route("/supermarket/clientes/<int:cliente_id>/ventas", methods=["GET"])
+@condicional(VentaModel)
+def get_ventas_cliente(cliente_id):
+    """
+    Historial de compras del cliente, de la más reciente a la más antigua, siempre paginado
+    (?limit=, por defecto 100, y ?after=) sobre el índice (cliente_id, fecha, _id).
+    Acepta ?desde=&hasta= (AAAA-MM-DD, inclusivos).
+    """
+    try:
+        campos = campos_solicitados()
+        pagina = pagina_solicitada() or Pagina(LIMITE_POR_DEFECTO)
+        rango = rango_solicitado()
+        resultado = VentaModel.get_ventas_por_cliente(cliente_id, campos, pagina=pagina, **rango)
+        return jsonify(resultado.sobre(cliente_id=cliente_id, **rango)), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@supermarket_bp.route("/supermarket/clientes/<int:cliente_id>/resumen", methods=["GET"])
+@condicional(ClienteStatsModel, ClienteModel, CategoriaModel)
+def get_resumen_cliente(cliente_id):
+    """
+    Resumen del cliente desde clientes_stats (un documento): compras, total gastado,
+    ticket promedio, primera y última compra y categoría favorita.
+    """
+    try:
+        resumen = ClienteStatsModel.get_resumen(cliente_id)
+        if resumen is None:
+            if ClienteModel.get_cliente(cliente_id) is None:
+                return jsonify({
+                    "success": False,
+                    "error": "Cliente no encontrado"
+                }), 404
+            resumen = {"cliente_id": cliente_id, "compras": 0, "total_gastado": 0, "primera_compra": None,
+                       "ultima_compra": None, "ticket_promedio": 0, "categoria_favorita": None}
+        return jsonify({
+            "success": True,
+            "data": resumen
+        }), 200
     except Exception as e:
         return jsonify({
             "success": False,
@@ -68,14 +159,23 @@ def get_clientes():
 @supermarket_bp.route("/supermarket/productos", methods=["GET"])
 def get_productos():
     try:
-        productos = ProductoModel.get_all_productos()
-        for p in productos:
-            p["_id"] = str(p["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            return jsonify(ProductoModel.get_all_productos(campos, pagina=pagina).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(ProductoModel.get_all_productos(campos, como_cursor=True))
+        productos = ProductoModel.get_all_productos(campos)
         return jsonify({
             "success": True,
             "total": len(productos),
             "data": productos
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -85,15 +185,25 @@ def get_productos():
 @supermarket_bp.route("/supermarket/productos/categoria/<int:categoria_id>", methods=["GET"])
 def get_productos_por_categoria(categoria_id):
     try:
-        productos = ProductoModel.get_productos_por_categoria(categoria_id)
-        for p in productos:
-            p["_id"] = str(p["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        if pagina is not None:
+            resultado = ProductoModel.get_productos_por_categoria(categoria_id, campos, pagina=pagina)
+            return jsonify(resultado.sobre(categoria_id=categoria_id)), 200
+        if quiere_stream():
+            return respuesta_stream(ProductoModel.get_productos_por_categoria(categoria_id, campos, como_cursor=True), categoria_id=categoria_id)
+        productos = ProductoModel.get_productos_por_categoria(categoria_id, campos)
         return jsonify({
             "success": True,
             "categoria_id": categoria_id,
             "total": len(productos),
             "data": productos
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -103,15 +213,55 @@ def get_productos_por_categoria(categoria_id):
 # Endpoints para Ventas
 @supermarket_bp.route("/supermarket/ventas", methods=["GET"])
 def get_ventas():
+    """
+    Lista de ventas. Acepta ?desde=&hasta= (AAAA-MM-DD, inclusivos), que se resuelven
+    con un recorrido de rango sobre el índice de fecha.
+    """
     try:
-        ventas = VentaModel.get_all_ventas()
-        for v in ventas:
-            v["_id"] = str(v["_id"])
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        rango = rango_solicitado()
+        if pagina is not None:
+            return jsonify(VentaModel.get_all_ventas(campos, pagina=pagina, **rango).sobre()), 200
+        if quiere_stream():
+            return respuesta_stream(VentaModel.get_all_ventas(campos, como_cursor=True, **rango))
+        ventas = VentaModel.get_all_ventas(campos, **rango)
         return jsonify({
             "success": True,
             "total": len(ventas),
             "data": ventas
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@supermarket_bp.route("/supermarket/ventas", methods=["POST"])
+def create_venta():
+    """
+    Registra una venta: {"cliente_id": 1, "items": [{"producto_id": 3, "cantidad": 2}], "fecha": "2025-09-30"}.
+    fecha (por defecto hoy), total y _id son opcionales. Los rollups de ventas_diarias
+    y el resumen del cliente (clientes_stats) se actualizan en la misma petición.
+    """
+    try:
+        venta = VentaModel.crear_venta(request.get_json(silent=True))
+        return jsonify({
+            "success": True,
+            "message": "Venta creada",
+            "id": venta["_id"],
+            "total": venta["total"]
+        }), 201
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -120,17 +270,44 @@ def get_ventas():
 
 # Endpoints para Reportes
 @supermarket_bp.route("/supermarket/reportes/ventas-detallado", methods=["GET"])
+@condicional(VentaModel, ClienteModel, ProductoModel, CategoriaModel)
 def get_reporte_ventas_detallado():
     """
-    Reporte detallado de ventas con información de clientes y productos
+    Reporte detallado de ventas con información de clientes y productos.
+    Acepta ?desde=&hasta= (AAAA-MM-DD, inclusivos), ?limit=&after= (página por cursor
+    ordenada por fecha, venta y línea) y ?total=1.
+    Con ?explain=executionStats retorna el plan de ejecución en vez de los datos.
+    Con ?format=csv|parquet descarga el reporte completo como archivo, escrito por lotes.
     """
     try:
-        reporte = SupermarketReporteModel.generar_reporte_ventas_detallado()
+        campos = campos_solicitados()
+        pagina = pagina_solicitada()
+        explain = explain_solicitado()
+        rango = rango_solicitado()
+        formato = formato_solicitado()
+        if explain:
+            plan = SupermarketReporteModel.generar_reporte_ventas_detallado(campos, pagina=pagina, explain=explain, **rango)
+            return jsonify({"success": True, "explain": plan}), 200
+        if formato:
+            cursor = SupermarketReporteModel.generar_reporte_ventas_detallado(campos, como_cursor=True, **rango)
+            columnas = columnas_exportacion(SupermarketReporteModel.COLUMNAS_DETALLADO, campos)
+            return respuesta_exportacion(cursor, columnas, formato, "ventas-detallado")
+        if pagina is not None:
+            return jsonify(SupermarketReporteModel.generar_reporte_ventas_detallado(campos, pagina=pagina, **rango).sobre(**rango)), 200
+        if quiere_stream():
+            return respuesta_stream(SupermarketReporteModel.generar_reporte_ventas_detallado(campos, como_cursor=True, **rango), **rango)
+        reporte = SupermarketReporteModel.generar_reporte_ventas_detallado(campos, **rango)
         return jsonify({
             "success": True,
+            **rango,
             "total_registros": len(reporte),
             "data": reporte
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -138,17 +315,133 @@ def get_reporte_ventas_detallado():
         }), 500
 
 @supermarket_bp.route("/supermarket/reportes/ventas-por-categoria", methods=["GET"])
+@condicional(VentaDiariaModel, CategoriaModel)
 def get_reporte_ventas_por_categoria():
     """
-    Reporte de ventas agrupadas por categoría
+    Reporte de ventas agrupadas por categoría (desde los rollups diarios)
+    Acepta ?desde=&hasta= (AAAA-MM-DD, inclusivos) para acotar el rango de fechas.
+    Con ?explain=executionStats retorna el plan de ejecución en vez de los datos.
     """
     try:
-        reporte = SupermarketReporteModel.generar_reporte_ventas_por_categoria()
+        campos = campos_solicitados()
+        explain = explain_solicitado()
+        rango = rango_solicitado()
+        if explain:
+            return jsonify({"success": True, "explain": SupermarketReporteModel.generar_reporte_ventas_por_categoria(campos, explain=explain, **rango)}), 200
+        if quiere_stream():
+            return respuesta_stream(SupermarketReporteModel.generar_reporte_ventas_por_categoria(campos, como_cursor=True, **rango), **rango)
+        reporte = SupermarketReporteModel.generar_reporte_ventas_por_categoria(campos, **rango)
         return jsonify({
             "success": True,
+            **rango,
             "total_categorias": len(reporte),
             "data": reporte
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@supermarket_bp.route("/supermarket/reportes/ventas-por-producto", methods=["GET"])
+@condicional(VentaDiariaModel, ProductoModel, CategoriaModel)
+def get_reporte_ventas_por_producto():
+    """
+    Reporte de ventas por producto (desde los rollups diarios), de mayor a menor ingreso
+    Acepta ?desde=&hasta= (AAAA-MM-DD, inclusivos) y ?explain=executionStats.
+    """
+    try:
+        campos = campos_solicitados()
+        explain = explain_solicitado()
+        rango = rango_solicitado()
+        if explain:
+            return jsonify({"success": True, "explain": SupermarketReporteModel.generar_reporte_ventas_por_producto(campos, explain=explain, **rango)}), 200
+        if quiere_stream():
+            return respuesta_stream(SupermarketReporteModel.generar_reporte_ventas_por_producto(campos, como_cursor=True, **rango), **rango)
+        reporte = SupermarketReporteModel.generar_reporte_ventas_por_producto(campos, **rango)
+        return jsonify({
+            "success": True,
+            **rango,
+            "total_productos": len(reporte),
+            "data": reporte
+        }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@supermarket_bp.route("/supermarket/reportes/top-productos", methods=["GET"])
+@condicional(VentaDiariaModel, ProductoModel, CategoriaModel)
+def get_top_productos():
+    """
+    Los productos con mayores ingresos (desde los rollups diarios)
+    Acepta ?n= (1-100, por defecto 10), ?categoria= (id o nombre), ?desde=&hasta= y ?explain=.
+    """
+    try:
+        n = request.args.get("n")
+        categoria = request.args.get("categoria")
+        explain = explain_solicitado()
+        rango = rango_solicitado()
+        if explain:
+            return jsonify({"success": True, "explain": SupermarketReporteModel.generar_top_productos(n, categoria, explain=explain, **rango)}), 200
+        top = SupermarketReporteModel.generar_top_productos(n, categoria, **rango)
+        return jsonify({
+            "success": True,
+            **rango,
+            "categoria": categoria,
+            "total_productos": len(top),
+            "data": top
+        }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@supermarket_bp.route("/supermarket/reportes/top-clientes", methods=["GET"])
+@condicional(VentaModel, ClienteModel)
+def get_top_clientes():
+    """
+    Los clientes con mayor gasto
+    Acepta ?n= (1-100, por defecto 10), ?categoria= (id o nombre: solo el gasto en esa categoría),
+    ?desde=&hasta= y ?explain=.
+    """
+    try:
+        n = request.args.get("n")
+        categoria = request.args.get("categoria")
+        explain = explain_solicitado()
+        rango = rango_solicitado()
+        if explain:
+            return jsonify({"success": True, "explain": SupermarketReporteModel.generar_top_clientes(n, categoria, explain=explain, **rango)}), 200
+        top = SupermarketReporteModel.generar_top_clientes(n, categoria, **rango)
+        return jsonify({
+            "success": True,
+            **rango,
+            "categoria": categoria,
+            "total_clientes": len(top),
+            "data": top
+        }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -156,17 +449,33 @@ def get_reporte_ventas_por_categoria():
         }), 500
 
 @supermarket_bp.route("/supermarket/reportes/ventas-con-productos", methods=["GET"])
+@condicional(VentaModel, ProductoModel)
 def get_ventas_con_productos():
     """
     Reporte de ventas con productos unidos (equivalente a joinColecciones.js)
+    Acepta ?desde=&hasta= (AAAA-MM-DD, inclusivos).
+    Con ?explain=executionStats retorna el plan de ejecución en vez de los datos.
     """
     try:
-        reporte = SupermarketReporteModel.generar_ventas_con_productos_unidos()
+        campos = campos_solicitados()
+        explain = explain_solicitado()
+        rango = rango_solicitado()
+        if explain:
+            return jsonify({"success": True, "explain": SupermarketReporteModel.generar_ventas_con_productos_unidos(campos, explain=explain, **rango)}), 200
+        if quiere_stream():
+            return respuesta_stream(SupermarketReporteModel.generar_ventas_con_productos_unidos(campos, como_cursor=True, **rango), **rango)
+        reporte = SupermarketReporteModel.generar_ventas_con_productos_unidos(campos, **rango)
         return jsonify({
             "success": True,
+            **rango,
             "total_ventas": len(reporte),
             "data": reporte
         }), 200
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -1,53 +1,73 @@
 """
 Modelos para la base de datos Supermarket
 """
-from bson import ObjectId
+from datetime import date, datetime, time, timedelta, timezone
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from versioning import Versiones
+from cache import CacheResultados, DimensionCache
+from proyeccion import etapa_project, proyeccion_find
+from paginacion import ORDEN_ID, etapas_pagina, contar_pipeline, incluir_orden, paginar_find, paginar_lista, ResultadoPagina
+from explain import explicar_aggregate
+from optimizador import ejecutar
 
 class CategoriaModel:
     """Modelo para categorías de productos"""
     collection = None
+    indices = []
 
     @staticmethod
     def init(mongo):
         CategoriaModel.collection = mongo.db.categorias
 
     @staticmethod
-    def get_all_categorias():
-        return list(CategoriaModel.collection.find())
+    def get_all_categorias(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_lista(DimensionCache.get("categorias").todos(incluir_orden(campos, ORDEN_ID)), pagina)
+        return DimensionCache.get("categorias").todos(campos)
 
     @staticmethod
     def get_categoria(categoria_id):
-        return CategoriaModel.collection.find_one({"_id": categoria_id})
+        return DimensionCache.get("categorias").por_id(categoria_id)
 
 
 class ProveedorModel:
     """Modelo para proveedores"""
     collection = None
+    indices = []
 
     @staticmethod
     def init(mongo):
         ProveedorModel.collection = mongo.db.proveedores
 
     @staticmethod
-    def get_all_proveedores():
-        return list(ProveedorModel.collection.find())
+    def get_all_proveedores(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_lista(DimensionCache.get("proveedores").todos(incluir_orden(campos, ORDEN_ID)), pagina)
+        return DimensionCache.get("proveedores").todos(campos)
 
     @staticmethod
     def get_proveedor(proveedor_id):
-        return ProveedorModel.collection.find_one({"_id": proveedor_id})
+        return DimensionCache.get("proveedores").por_id(proveedor_id)
 
 
 class ClienteModel:
     """Modelo para clientes"""
     collection = None
+    indices = []
 
     @staticmethod
     def init(mongo):
         ClienteModel.collection = mongo.db.clientes
 
     @staticmethod
-    def get_all_clientes():
-        return list(ClienteModel.collection.find())
+    def get_all_clientes(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(ClienteModel.collection, {}, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = ClienteModel.collection.find({}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
     def get_cliente(cliente_id):
@@ -57,218 +77,1091 @@ class ClienteModel:
 class ProductoModel:
     """Modelo para productos"""
     collection = None
+    # (categoria_id, _id) también sirve las páginas por categoría ordenadas por _id
+    indices = [
+        IndexModel([("categoria_id", ASCENDING), ("_id", ASCENDING)])
+    ]
 
     @staticmethod
     def init(mongo):
         ProductoModel.collection = mongo.db.productos
 
     @staticmethod
-    def get_all_productos():
-        return list(ProductoModel.collection.find())
+    def get_all_productos(campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(ProductoModel.collection, {}, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = ProductoModel.collection.find({}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
     def get_producto(producto_id):
         return ProductoModel.collection.find_one({"_id": producto_id})
 
     @staticmethod
-    def get_productos_por_categoria(categoria_id):
-        return list(ProductoModel.collection.find({"categoria_id": categoria_id}))
+    def get_productos_por_categoria(categoria_id, campos=None, como_cursor=False, pagina=None):
+        if pagina is not None:
+            return paginar_find(ProductoModel.collection, {"categoria_id": categoria_id},
+                                proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = ProductoModel.collection.find({"categoria_id": categoria_id}, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
 
 class VentaModel:
-    """Modelo para ventas"""
+    """
+    Modelo para ventas.
+
+    Cada item guarda una copia del producto al momento de la venta
+    (precio_unitario, categoria_id, nombre), así los reportes no unen cada item
+    con 'productos' y los subtotales usan el precio cobrado, no el actual.
+
+    `fecha` es una fecha BSON (medianoche UTC del día de la venta), así los
+    rangos ?desde=&hasta= son recorridos del índice de fecha y el orden es cronológico.
+    """
     collection = None
+    # (cliente_id, fecha, _id) sirve el historial de cada cliente en el orden de ORDEN_HISTORIAL;
+    # (fecha, _id) los rangos de fechas y las páginas del reporte detallado
+    indices = [
+        IndexModel([("cliente_id", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("fecha", DESCENDING), ("_id", DESCENDING)])
+    ]
+    # Historial de un cliente: de la venta más reciente a la más antigua
+    ORDEN_HISTORIAL = [("fecha", -1), ("_id", -1)]
+    # Campo del item -> campo del producto copiado al registrar la venta
+    SNAPSHOT_ITEM = {"precio_unitario": "precio", "categoria_id": "categoria_id", "nombre": "nombre"}
+    # Ventas con algún item sin copia del producto (cargadas desde CSV o anteriores a la copia)
+    SIN_SNAPSHOT = {"items": {"$elemMatch": {"precio_unitario": {"$exists": False}}}}
 
     @staticmethod
     def init(mongo):
         VentaModel.collection = mongo.db.ventas
 
     @staticmethod
-    def get_all_ventas():
-        return list(VentaModel.collection.find())
+    def get_all_ventas(campos=None, como_cursor=False, pagina=None, desde=None, hasta=None):
+        filtro = VentaDiariaModel.filtro_fechas(desde, hasta) or {}
+        if pagina is not None:
+            return paginar_find(VentaModel.collection, filtro, proyeccion_find(incluir_orden(campos, ORDEN_ID)), pagina)
+        cursor = VentaModel.collection.find(filtro, proyeccion_find(campos))
+        return cursor if como_cursor else list(cursor)
 
     @staticmethod
     def get_venta(venta_id):
         return VentaModel.collection.find_one({"_id": venta_id})
 
     @staticmethod
-    def get_ventas_por_cliente(cliente_id):
-        return list(VentaModel.collection.find({"cliente_id": cliente_id}))
+    def get_ventas_por_cliente(cliente_id, campos=None, como_cursor=False, pagina=None, desde=None, hasta=None):
+        """
+        Historial de compras de un cliente, de la más reciente a la más antigua, opcionalmente
+        en el rango de días [desde, hasta]. Filtro y orden los sirve un solo índice.
+        """
+        filtro = {"cliente_id": cliente_id, **(VentaDiariaModel.filtro_fechas(desde, hasta) or {})}
+        orden = VentaModel.ORDEN_HISTORIAL
+        if pagina is not None:
+            return paginar_find(VentaModel.collection, filtro, proyeccion_find(incluir_orden(campos, orden)),
+                                pagina, orden)
+        cursor = VentaModel.collection.find(filtro, proyeccion_find(campos)).sort(orden)
+        return cursor if como_cursor else list(cursor)
 
+    @staticmethod
+    def productos_de(ventas):
+        """Precio, categoría y nombre de los productos de `ventas` con una sola consulta."""
+        ids = {item["producto_id"] for venta in ventas for item in venta.get("items", [])}
+        proyeccion = {campo: 1 for campo in VentaModel.SNAPSHOT_ITEM.values()}
+        cursor = ProductoModel.collection.find({"_id": {"$in": list(ids)}}, proyeccion)
+        return {producto["_id"]: producto for producto in cursor}
 
-class SupermarketReporteModel:
+    @staticmethod
+    def item_con_snapshot(item, producto):
+        """El item con la copia de los campos del producto (los que ya traiga se respetan)."""
+        snapshot = {campo: producto.get(origen) for campo, origen in VentaModel.SNAPSHOT_ITEM.items()}
+        return {**snapshot, **item}
+
+    @staticmethod
+    def pipeline_completar_items(match=None):
+        """
+        Pipeline que agrega la copia del producto a los items que no la tienen y
+        escribe los items completos en la misma venta con $merge. Un solo $lookup
+        por venta (con todos sus producto_id), no uno por item.
+        """
+        snapshot = {campo: f"$$producto.{origen}" for campo, origen in VentaModel.SNAPSHOT_ITEM.items()}
+        filtro = {"$and": [match, VentaModel.SIN_SNAPSHOT]} if match else VentaModel.SIN_SNAPSHOT
+        return [
+            {"$match": filtro},
+            {
+                "$lookup": {
+                    "from": "productos",
+                    "localField": "items.producto_id",
+                    "foreignField": "_id",
+                    "as": "productos"
+                }
+            },
+            {
+                "$project": {
+                    "items": {
+                        "$map": {
+                            "input": "$items",
+                            "as": "item",
+                            "in": {
+                                "$let": {
+                                    "vars": {
+                                        "producto": {"$arrayElemAt": [{"$filter": {
+                                            "input": "$productos",
+                                            "cond": {"$eq": ["$$this._id", "$$item.producto_id"]}
+                                        }}, 0]}
+                                    },
+                                    # Sin producto los campos quedan ausentes y el item no entra en los reportes
+                                    "in": {"$mergeObjects": [snapshot, "$$item"]}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            {"$merge": {"into": "ventas", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+        ]
+
+    @staticmethod
+    def completar_items(match=None):
+        """
+        Copia precio, categoría y nombre del producto en los items que no los tienen
+        (después de importar CSV y como migración de datos existentes). El precio
+        copiado es el actual: es el mejor dato disponible para ventas ya registradas.
+
+        Returns:
+            int: Número de ventas completadas.
+        """
+        filtro = {"$and": [match, VentaModel.SIN_SNAPSHOT]} if match else VentaModel.SIN_SNAPSHOT
+        pendientes = VentaModel.collection.count_documents(filtro)
+        if pendientes:
+            ejecutar(VentaModel.collection, VentaModel.pipeline_completar_items(match))
+            Versiones.incrementar(VentaModel.collection)
+        return pendientes
+
+    @staticmethod
+    def _validar_venta(data):
+        """Normaliza el body de una venta nueva; lanza ValueError si falta algo."""
+        if not isinstance(data, dict):
+            raise ValueError("Se esperaba un objeto JSON con cliente_id e items")
+        try:
+            cliente_id = int(data["cliente_id"])
+            items = [{"producto_id": int(item["producto_id"]), "cantidad": int(item["cantidad"])}
+                     for item in data["items"]]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("La venta requiere cliente_id e items [{producto_id, cantidad}] enteros")
+        # ventas.fecha es el día en UTC: "hoy" no depende de la zona horaria del servidor
+        fecha = VentaDiariaModel.validar_fecha(data.get("fecha") or datetime.now(timezone.utc).date(), "fecha")
+        venta = {"cliente_id": cliente_id, "fecha": fecha, "items": items}
+        if not venta["items"] or any(item["cantidad"] <= 0 for item in venta["items"]):
+            raise ValueError("La venta debe tener al menos un item y cantidades positivas")
+        if "total" in data:
+            try:
+                venta["total"] = float(data["total"])
+            except (TypeError, ValueError):
+                raise ValueError("El total de la venta debe ser numérico")
+        if "_id" in data:
+            venta = {"_id": data["_id"], **venta}
+        return venta
+
+    @staticmethod
+    def crear_venta(data):
+        """
+        Inserta una venta y actualiza sus rollups diarios y el resumen del cliente en la
+        misma petición.
+        Cada item lleva la copia del producto con el precio actual; si no se indica,
+        el total se calcula con esos precios y el _id es el siguiente entero (como
+        en ventas.csv).
+
+        Returns:
+            dict: La venta insertada.
+        """
+        venta = VentaModel._validar_venta(data)
+        productos = VentaModel.productos_de([venta])
+        faltantes = {item["producto_id"] for item in venta["items"]} - set(productos)
+        if faltantes:
+            raise ValueError(f"Productos inexistentes: {', '.join(map(str, sorted(faltantes)))}")
+        venta["items"] = [VentaModel.item_con_snapshot(item, productos[item["producto_id"]]) for item in venta["items"]]
+        if "total" not in venta:
+            venta["total"] = float(sum(item["precio_unitario"] * item["cantidad"] for item in venta["items"]))
+
+        if "_id" in venta:
+            VentaModel.collection.insert_one(venta)
+        else:
+            # Otro proceso puede tomar el mismo _id entre la lectura y la inserción: se reintenta
+            while True:
+                ultima = VentaModel.collection.find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+                venta = {"_id": (ultima["_id"] + 1) if ultima and isinstance(ultima["_id"], int) else 1, **venta}
+                try:
+                    VentaModel.collection.insert_one(venta)
+                    break
+                except DuplicateKeyError:
+                    venta.pop("_id")
+        Versiones.incrementar(VentaModel.collection)
+        VentaDiariaModel.registrar_ventas([venta])
+        ClienteStatsModel.registrar_ventas([venta])
+        return venta
+
+
+class VentaDiariaModel:
     """
-    Modelo para generar reportes complejos de Supermarket usando pipelines de agregación.
+    Rollups diarios de ventas en la colección 'ventas_diarias': una fila por
+    (fecha, categoria_id, producto_id) con las líneas vendidas, la cantidad y los
+    ingresos de ese día. Los reportes por categoría y por producto suman unas
+    pocas filas de aquí en vez de recorrer todos los items de todas las ventas.
+
+    Se mantienen incrementalmente: VentaModel.crear_venta suma cada venta nueva
+    con $inc, la importación delta recalcula solo las fechas afectadas y la
+    importación completa los reconstruye con reconstruir().
+
+    Se calculan con la copia del producto en cada item (precio y categoría al
+    momento de la venta), sin unir con 'productos'.
     """
     collection = None
+    COLECCION = "ventas_diarias"
+    CLAVE = ("fecha", "categoria_id", "producto_id")
+    # La clave única sirve el $merge de los recálculos y los rangos de fecha de los reportes
+    indices = [
+        IndexModel([(campo, ASCENDING) for campo in CLAVE], unique=True)
+    ]
 
     @staticmethod
     def init(mongo):
-        SupermarketReporteModel.collection = mongo.db
+        VentaDiariaModel.collection = mongo.db[VentaDiariaModel.COLECCION]
 
     @staticmethod
-    def generar_reporte_ventas_detallado():
+    def validar_fecha(valor, nombre):
         """
-        Pipeline de agregación para generar reporte detallado de ventas con información de clientes y productos.
+        Valida una fecha (texto AAAA-MM-DD, date o datetime) y la retorna como
+        datetime a medianoche, el formato de ventas.fecha y ventas_diarias.fecha.
         """
-        pipeline = [
+        if isinstance(valor, datetime):
+            return datetime.combine(valor.date(), time())
+        if isinstance(valor, date):
+            return datetime.combine(valor, time())
+        try:
+            return datetime.strptime(str(valor), "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"El parámetro '{nombre}' debe ser una fecha AAAA-MM-DD")
+
+    @staticmethod
+    def filtro_fechas(desde=None, hasta=None):
+        """
+        Condición sobre `fecha` para el rango inclusivo de días [desde, hasta] (None si
+        no hay rango). `hasta` se traduce a "antes del día siguiente", así incluye
+        todo ese día aunque una fecha traiga hora.
+        """
+        rango = {}
+        if desde:
+            rango["$gte"] = VentaDiariaModel.validar_fecha(desde, "desde")
+        if hasta:
+            rango["$lt"] = VentaDiariaModel.validar_fecha(hasta, "hasta") + timedelta(days=1)
+        if "$gte" in rango and "$lt" in rango and rango["$gte"] >= rango["$lt"]:
+            raise ValueError("'desde' no puede ser posterior a 'hasta'")
+        return {"fecha": rango} if rango else None
+
+    @staticmethod
+    def pipeline_rollup(match=None):
+        """
+        Pipeline sobre 'ventas' que calcula las filas de rollup (sin escribirlas).
+
+        Args:
+            match (dict): Condición sobre las ventas a incluir (p. ej. por fecha).
+        """
+        pipeline = [{"$match": match}] if match else []
+        pipeline.extend([
+            {"$unwind": "$items"},
+            # Items de productos inexistentes (sin copia del producto)
+            {"$match": {"items.precio_unitario": {"$exists": True}}},
             {
-                "$lookup": {
-                    "from": "clientes",
-                    "localField": "cliente_id",
-                    "foreignField": "_id",
-                    "as": "cliente"
+                "$group": {
+                    "_id": {
+                        "fecha": "$fecha",
+                        "categoria_id": "$items.categoria_id",
+                        "producto_id": "$items.producto_id"
+                    },
+                    "lineas": {"$sum": 1},
+                    "cantidad": {"$sum": "$items.cantidad"},
+                    "ingresos": {"$sum": {"$multiply": ["$items.cantidad", "$items.precio_unitario"]}}
                 }
             },
             {
-                "$unwind": "$cliente"
-            },
+                "$project": {
+                    "_id": 0,
+                    "fecha": "$_id.fecha",
+                    "categoria_id": "$_id.categoria_id",
+                    "producto_id": "$_id.producto_id",
+                    "lineas": 1,
+                    "cantidad": 1,
+                    "ingresos": 1
+                }
+            }
+        ])
+        return pipeline
+
+    @staticmethod
+    def reconstruir():
+        """
+        Recalcula todos los rollups desde 'ventas'. $out reemplaza la colección de
+        forma atómica y conserva sus índices, así los reportes nunca ven una tabla vacía.
+        """
+        VentaDiariaModel.collection.create_indexes(VentaDiariaModel.indices)
+        ventas = VentaDiariaModel.collection.database.ventas
+        ejecutar(ventas, VentaDiariaModel.pipeline_rollup() + [{"$out": VentaDiariaModel.COLECCION}])
+        Versiones.incrementar(VentaDiariaModel.collection)
+
+    @staticmethod
+    def recalcular_fechas(fechas):
+        """
+        Recalcula solo los días indicados (importaciones delta, correcciones): borra
+        sus filas y las vuelve a escribir con $merge.
+
+        Returns:
+            int: Número de días recalculados.
+        """
+        fechas = sorted(set(fechas))
+        if not fechas:
+            return 0
+        ventas = VentaDiariaModel.collection.database.ventas
+        VentaDiariaModel.collection.delete_many({"fecha": {"$in": fechas}})
+        ejecutar(ventas, VentaDiariaModel.pipeline_rollup({"fecha": {"$in": fechas}}) + [{
+            "$merge": {
+                "into": VentaDiariaModel.COLECCION,
+                "on": list(VentaDiariaModel.CLAVE),
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }])
+        Versiones.incrementar(VentaDiariaModel.collection)
+        return len(fechas)
+
+    @staticmethod
+    def registrar_ventas(ventas):
+        """
+        Suma ventas nuevas a sus rollups con un $inc por fila afectada (upsert).
+
+        Args:
+            ventas (list): Documentos de venta ya insertados, con la copia del producto en cada item.
+        """
+        filas = {}
+        for venta in ventas:
+            for item in venta.get("items", []):
+                if "precio_unitario" not in item:
+                    continue
+                clave = (venta["fecha"], item.get("categoria_id"), item["producto_id"])
+                fila = filas.setdefault(clave, {"lineas": 0, "cantidad": 0, "ingresos": 0})
+                fila["lineas"] += 1
+                fila["cantidad"] += item["cantidad"]
+                fila["ingresos"] += item["cantidad"] * item["precio_unitario"]
+        if not filas:
+            return 0
+        VentaDiariaModel.collection.bulk_write([
+            UpdateOne(dict(zip(VentaDiariaModel.CLAVE, clave)), {"$inc": incrementos}, upsert=True)
+            for clave, incrementos in filas.items()
+        ], ordered=False)
+        Versiones.incrementar(VentaDiariaModel.collection)
+        return len(filas)
+
+
+class ClienteStatsModel:
+    """
+    Resumen de compras de cada cliente en la colección 'clientes_stats' (_id = cliente_id):
+    número de compras, total gastado, primera y última compra y gasto por categoría.
+
+    Se mantiene como los rollups diarios: POST /supermarket/ventas suma cada venta con
+    $inc, la importación completa lo reconstruye y la delta recalcula los clientes
+    afectados. Así el perfil de un cliente es la lectura de un documento, no un
+    recorrido de su historial.
+    """
+    collection = None
+    COLECCION = "clientes_stats"
+    indices = []
+
+    @staticmethod
+    def init(mongo):
+        ClienteStatsModel.collection = mongo.db[ClienteStatsModel.COLECCION]
+
+    @staticmethod
+    def pipeline_resumen(match=None):
+        """
+        Pipeline sobre 'ventas' que calcula el resumen de cada cliente (sin escribirlo).
+        El primer $group es por (cliente, categoría) y cuenta cada venta una sola vez, en
+        su primer item; el segundo junta las categorías del cliente en `por_categoria`.
+        """
+        # Las ventas sin items pasan el $unwind sin `linea`: cuentan como su primer item
+        primer_item = {"$eq": [{"$ifNull": ["$linea", 0]}, 0]}
+        pipeline = [{"$match": match}] if match else []
+        pipeline.extend([
             {
-                "$unwind": "$items"
+                "$unwind": {"path": "$items", "includeArrayIndex": "linea", "preserveNullAndEmptyArrays": True}
             },
             {
-                "$lookup": {
-                    "from": "productos",
-                    "localField": "items.producto_id",
-                    "foreignField": "_id",
-                    "as": "producto"
+                "$group": {
+                    "_id": {"cliente_id": "$cliente_id", "categoria_id": "$items.categoria_id"},
+                    "compras": {"$sum": {"$cond": [primer_item, 1, 0]}},
+                    "total_gastado": {"$sum": {"$cond": [primer_item, "$total", 0]}},
+                    "primera_compra": {"$min": "$fecha"},
+                    "ultima_compra": {"$max": "$fecha"},
+                    "gasto": {
+                        "$sum": {"$multiply": [{"$ifNull": ["$items.cantidad", 0]},
+                                               {"$ifNull": ["$items.precio_unitario", 0]}]}
+                    }
                 }
             },
             {
-                "$unwind": "$producto"
+                "$group": {
+                    "_id": "$_id.cliente_id",
+                    "compras": {"$sum": "$compras"},
+                    "total_gastado": {"$sum": "$total_gastado"},
+                    "primera_compra": {"$min": "$primera_compra"},
+                    "ultima_compra": {"$max": "$ultima_compra"},
+                    "por_categoria": {"$push": {"k": {"$toString": "$_id.categoria_id"}, "v": "$gasto"}}
+                }
             },
             {
-                "$lookup": {
-                    "from": "categorias",
-                    "localField": "producto.categoria_id",
-                    "foreignField": "_id",
-                    "as": "categoria"
+                "$project": {
+                    "compras": 1,
+                    "total_gastado": 1,
+                    "primera_compra": 1,
+                    "ultima_compra": 1,
+                    # Sin los items sin categoría ni precio (productos inexistentes)
+                    "por_categoria": {
+                        "$arrayToObject": {
+                            "$filter": {
+                                "input": "$por_categoria",
+                                "cond": {"$and": [{"$gt": ["$$this.k", None]}, {"$gt": ["$$this.v", 0]}]}
+                            }
+                        }
+                    }
                 }
-            },
+            }
+        ])
+        return pipeline
+
+    @staticmethod
+    def reconstruir():
+        """Recalcula el resumen de todos los clientes desde 'ventas' ($out: reemplazo atómico)."""
+        ventas = ClienteStatsModel.collection.database.ventas
+        ejecutar(ventas, ClienteStatsModel.pipeline_resumen() + [{"$out": ClienteStatsModel.COLECCION}])
+        Versiones.incrementar(ClienteStatsModel.collection)
+
+    @staticmethod
+    def recalcular_clientes(cliente_ids):
+        """
+        Recalcula solo los clientes indicados (importaciones delta): borra sus resúmenes
+        (un cliente pudo quedar sin ventas) y los vuelve a escribir con $merge.
+
+        Returns:
+            int: Número de clientes recalculados.
+        """
+        cliente_ids = sorted(set(cliente_ids))
+        if not cliente_ids:
+            return 0
+        ventas = ClienteStatsModel.collection.database.ventas
+        ClienteStatsModel.collection.delete_many({"_id": {"$in": cliente_ids}})
+        ejecutar(ventas, ClienteStatsModel.pipeline_resumen({"cliente_id": {"$in": cliente_ids}}) + [{
+            "$merge": {
+                "into": ClienteStatsModel.COLECCION,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }])
+        Versiones.incrementar(ClienteStatsModel.collection)
+        return len(cliente_ids)
+
+    @staticmethod
+    def registrar_ventas(ventas):
+        """
+        Suma ventas nuevas al resumen de sus clientes con un upsert por cliente.
+
+        Args:
+            ventas (list): Documentos de venta ya insertados, con la copia del producto en cada item.
+        """
+        cambios = {}
+        for venta in ventas:
+            cambio = cambios.setdefault(venta["cliente_id"], {
+                "$inc": {"compras": 0, "total_gastado": 0},
+                "$min": {"primera_compra": venta["fecha"]},
+                "$max": {"ultima_compra": venta["fecha"]}
+            })
+            cambio["$inc"]["compras"] += 1
+            cambio["$inc"]["total_gastado"] += venta.get("total", 0)
+            cambio["$min"]["primera_compra"] = min(cambio["$min"]["primera_compra"], venta["fecha"])
+            cambio["$max"]["ultima_compra"] = max(cambio["$max"]["ultima_compra"], venta["fecha"])
+            for item in venta.get("items", []):
+                if item.get("categoria_id") is None or "precio_unitario" not in item:
+                    continue
+                campo = f"por_categoria.{item['categoria_id']}"
+                cambio["$inc"][campo] = cambio["$inc"].get(campo, 0) + item["cantidad"] * item["precio_unitario"]
+        if not cambios:
+            return 0
+        ClienteStatsModel.collection.bulk_write([
+            UpdateOne({"_id": cliente_id}, cambio, upsert=True) for cliente_id, cambio in cambios.items()
+        ], ordered=False)
+        Versiones.incrementar(ClienteStatsModel.collection)
+        return len(cambios)
+
+    @staticmethod
+    def get_resumen(cliente_id):
+        """
+        Resumen del cliente con su categoría favorita (la de mayor gasto) y su nombre.
+        None si el cliente no tiene compras registradas.
+        """
+        resumen = ClienteStatsModel.collection.find_one({"_id": cliente_id})
+        if resumen is None:
+            return None
+        # Las claves de por_categoria son textos (nombres de campo); los ids de categoría son enteros
+        por_categoria = {
+            int(clave) if clave.isdigit() else clave: gasto
+            for clave, gasto in (resumen.pop("por_categoria", None) or {}).items()
+        }
+        favorita = None
+        if por_categoria:
+            categoria_id, gasto = max(por_categoria.items(), key=lambda par: par[1])
+            favorita = {
+                "categoria_id": categoria_id,
+                "nombre": DimensionCache.get("categorias").nombre(categoria_id),
+                "gasto": gasto
+            }
+        return {
+            "cliente_id": resumen.pop("_id"),
+            **resumen,
+            "ticket_promedio": resumen["total_gastado"] / resumen["compras"] if resumen.get("compras") else 0,
+            "categoria_favorita": favorita
+        }
+
+
+class SupermarketReporteModel:
+    """
+    Modelo para generar reportes complejos de Supermarket usando pipelines de agregación.
+    """
+    collection = None
+    indices = {}
+
+    # Clave de orden de las páginas del reporte detallado: cada línea es un item de una venta
+    ORDEN_PAGINAS_DETALLADO = [("fecha", -1), ("venta_id", -1), ("linea", 1)]
+    # Columnas del reporte detallado y su tipo para ?format=csv|parquet (ver exportar.py)
+    COLUMNAS_DETALLADO = [
+        ("venta_id", "entero"),
+        ("fecha", "fecha"),
+        ("cliente_nombre", "texto"),
+        ("cliente_email", "texto"),
+        ("producto_nombre", "texto"),
+        ("categoria_nombre", "texto"),
+        ("cantidad", "entero"),
+        ("precio_unitario", "decimal"),
+        ("subtotal", "decimal"),
+        ("total_venta", "decimal")
+    ]
+    # Tamaño de los rankings top-productos y top-clientes (?n=)
+    TOP_POR_DEFECTO = 10
+    TOP_MAXIMO = 100
+
+    @staticmethod
+    def init(mongo):
+        SupermarketReporteModel.collection = mongo.db
+
+    @staticmethod
+    def pipeline_reporte_ventas_detallado(campos=None, pagina=None, desde=None, hasta=None):
+        """
+        Pipeline de agregación para generar reporte detallado de ventas con información de clientes y productos.
+        Producto, precio y categoría salen de la copia guardada en cada item (sin $lookup por item);
+        el nombre de la categoría se resuelve con la caché de dimensiones.
+
+        El rango [desde, hasta] es un $match inicial sobre el índice de fecha. Con `pagina`
+        las filas se ordenan por ORDEN_PAGINAS_DETALLADO (`linea` es la posición del item en
+        la venta): el cursor se aplica primero sobre (fecha, _id) de 'ventas' con un $sort y
+        un $limit del tamaño de la página, antes del $lookup y del $unwind, y después se
+        recorta a filas de items. Las ventas sin cliente o sin items con precio se conservan
+        con `_completa: false` para que el cursor avance sobre ellas.
+        """
+        categoria_nombre = DimensionCache.get("categorias").expresion_nombre("$items.categoria_id")
+        if categoria_nombre is None:
+            categoria_nombre = {"$literal": None}
+
+        pipeline = []
+        rango = VentaDiariaModel.filtro_fechas(desde, hasta)
+        if rango:
+            pipeline.append({"$match": rango})
+        if pagina is not None:
+            pipeline.extend(SupermarketReporteModel._etapas_pagina_ventas(pagina))
+
+        if pagina is None:
+            pipeline.extend([
+                {
+                    "$lookup": {
+                        "from": "clientes",
+                        "localField": "cliente_id",
+                        "foreignField": "_id",
+                        "as": "cliente"
+                    }
+                },
+                {
+                    "$unwind": "$cliente"
+                },
+                {
+                    "$unwind": "$items"
+                },
+                {
+                    "$match": {"items.precio_unitario": {"$exists": True}}
+                },
+            ])
+        else:
+            pipeline.extend([
+                {
+                    "$lookup": {
+                        "from": "clientes",
+                        "localField": "cliente_id",
+                        "foreignField": "_id",
+                        "as": "cliente"
+                    }
+                },
+                {
+                    "$unwind": {"path": "$cliente", "preserveNullAndEmptyArrays": True}
+                },
+                {
+                    "$unwind": {"path": "$items", "includeArrayIndex": "linea", "preserveNullAndEmptyArrays": True}
+                },
+            ])
+
+        proyeccion = {
+
+            "_id": 0,
+            "venta_id": "$_id",
+            "fecha": "$fecha",
+            "cliente_nombre": "$cliente.nombre",
+            "cliente_email": "$cliente.email",
+            "producto_nombre": "$items.nombre",
+            "categoria_nombre": categoria_nombre,
+            "cantidad": "$items.cantidad",
+            "precio_unitario": "$items.precio_unitario",
+            "subtotal": {"$multiply": ["$items.cantidad", "$items.precio_unitario"]},
+            "total_venta": "$total"
+        }
+        if pagina is None:
+            pipeline.extend([
+                {"$project": proyeccion},
+                {"$sort": {"fecha": -1, "cliente_nombre": 1}}
+            ])
+        else:
+            proyeccion["linea"] = 1
+            proyeccion["_completa"] = {
+                "$and": [
+                    {"$gt": ["$cliente._id", None]},
+                    {"$gt": ["$items.precio_unitario", None]}
+                ]
+            }
+            pipeline.append({"$project": proyeccion})
+            pipeline.extend(etapas_pagina(pagina, SupermarketReporteModel.ORDEN_PAGINAS_DETALLADO))
+            if campos:
+                campos = campos + ["_completa"]
+
+        if campos:
+            pipeline.append(etapa_project(campos))
+        return pipeline
+
+    @staticmethod
+    def _etapas_pagina_ventas(pagina):
+        """
+        Keyset + $sort + $limit sobre (fecha, _id) de 'ventas' para una página de filas.
+        La venta del cursor vuelve a leerse (puede tener items pendientes) y cada venta
+        aporta al menos una fila, así limite + 2 ventas alcanzan para limite + 1 filas.
+        """
+        etapas = []
+        limite = pagina.limite + 1
+        if pagina.despues is not None:
+            if len(pagina.despues) != len(SupermarketReporteModel.ORDEN_PAGINAS_DETALLADO):
+                raise ValueError("Cursor 'after' inválido para este listado")
+            fecha, venta_id = pagina.despues[:2]
+            etapas.append({"$match": {"$or": [
+                {"fecha": {"$lt": fecha}},
+                {"fecha": fecha, "_id": {"$lte": venta_id}}
+            ]}})
+            limite += 1
+        etapas.append({"$sort": {"fecha": -1, "_id": -1}})
+        etapas.append({"$limit": limite})
+        return etapas
+
+    @staticmethod
+    def generar_reporte_ventas_detallado(campos=None, como_cursor=False, pagina=None, explain=None,
+                                         desde=None, hasta=None):
+        """
+        Reporte detallado de ventas con información de clientes y productos, opcionalmente
+        en el rango de días [desde, hasta]. Con `pagina` retorna solo esa página
+        (ResultadoPagina); con `explain`, el plan de la consulta que se ejecutaría.
+        """
+        ventas = SupermarketReporteModel.collection.ventas
+        if pagina is not None:
+            orden = SupermarketReporteModel.ORDEN_PAGINAS_DETALLADO
+            pipeline = SupermarketReporteModel.pipeline_reporte_ventas_detallado(
+                incluir_orden(campos, orden), pagina, desde, hasta)
+            if explain:
+                return explicar_aggregate(ventas, pipeline, explain)
+            docs = list(ejecutar(ventas, pipeline))
+            total = None
+            if pagina.con_total:
+                total = contar_pipeline(ventas, SupermarketReporteModel.pipeline_reporte_ventas_detallado(
+                    desde=desde, hasta=hasta))
+            resultado = ResultadoPagina(docs, pagina, orden, total)
+            # Las filas de ventas sin cliente o items sin precio solo hacían avanzar el cursor
+            resultado.data = [doc for doc in resultado.data if doc.pop("_completa")]
+            return resultado
+
+        pipeline = SupermarketReporteModel.pipeline_reporte_ventas_detallado(campos, desde=desde, hasta=hasta)
+        if explain:
+            return explicar_aggregate(ventas, pipeline, explain)
+        cursor = ejecutar(ventas, pipeline)
+        return cursor if como_cursor else list(cursor)
+
+    @staticmethod
+    def pipeline_reporte_ventas_por_categoria(campos=None, desde=None, hasta=None):
+        """
+        Pipeline sobre 'ventas_diarias' que suma los rollups por categoría en el rango
+        [desde, hasta] (todas las fechas si no se indica). Agrupa por categoria_id; los
+        nombres se traducen después con la caché de dimensiones.
+        """
+        pipeline = []
+        rango = VentaDiariaModel.filtro_fechas(desde, hasta)
+        if rango:
+            pipeline.append({"$match": rango})
+        pipeline.extend([
             {
-                "$unwind": "$categoria"
+                "$group": {
+                    "_id": "$categoria_id",
+                    "total_ventas": {"$sum": "$lineas"},
+                    "total_cantidad": {"$sum": "$cantidad"},
+                    "total_ingresos": {"$sum": "$ingresos"}
+                }
             },
             {
                 "$project": {
                     "_id": 0,
-                    "venta_id": "$_id",
-                    "fecha": "$fecha",
-                    "cliente_nombre": "$cliente.nombre",
-                    "cliente_email": "$cliente.email",
-                    "producto_nombre": "$producto.nombre",
-                    "categoria_nombre": "$categoria.nombre",
-                    "cantidad": "$items.cantidad",
-                    "precio_unitario": "$producto.precio",
-                    "subtotal": {"$multiply": ["$items.cantidad", "$producto.precio"]},
-                    "total_venta": "$total"
+                    "categoria": "$_id",
+                    "total_ventas": 1,
+                    "total_cantidad": 1,
+                    "total_ingresos": 1
                 }
             },
             {
-                "$sort": {"fecha": -1, "cliente_nombre": 1}
+                "$sort": {"total_ingresos": -1}
             }
-        ]
-        
-        return list(SupermarketReporteModel.collection.ventas.aggregate(pipeline))
+        ])
+
+        if campos:
+            pipeline.append(etapa_project(campos))
+        return pipeline
 
     @staticmethod
-    def generar_reporte_ventas_por_categoria():
+    def generar_reporte_ventas_por_categoria(campos=None, como_cursor=False, explain=None, desde=None, hasta=None):
+        """
+        Reporte de ventas agrupadas por categoría, con el nombre de cada categoría,
+        calculado desde los rollups diarios. Con `explain` retorna el plan del pipeline.
         """
-        Pipeline para generar reporte de ventas agrupadas por categoría.
+        pipeline = SupermarketReporteModel.pipeline_reporte_ventas_por_categoria(campos, desde, hasta)
+        if explain:
+            return explicar_aggregate(VentaDiariaModel.collection, pipeline, explain)
+        categorias = DimensionCache.get("categorias")
+
+        def con_nombres(cursor):
+            for fila in cursor:
+                if "categoria" in fila:
+                    fila["categoria"] = categorias.nombre(fila["categoria"])
+                yield fila
+
+        filas = con_nombres(ejecutar(VentaDiariaModel.collection, pipeline))
+        return filas if como_cursor else list(filas)
+
+    @staticmethod
+    def pipeline_reporte_ventas_por_producto(campos=None, desde=None, hasta=None):
         """
-        pipeline = [
+        Pipeline sobre 'ventas_diarias' que suma los rollups por producto en el rango
+        [desde, hasta]. El $lookup del nombre corre sobre las filas ya agrupadas
+        (una por producto vendido), no sobre cada item.
+        """
+        pipeline = []
+        rango = VentaDiariaModel.filtro_fechas(desde, hasta)
+        if rango:
+            pipeline.append({"$match": rango})
+        categoria_nombre = DimensionCache.get("categorias").expresion_nombre("$_id.categoria_id")
+        pipeline.extend([
+            {
+                "$group": {
+                    "_id": {"producto_id": "$producto_id", "categoria_id": "$categoria_id"},
+                    "total_ventas": {"$sum": "$lineas"},
+                    "total_cantidad": {"$sum": "$cantidad"},
+                    "total_ingresos": {"$sum": "$ingresos"}
+                }
+            },
             {
-                "$unwind": "$items"
+                "$sort": {"total_ingresos": -1, "_id.producto_id": 1}
             },
             {
                 "$lookup": {
                     "from": "productos",
-                    "localField": "items.producto_id",
+                    "localField": "_id.producto_id",
                     "foreignField": "_id",
                     "as": "producto"
                 }
             },
             {
-                "$unwind": "$producto"
-            },
+                "$project": {
+                    "_id": 0,
+                    "producto_id": "$_id.producto_id",
+                    "producto": {"$arrayElemAt": ["$producto.nombre", 0]},
+                    "categoria": categoria_nombre if categoria_nombre is not None else {"$literal": None},
+                    "total_ventas": 1,
+                    "total_cantidad": 1,
+                    "total_ingresos": 1
+                }
+            }
+        ])
+
+        if campos:
+            pipeline.append(etapa_project(campos))
+        return pipeline
+
+    @staticmethod
+    def generar_reporte_ventas_por_producto(campos=None, como_cursor=False, explain=None, desde=None, hasta=None):
+        """
+        Reporte de ventas por producto calculado desde los rollups diarios.
+        Con `explain` retorna el plan del pipeline.
+        """
+        pipeline = SupermarketReporteModel.pipeline_reporte_ventas_por_producto(campos, desde, hasta)
+        if explain:
+            return explicar_aggregate(VentaDiariaModel.collection, pipeline, explain)
+        cursor = ejecutar(VentaDiariaModel.collection, pipeline)
+        return cursor if como_cursor else list(cursor)
+
+    @staticmethod
+    def validar_top(n):
+        """Valida ?n= (por defecto TOP_POR_DEFECTO) y lo retorna como entero."""
+        if n is None or n == "":
+            return SupermarketReporteModel.TOP_POR_DEFECTO
+        try:
+            n = int(n)
+        except ValueError:
+            raise ValueError("El parámetro 'n' debe ser un entero")
+        if not 1 <= n <= SupermarketReporteModel.TOP_MAXIMO:
+            raise ValueError(f"n debe estar entre 1 y {SupermarketReporteModel.TOP_MAXIMO}")
+        return n
+
+    @staticmethod
+    def resolver_categoria(categoria):
+        """?categoria= acepta el id o el nombre de la categoría; retorna el id (None si no se indicó)."""
+        if categoria is None or categoria == "":
+            return None
+        if isinstance(categoria, int) or str(categoria).isdigit():
+            return int(categoria)
+        categoria_id = DimensionCache.get("categorias").id_por_nombre(categoria)
+        if categoria_id is None:
+            raise ValueError(f"Categoría desconocida: '{categoria}'")
+        return categoria_id
+
+    @staticmethod
+    def pipeline_top_productos(n=None, categoria=None, desde=None, hasta=None):
+        """
+        Pipeline sobre 'ventas_diarias' con los `n` productos de mayores ingresos en el
+        rango [desde, hasta], opcionalmente de una categoría. El $group trabaja sobre los
+        rollups (una fila por día y producto) y el $sort + $limit que le sigue conserva
+        solo `n` documentos (en MongoDB 5.2+ el optimizador lo expresa como $topN);
+        el $lookup del nombre corre sobre esos `n`.
+        """
+        n = SupermarketReporteModel.validar_top(n)
+        filtro = VentaDiariaModel.filtro_fechas(desde, hasta) or {}
+        categoria_id = SupermarketReporteModel.resolver_categoria(categoria)
+        if categoria_id is not None:
+            filtro["categoria_id"] = categoria_id
+        pipeline = [{"$match": filtro}] if filtro else []
+        categoria_nombre = DimensionCache.get("categorias").expresion_nombre("$_id.categoria_id")
+        pipeline.extend([
             {
-                "$lookup": {
-                    "from": "categorias",
-                    "localField": "producto.categoria_id",
-                    "foreignField": "_id",
-                    "as": "categoria"
+                "$group": {
+                    "_id": {"producto_id": "$producto_id", "categoria_id": "$categoria_id"},
+                    "total_ventas": {"$sum": "$lineas"},
+                    "total_cantidad": {"$sum": "$cantidad"},
+                    "total_ingresos": {"$sum": "$ingresos"}
                 }
             },
             {
-                "$unwind": "$categoria"
+                "$sort": {"total_ingresos": -1, "_id.producto_id": 1}
             },
             {
-                "$group": {
-                    "_id": "$categoria.nombre",
-                    "total_ventas": {"$sum": 1},
-                    "total_cantidad": {"$sum": "$items.cantidad"},
-                    "total_ingresos": {"$sum": {"$multiply": ["$items.cantidad", "$producto.precio"]}}
+                "$limit": n
+            },
+            {
+                "$lookup": {
+                    "from": "productos",
+                    "localField": "_id.producto_id",
+                    "foreignField": "_id",
+                    "as": "producto"
                 }
             },
             {
                 "$project": {
                     "_id": 0,
-                    "categoria": "$_id",
+                    "producto_id": "$_id.producto_id",
+                    "producto": {"$arrayElemAt": ["$producto.nombre", 0]},
+                    "categoria": categoria_nombre if categoria_nombre is not None else {"$literal": None},
                     "total_ventas": 1,
                     "total_cantidad": 1,
                     "total_ingresos": 1
                 }
-            },
-            {
-                "$sort": {"total_ingresos": -1}
             }
-        ]
-        
-        return list(SupermarketReporteModel.collection.ventas.aggregate(pipeline))
+        ])
+        return pipeline
 
     @staticmethod
-    def generar_ventas_con_productos_unidos():
+    def pipeline_top_clientes(n=None, categoria=None, desde=None, hasta=None):
         """
-        Pipeline de agregación que une ventas con productos (equivalente a joinColecciones.js).
-        Descompone los items de cada venta y los une con la información de productos.
+        Pipeline sobre 'ventas' con los `n` clientes que más gastaron en el rango
+        [desde, hasta] (un $match inicial sobre el índice de fecha). Con `categoria`
+        solo cuentan las ventas con items de esa categoría y el gasto es la suma de esos
+        items; sin ella, el total de cada venta. Como en pipeline_top_productos, el
+        ranking conserva solo `n` documentos y el $lookup a clientes corre sobre ellos.
         """
-        pipeline = [
+        n = SupermarketReporteModel.validar_top(n)
+        filtro = VentaDiariaModel.filtro_fechas(desde, hasta) or {}
+        categoria_id = SupermarketReporteModel.resolver_categoria(categoria)
+        gastado = "$total"
+        if categoria_id is not None:
+            filtro["items.categoria_id"] = categoria_id
+            gastado = {
+                "$sum": {
+                    "$map": {
+                        "input": {"$filter": {"input": "$items", "cond": {"$eq": ["$$this.categoria_id", categoria_id]}}},
+                        "as": "item",
+                        "in": {"$multiply": ["$$item.cantidad", "$$item.precio_unitario"]}
+                    }
+                }
+            }
+        pipeline = [{"$match": filtro}] if filtro else []
+        pipeline.extend([
             {
-                "$unwind": "$items"
+                "$group": {
+                    "_id": "$cliente_id",
+                    "total_compras": {"$sum": 1},
+                    "total_gastado": {"$sum": gastado}
+                }
             },
             {
-                "$lookup": {
-                    "from": "productos",
-                    "localField": "items.producto_id",
-                    "foreignField": "_id",
-                    "as": "producto"
-                }
+                "$sort": {"total_gastado": -1, "_id": 1}
             },
             {
-                "$unwind": "$producto"
+                "$limit": n
             },
             {
-                "$group": {
-                    "_id": "$_id",
-                    "cliente_id": {"$first": "$cliente_id"},
-                    "fecha": {"$first": "$fecha"},
-                    "total": {"$first": "$total"},
-                    "productos": {
-                        "$push": {
-                            "nombre": "$producto.nombre",
-                            "precio": "$producto.precio",
-                            "cantidad": "$items.cantidad"
-                        }
-                    }
+                "$lookup": {
+                    "from": "clientes",
+                    "localField": "_id",
+                    "foreignField": "_id",
+                    "as": "cliente"
                 }
             },
+            {
+                "$project": {
+                    "_id": 0,
+                    "cliente_id": "$_id",
+                    "cliente_nombre": {"$arrayElemAt": ["$cliente.nombre", 0]},
+                    "cliente_email": {"$arrayElemAt": ["$cliente.email", 0]},
+                    "total_compras": 1,
+                    "total_gastado": 1
+                }
+            }
+        ])
+        return pipeline
+
+    @staticmethod
+    def parametros_top(n=None, categoria=None, desde=None, hasta=None):
+        """
+        Normaliza los parámetros de los rankings: n entero, id de categoría y fechas como
+        datetime. Peticiones equivalentes (?n=10 y sin n, nombre o id de la categoría)
+        producen los mismos parámetros y comparten la entrada de caché.
+        """
+        return {
+            "n": SupermarketReporteModel.validar_top(n),
+            "categoria": SupermarketReporteModel.resolver_categoria(categoria),
+            "desde": VentaDiariaModel.validar_fecha(desde, "desde") if desde else None,
+            "hasta": VentaDiariaModel.validar_fecha(hasta, "hasta") if hasta else None
+        }
+
+    @staticmethod
+    def _top_en_cache(reporte, collection, dependencias, pipeline, parametros):
+        """Ejecuta un ranking a través de CacheResultados, versionado por las colecciones que lee."""
+        clave = (reporte, json_util.dumps(parametros, sort_keys=True))
+        version = tuple(sorted(Versiones.obtener(dependencias).items()))
+        return CacheResultados.obtener(clave, version, lambda: list(ejecutar(collection, pipeline)))
+
+    @staticmethod
+    def generar_top_productos(n=None, categoria=None, desde=None, hasta=None, explain=None):
+        """
+        Los `n` productos más vendidos (por ingresos) desde los rollups diarios, en caché
+        por conjunto de parámetros hasta que cambian los rollups, los productos o las categorías.
+        Con `explain` retorna el plan del pipeline (sin caché).
+        """
+        parametros = SupermarketReporteModel.parametros_top(n, categoria, desde, hasta)
+        pipeline = SupermarketReporteModel.pipeline_top_productos(**parametros)
+        if explain:
+            return explicar_aggregate(VentaDiariaModel.collection, pipeline, explain)
+        dependencias = [VentaDiariaModel.collection, ProductoModel.collection, CategoriaModel.collection]
+        return SupermarketReporteModel._top_en_cache(
+            "top-productos", VentaDiariaModel.collection, dependencias, pipeline, parametros)
+
+    @staticmethod
+    def generar_top_clientes(n=None, categoria=None, desde=None, hasta=None, explain=None):
+        """
+        Los `n` clientes con mayor gasto, en caché por conjunto de parámetros hasta que
+        cambian las ventas o los clientes. Con `explain` retorna el plan del pipeline (sin caché).
+        """
+        ventas = SupermarketReporteModel.collection.ventas
+        parametros = SupermarketReporteModel.parametros_top(n, categoria, desde, hasta)
+        pipeline = SupermarketReporteModel.pipeline_top_clientes(**parametros)
+        if explain:
+            return explicar_aggregate(ventas, pipeline, explain)
+        dependencias = [ventas, ClienteModel.collection]
+        return SupermarketReporteModel._top_en_cache("top-clientes", ventas, dependencias, pipeline, parametros)
+
+    @staticmethod
+    def pipeline_ventas_con_productos_unidos(campos=None, desde=None, hasta=None):
+        """
+        Pipeline de agregación que une ventas con productos (equivalente a joinColecciones.js).
+        Los datos del producto ya están copiados en cada item: basta un $project por
+        venta, sin $unwind, $lookup ni $group. El rango [desde, hasta] es un $match inicial.
+        """
+        rango = VentaDiariaModel.filtro_fechas(desde, hasta)
+        pipeline = [{"$match": rango}] if rango else []
+        pipeline += [
             {
                 "$project": {
                     "cliente_id": 1,
                     "fecha": 1,
                     "total": 1,
-                    "productos": 1
+                    "productos": {
+                        "$map": {
+                            "input": {
+                                "$filter": {"input": "$items", "cond": {"$gt": ["$$this.precio_unitario", None]}}
+                            },
+                            "as": "item",
+                            "in": {
+                                "nombre": "$$item.nombre",
+                                "precio": "$$item.precio_unitario",
+                                "cantidad": "$$item.cantidad"
+                            }
+                        }
+                    }
                 }
             }
         ]
         
-        return list(SupermarketReporteModel.collection.ventas.aggregate(pipeline))
\ No newline at end of file
+        if campos:
+            pipeline.append(etapa_project(campos))
+        return pipeline
+
+    @staticmethod
+    def generar_ventas_con_productos_unidos(campos=None, como_cursor=False, explain=None, desde=None, hasta=None):
+        """
+        Ventas con sus productos unidos (equivalente a joinColecciones.js), opcionalmente
+        en el rango de días [desde, hasta]. Con `explain` retorna el plan del pipeline.
+        """
+        pipeline = SupermarketReporteModel.pipeline_ventas_con_productos_unidos(campos, desde, hasta)
+        if explain:
+            return explicar_aggregate(SupermarketReporteModel.collection.ventas, pipeline, explain)
+        cursor = ejecutar(SupermarketReporteModel.collection.ventas, pipeline)
+        return cursor if como_cursor else list(cursor)
\ No newline at end of file
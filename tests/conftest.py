@@ -0,0 +1,164 @@
+"""
+Fixtures compartidas: bases de datos en memoria (mongomock) con un conjunto
+pequeño de datos de ambas bases, con los modelos y la caché de dimensiones
+inicializados sobre ellas.
+
+    pip install pytest mongomock
+    python -m pytest
+"""
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "import"))
+
+import models  # noqa: E402
+import optimizador  # noqa: E402
+import supermarket_models  # noqa: E402
+from cache import CacheResultados, DimensionCache  # noqa: E402
+from conexion import ConexionMongo  # noqa: E402
+from indexes import MODELOS_SUPERMARKET, MODELOS_TAREAS  # noqa: E402
+
+ESTADOS_TAREA = [
+    {"_id": 1, "estado_tarea": "Pendiente"},
+    {"_id": 2, "estado_tarea": "Terminada"},
+    {"_id": 3, "estado_tarea": "Vencida"},
+]
+PROYECTOS = [
+    {"_id": 1, "nombre_proyecto": "Puente", "descripcion_proyecto": "Puente peatonal", "costo": 1000},
+    {"_id": 2, "nombre_proyecto": "Laboratorio", "descripcion_proyecto": "Plantas medicinales", "costo": 2500},
+]
+RESPONSABLES = [
+    {"_id": 1, "nombre_responsable": "Ana", "apellido_responsable": "Ruiz", "edad": 25, "tipo_documento": 1},
+    {"_id": 2, "nombre_responsable": "Bruno", "apellido_responsable": "Díaz", "edad": 40, "tipo_documento": 1},
+    {"_id": 3, "nombre_responsable": "Carla", "apellido_responsable": "Mejía", "edad": 60, "tipo_documento": 2},
+    {"_id": 4, "nombre_responsable": "Ana", "apellido_responsable": "Peña", "edad": 16, "tipo_documento": 2},
+]
+TAREAS = [
+    {"_id": 1, "nombre_tarea": "Tarea 1", "id_proyecto": 1, "id_responsable": 2, "id_estado_tarea": 1},
+    {"_id": 2, "nombre_tarea": "Tarea 2", "id_proyecto": 2, "id_responsable": 1, "id_estado_tarea": 2},
+    {"_id": 3, "nombre_tarea": "Tarea 3", "id_proyecto": 1, "id_responsable": 3, "id_estado_tarea": 3},
+    {"_id": 4, "nombre_tarea": "Tarea 4", "id_proyecto": 2, "id_responsable": 4, "id_estado_tarea": 1},
+    {"_id": 5, "nombre_tarea": "Tarea 5", "id_proyecto": 1, "id_responsable": 1, "id_estado_tarea": 1},
+    # Sin proyecto, con un responsable inexistente y con un estado inexistente:
+    # el reporte no las incluye
+    {"_id": 6, "nombre_tarea": "Tarea 6", "id_proyecto": 99, "id_responsable": 2, "id_estado_tarea": 2},
+    {"_id": 7, "nombre_tarea": "Tarea 7", "id_proyecto": 2, "id_responsable": 99, "id_estado_tarea": 3},
+    {"_id": 8, "nombre_tarea": "Tarea 8", "id_proyecto": 1, "id_responsable": 3, "id_estado_tarea": 7},
+]
+
+CATEGORIAS = [{"_id": 1, "nombre": "Lácteos"}, {"_id": 2, "nombre": "Panadería"}]
+PROVEEDORES = [{"_id": 1, "nombre": "Alquería"}]
+CLIENTES = [
+    {"_id": 1, "nombre": "Lucía", "email": "lucia@example.com"},
+    {"_id": 2, "nombre": "Mateo", "email": "mateo@example.com"},
+    {"_id": 3, "nombre": "Sofía", "email": "sofia@example.com"},
+]
+PRODUCTOS = [
+    {"_id": 1, "nombre": "Leche", "categoria_id": 1, "precio": 4.5},
+    {"_id": 2, "nombre": "Queso", "categoria_id": 1, "precio": 12.0},
+    {"_id": 3, "nombre": "Pan", "categoria_id": 2, "precio": 2.0},
+]
+
+
+def _item(producto_id, cantidad):
+    producto = next(p for p in PRODUCTOS if p["_id"] == producto_id)
+    return {"producto_id": producto_id, "cantidad": cantidad, "precio_unitario": producto["precio"],
+            "categoria_id": producto["categoria_id"], "nombre": producto["nombre"]}
+
+
+VENTAS = [
+    {"_id": 1, "cliente_id": 1, "fecha": datetime(2025, 9, 1), "items": [_item(1, 2), _item(3, 1)], "total": 11.0},
+    {"_id": 2, "cliente_id": 2, "fecha": datetime(2025, 9, 3), "items": [_item(2, 1)], "total": 12.0},
+    {"_id": 3, "cliente_id": 1, "fecha": datetime(2025, 9, 3), "items": [_item(2, 2)], "total": 24.0},
+    {"_id": 4, "cliente_id": 3, "fecha": datetime(2025, 9, 20), "items": [_item(3, 5)], "total": 10.0},
+    {"_id": 5, "cliente_id": 2, "fecha": datetime(2025, 10, 2), "items": [_item(1, 1), _item(2, 1)], "total": 16.5},
+]
+
+
+def _sin_sort(metodo):
+    """pymongo >= 4.9 pasa `sort` a las operaciones de bulk_write; mongomock no lo acepta."""
+    def envoltura(self, *args, sort=None, **kwargs):
+        return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+@pytest.fixture
+def bases(monkeypatch):
+    """Bases mi_db y supermarket en memoria, con datos y los modelos inicializados."""
+    mongomock = pytest.importorskip("mongomock")
+    builder = mongomock.collection.BulkOperationBuilder
+    for nombre in ("add_replace", "add_update"):
+        monkeypatch.setattr(builder, nombre, _sin_sort(getattr(builder, nombre)))
+    # mongomock dice ser 5.0 pero no implementa el $lookup con sub-pipeline ni $topN:
+    # los modelos ejecutan sus pipelines sin las reglas que dependen de la versión
+    monkeypatch.setattr(optimizador, "version_servidor", lambda client: None)
+    cliente = mongomock.MongoClient()
+    tareas = cliente["mi_db"]
+    supermarket = cliente["supermarket"]
+    for nombre, docs in (("estados_tarea", ESTADOS_TAREA), ("proyectos", PROYECTOS),
+                         ("responsables", RESPONSABLES), ("tareas", TAREAS)):
+        tareas[nombre].insert_many([dict(doc) for doc in docs])
+    for nombre, docs in (("categorias", CATEGORIAS), ("proveedores", PROVEEDORES), ("clientes", CLIENTES),
+                         ("productos", PRODUCTOS), ("ventas", VENTAS)):
+        supermarket[nombre].insert_many([dict(doc) for doc in docs])
+
+    mongo_tareas = SimpleNamespace(db=tareas)
+    mongo_supermarket = SimpleNamespace(db=supermarket)
+    for modelo in MODELOS_TAREAS:
+        modelo.init(mongo_tareas)
+    for modelo in MODELOS_SUPERMARKET:
+        modelo.init(mongo_supermarket)
+    DimensionCache.init(mongo_tareas, mongo_supermarket)
+    # Los contadores de versión empiezan en 0 en cada base nueva: nada de otra prueba sirve
+    CacheResultados.init()
+    return SimpleNamespace(cliente=cliente, tareas=tareas, supermarket=supermarket)
+
+
+@pytest.fixture
+def con_merge(monkeypatch):
+    """
+    mongomock no implementa $merge: los pipelines de los modelos que terminan en
+    $merge (replace/insert sobre `on`) se emulan con replace_one(upsert=True).
+    """
+    ejecutar = optimizador.ejecutar
+
+    def ejecutar_con_merge(collection, pipeline, **opciones):
+        if not pipeline or "$merge" not in pipeline[-1]:
+            return ejecutar(collection, pipeline, **opciones)
+        merge = pipeline[-1]["$merge"]
+        destino = collection.database[merge["into"]]
+        claves = merge.get("on", "_id")
+        claves = [claves] if isinstance(claves, str) else claves
+        for doc in ejecutar(collection, pipeline[:-1]):
+            destino.replace_one({clave: doc[clave] for clave in claves}, doc, upsert=True)
+        return iter(())
+
+    for modulo in (models, supermarket_models):
+        monkeypatch.setattr(modulo, "ejecutar", ejecutar_con_merge)
+
+
+@pytest.fixture
+def api(bases):
+    """Cliente de pruebas de Flask con los blueprints de la API sobre las bases en memoria."""
+    from flask import Flask
+    from controllers import reporte_bp, user_bp
+    from supermarket_controllers import supermarket_bp
+    app = Flask(__name__)
+    for blueprint in (user_bp, reporte_bp, supermarket_bp):
+        app.register_blueprint(blueprint)
+    return app.test_client()
+
+
+@pytest.fixture
+def conexion(bases, monkeypatch):
+    """ConexionMongo entrega las bases en memoria a los scripts (importadores, migraciones)."""
+    monkeypatch.setattr(ConexionMongo, "init", staticmethod(lambda config, listeners=(): bases.cliente))
+    monkeypatch.setattr(ConexionMongo, "cerrar", staticmethod(lambda: None))
+    monkeypatch.setattr(ConexionMongo, "client", bases.cliente)
+    return bases
@@ -0,0 +1,85 @@
+"""
+Historial de compras de un cliente (paginado sobre el índice (cliente_id, fecha, _id)) y
+su resumen en clientes_stats: reconstruido desde ventas o sumado venta a venta.
+"""
+from datetime import datetime
+
+import pytest
+
+from supermarket_models import ClienteStatsModel, VentaModel
+
+
+def _por_id(coleccion):
+    return {doc["_id"]: doc for doc in coleccion.find()}
+
+
+def test_historial_de_la_mas_reciente_a_la_mas_antigua(api):
+    respuesta = api.get("/supermarket/clientes/1/ventas?fields=total")
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()
+    assert [(venta["_id"], venta["total"]) for venta in datos["data"]] == [(3, 24.0), (1, 11.0)]
+    assert datos["limit"] == 100 and datos["siguiente"] is None
+
+
+def test_historial_paginado_y_por_rango(api):
+    primera = api.get("/supermarket/clientes/2/ventas?limit=1&total=1").get_json()
+    assert [venta["_id"] for venta in primera["data"]] == [5]
+    assert primera["total"] == 2
+    segunda = api.get(f"/supermarket/clientes/2/ventas?limit=1&after={primera['siguiente']}").get_json()
+    assert [venta["_id"] for venta in segunda["data"]] == [2]
+    assert segunda["siguiente"] is None
+
+    septiembre = api.get("/supermarket/clientes/2/ventas?desde=2025-09-01&hasta=2025-09-30").get_json()
+    assert [venta["_id"] for venta in septiembre["data"]] == [2]
+
+
+@pytest.mark.parametrize("consulta", ["limit=0", "after=no-es-un-cursor", "desde=ayer"])
+def test_historial_parametros_invalidos(api, consulta):
+    respuesta = api.get(f"/supermarket/clientes/1/ventas?{consulta}")
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["success"] is False
+
+
+def test_incremental_coincide_con_la_reconstruccion(bases):
+    ClienteStatsModel.reconstruir()
+    reconstruido = _por_id(bases.supermarket.clientes_stats)
+    bases.supermarket.clientes_stats.delete_many({})
+    ClienteStatsModel.registrar_ventas(list(bases.supermarket.ventas.find()))
+    assert _por_id(bases.supermarket.clientes_stats) == reconstruido
+
+
+def test_recalcular_clientes(bases, con_merge):
+    ClienteStatsModel.reconstruir()
+    bases.supermarket.ventas.delete_many({"cliente_id": 3})
+    bases.supermarket.ventas.update_one({"_id": 5}, {"$set": {"total": 20.0}})
+    assert ClienteStatsModel.recalcular_clientes([2, 3, 2]) == 2
+    # El cliente que quedó sin ventas pierde su resumen
+    assert ClienteStatsModel.get_resumen(3) is None
+    assert ClienteStatsModel.get_resumen(2)["total_gastado"] == 32.0
+
+
+def test_resumen(api, bases):
+    ClienteStatsModel.registrar_ventas(list(bases.supermarket.ventas.find()))
+    respuesta = api.get("/supermarket/clientes/1/resumen")
+    assert respuesta.status_code == 200
+    resumen = respuesta.get_json()["data"]
+    assert resumen["cliente_id"] == 1
+    assert resumen["compras"] == 2
+    assert resumen["total_gastado"] == 35.0
+    assert resumen["ticket_promedio"] == 17.5
+    assert resumen["categoria_favorita"] == {"categoria_id": 1, "nombre": "Lácteos", "gasto": 33.0}
+    assert ClienteStatsModel.get_resumen(1)["ultima_compra"] == datetime(2025, 9, 3)
+
+
+def test_resumen_sin_compras_y_cliente_inexistente(api, bases):
+    bases.supermarket.clientes.insert_one({"_id": 4, "nombre": "Tomás"})
+    respuesta = api.get("/supermarket/clientes/4/resumen")
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["data"]["compras"] == 0
+    assert api.get("/supermarket/clientes/99/resumen").status_code == 404
+
+
+def test_historial_sin_paginar_usa_el_orden_del_indice(bases):
+    assert [venta["_id"] for venta in VentaModel.get_ventas_por_cliente(2)] == [5, 2]
+    claves = list(VentaModel.indices[0].document["key"].items())
+    assert claves == [("cliente_id", 1)] + VentaModel.ORDEN_HISTORIAL
@@ -0,0 +1,88 @@
+"""
+Importador (import/importar.py): la vista reporte_tareas queda al día después de una
+importación completa o delta de mi_db.
+"""
+import csv
+import os
+import shutil
+
+import pytest
+
+import importar
+from models import ReporteModel
+
+CAMPOS_REPORTE = ["nombre_tarea", "estado_tarea", "nombre_proyecto", "nombre_responsable",
+                  "apellido_responsable", "edad", "grupo_etareo"]
+
+
+@pytest.fixture
+def csv_tareas(tmp_path):
+    """Copia de los CSV de BD Tareas que cada prueba puede modificar."""
+    destino = tmp_path / "BD Tareas"
+    shutil.copytree(os.path.join(importar.RAIZ, "BD Tareas"), destino)
+    return destino
+
+
+def editar_csv(ruta, cambiar):
+    """Reescribe un CSV aplicando `cambiar(filas)` a la lista de filas (dicts)."""
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        lector = csv.DictReader(archivo)
+        columnas, filas = lector.fieldnames, list(lector)
+    filas = cambiar(filas)
+    with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=columnas)
+        escritor.writeheader()
+        escritor.writerows(filas)
+
+
+def _filas(docs):
+    return sorted(tuple(doc.get(campo) for campo in CAMPOS_REPORTE) for doc in docs)
+
+
+def vista(bases):
+    return bases.tareas[ReporteModel.VISTA_MATERIALIZADA]
+
+
+def assert_vista_al_dia(bases):
+    assert _filas(vista(bases).find()) == _filas(ReporteModel.generar_reporte_tareas())
+
+
+def test_importacion_completa_reconstruye_la_vista(conexion, con_merge, csv_tareas):
+    importar.importar(["tareas"], directorios={"tareas": str(csv_tareas)}, indices=False)
+    assert vista(conexion).count_documents({}) > 0
+    assert_vista_al_dia(conexion)
+
+
+def test_importacion_delta_refresca_solo_lo_afectado(conexion, con_merge, csv_tareas, monkeypatch):
+    # La primera corrida delta escribe el manifiesto
+    importar.importar(["tareas"], directorios={"tareas": str(csv_tareas)}, indices=False, delta=True)
+    assert_vista_al_dia(conexion)
+
+    def renombrar(filas):
+        for fila in filas:
+            if fila["_id"] == "2":
+                fila["nombre_responsable"] = "Ángela María"
+        return filas
+
+    editar_csv(csv_tareas / "responsable.csv", renombrar)
+    editar_csv(csv_tareas / "tarea.csv", lambda filas: [f for f in filas if f["_id"] != "1"])
+
+    llamadas = []
+    refrescar = ReporteModel.refrescar_reporte_materializado
+    monkeypatch.setattr(ReporteModel, "refrescar_reporte_materializado",
+                        staticmethod(lambda **ids: llamadas.append(ids) or refrescar(**ids)))
+    importar.importar(["tareas"], directorios={"tareas": str(csv_tareas)}, indices=False, delta=True)
+
+    assert llamadas == [{"ids_tareas": [1], "ids_responsables": [2], "ids_proyectos": [], "ids_estados": []}]
+    assert vista(conexion).count_documents({"_id": 1}) == 0
+    assert vista(conexion).count_documents({"id_responsable": 2, "nombre_responsable": "Ángela María"}) > 0
+    assert_vista_al_dia(conexion)
+
+
+def test_importacion_delta_sin_cambios_no_refresca(conexion, con_merge, csv_tareas, monkeypatch):
+    importar.importar(["tareas"], directorios={"tareas": str(csv_tareas)}, indices=False, delta=True)
+    llamadas = []
+    monkeypatch.setattr(ReporteModel, "refrescar_reporte_materializado",
+                        staticmethod(lambda **ids: llamadas.append(ids)))
+    importar.importar(["tareas"], directorios={"tareas": str(csv_tareas)}, indices=False, delta=True)
+    assert llamadas == []
@@ -0,0 +1,82 @@
+"""
+Importación delta (import/importar_delta.py) de una colección con su manifiesto: filas
+sin cambios, actualizadas y eliminadas, y documentos que la API agregó por fuera del CSV.
+"""
+import csv
+
+import pytest
+
+from importar import COLECCIONES_SUPERMARKET
+from importar_delta import importar_base_delta
+
+CATEGORIAS = [c for c in COLECCIONES_SUPERMARKET if c[0] == "categorias"]
+
+
+@pytest.fixture
+def categorias(bases):
+    bases.supermarket.categorias.delete_many({})
+    return bases.supermarket.categorias
+
+
+def escribir_csv(directorio, filas):
+    with open(directorio / "categorias.csv", "w", encoding="utf-8", newline="") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["_id", "nombre", "descripcion"])
+        escritor.writerows(filas)
+
+
+def importar(bases, directorio):
+    resultado, = importar_base_delta(bases.supermarket, str(directorio), CATEGORIAS)
+    return resultado
+
+
+def contadores(resultado):
+    return {clave: resultado[clave] for clave in ("insertadas", "actualizadas", "eliminadas", "sin_cambios", "sobrantes")}
+
+
+def test_primera_corrida_no_elimina_lo_que_no_vino_del_csv(bases, categorias, tmp_path):
+    categorias.insert_one({"_id": 50, "nombre": "Creada por la API"})
+    escribir_csv(tmp_path, [(1, "Lácteos", "Leche"), (2, "Granos", "Arroz")])
+
+    resultado = importar(bases, tmp_path)
+    assert contadores(resultado) == {"insertadas": 2, "actualizadas": 0, "eliminadas": 0, "sin_cambios": 0,
+                                     "sobrantes": 1}
+    assert sorted(doc["_id"] for doc in categorias.find()) == [1, 2, 50]
+
+
+def test_archivo_sin_cambios_con_documentos_de_la_api(bases, categorias, tmp_path):
+    escribir_csv(tmp_path, [(1, "Lácteos", "Leche"), (2, "Granos", "Arroz")])
+    importar(bases, tmp_path)
+    categorias.insert_one({"_id": 50, "nombre": "Creada por la API"})
+
+    resultado = importar(bases, tmp_path)
+    assert resultado["archivo_sin_cambios"]
+    assert resultado["sin_cambios"] == 2
+    assert categorias.count_documents({}) == 3
+
+
+def test_actualiza_y_elimina_solo_filas_del_csv(bases, categorias, tmp_path):
+    escribir_csv(tmp_path, [(1, "Lácteos", "Leche"), (2, "Granos", "Arroz"), (3, "Aseo", "Jabón")])
+    importar(bases, tmp_path)
+    categorias.insert_one({"_id": 50, "nombre": "Creada por la API"})
+
+    escribir_csv(tmp_path, [(1, "Lácteos", "Leche"), (2, "Granos", "Arroz y fríjol")])
+    resultado = importar(bases, tmp_path)
+    assert contadores(resultado) == {"insertadas": 0, "actualizadas": 1, "eliminadas": 1, "sin_cambios": 1,
+                                     "sobrantes": 0}
+    assert sorted(doc["_id"] for doc in categorias.find()) == [1, 2, 50]
+    assert categorias.find_one({"_id": 2})["descripcion"] == "Arroz y fríjol"
+
+
+def test_manifiesto_no_confiable_no_elimina(bases, categorias, tmp_path):
+    escribir_csv(tmp_path, [(1, "Lácteos", "Leche"), (2, "Granos", "Arroz")])
+    importar(bases, tmp_path)
+    # Una fila registrada en el manifiesto se borró por fuera del importador
+    categorias.delete_one({"_id": 1})
+    categorias.insert_many([{"_id": 50, "nombre": "API"}, {"_id": 51, "nombre": "API"}])
+
+    resultado = importar(bases, tmp_path)
+    assert not resultado["archivo_sin_cambios"]
+    assert contadores(resultado) == {"insertadas": 1, "actualizadas": 0, "eliminadas": 0, "sin_cambios": 1,
+                                     "sobrantes": 2}
+    assert sorted(doc["_id"] for doc in categorias.find()) == [1, 2, 50, 51]
@@ -0,0 +1,152 @@
+"""
+Asesor de índices (diagnosticar/asesorar sobre explains fijos) y registro de índices
+(aplicar_indices sobre mongomock).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import indexes
+from indexes import MODELOS, aplicar_indices, asesorar, diagnosticar
+
+
+def _explain_find(etapa, retornados, examinados, keys=0):
+    return {
+        "queryPlanner": {"winningPlan": etapa},
+        "executionStats": {"nReturned": retornados, "totalDocsExamined": examinados, "totalKeysExamined": keys},
+    }
+
+
+IXSCAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "categoria_id_1"}}
+
+
+def test_diagnosticar_collscan():
+    diagnostico = diagnosticar(_explain_find({"stage": "COLLSCAN"}, 40, 40))
+    assert diagnostico == {
+        "problemas": ["COLLSCAN"],
+        "estadisticas": {"nReturned": 40, "totalDocsExamined": 40, "totalKeysExamined": 0},
+    }
+
+
+def test_diagnosticar_ixscan_selectivo_sin_problemas():
+    assert diagnosticar(_explain_find(IXSCAN, 25, 25, 25))["problemas"] == []
+
+
+def test_diagnosticar_ixscan_poco_selectivo():
+    diagnostico = diagnosticar(_explain_find(IXSCAN, 3, 900, 900))
+    assert diagnostico["problemas"] == ["índice poco selectivo (docsExamined/nReturned alto)"]
+    assert diagnostico["estadisticas"]["totalDocsExamined"] == 900
+
+
+def test_diagnosticar_sin_resultados_cuenta_lo_examinado():
+    assert diagnosticar(_explain_find(IXSCAN, 0, 5, 5))["problemas"] == []
+    assert diagnosticar(_explain_find(IXSCAN, 0, 50, 50))["problemas"] == [
+        "índice poco selectivo (docsExamined/nReturned alto)"
+    ]
+
+
+@pytest.mark.parametrize("explain", [
+    # $group empujado al plan de consulta (SBE): 900 ventas resumidas en 3 grupos
+    _explain_find({"stage": "GROUP", "inputStage": IXSCAN}, 3, 900, 900),
+    {"stages": [
+        {"$cursor": _explain_find({"stage": "GROUP", "inputStage": IXSCAN}, 3, 900, 900)},
+        {"$sort": {"sortKey": {"total": -1}}},
+    ]},
+    {"stages": [
+        {"$cursor": _explain_find(IXSCAN, 3, 900, 900)},
+        {"$bucketAuto": {"groupBy": "$total", "buckets": 3}},
+    ]},
+])
+def test_diagnosticar_agrupacion_no_es_poco_selectiva(explain):
+    assert "índice poco selectivo (docsExamined/nReturned alto)" not in diagnosticar(explain)["problemas"]
+
+
+def test_diagnosticar_sort_en_memoria():
+    etapa = {"stage": "SORT", "sortPattern": {"fecha": -1}, "inputStage": IXSCAN}
+    assert diagnosticar(_explain_find(etapa, 10, 10, 10))["problemas"] == ["SORT en memoria"]
+
+
+def test_diagnosticar_pipeline():
+    explain = {"stages": [
+        {"$cursor": _explain_find({"stage": "COLLSCAN"}, 100, 100)},
+        {"$lookup": {"from": "clientes"}, "strategy": "HashJoin", "stage": "EQ_LOOKUP"},
+        {"$sort": {"sortKey": {"fecha": -1}}},
+    ]}
+    diagnostico = diagnosticar(explain)
+    assert diagnostico["problemas"] == ["$lookup con HashJoin", "$sort en memoria", "COLLSCAN"]
+    assert diagnostico["estadisticas"]["nReturned"] == 100
+
+
+def test_diagnosticar_lookup_con_indice():
+    explain = {"stages": [
+        {"$cursor": _explain_find(IXSCAN, 10, 10, 10)},
+        {"$lookup": {"from": "clientes"}, "strategy": "IndexedLoopJoin", "stage": "EQ_LOOKUP"},
+    ]}
+    assert diagnosticar(explain)["problemas"] == []
+
+
+def test_asesorar_ejecuta_explain_de_cada_consulta(monkeypatch):
+    comandos = []
+    planes = {
+        "productos": _explain_find({"stage": "COLLSCAN"}, 5, 5),
+        "ventas": _explain_find(IXSCAN, 2, 2, 2),
+    }
+
+    def comando(nombre, cmd, verbosity):
+        comandos.append((nombre, cmd, verbosity))
+        return planes[cmd["find"]]
+
+    db = SimpleNamespace(command=comando, client=None)
+    consultas = [
+        ("ProductoModel.get_productos_por_categoria", SimpleNamespace(name="productos", database=db),
+         {"find": "productos", "filter": {"categoria_id": 1}}),
+        ("VentaModel.get_ventas_por_cliente", SimpleNamespace(name="ventas", database=db),
+         {"find": "ventas", "filter": {"cliente_id": 1}}),
+    ]
+    monkeypatch.setattr(indexes, "consultas_registradas", lambda: consultas)
+
+    informe = asesorar()
+    assert [c[0] for c in comandos] == ["explain", "explain"]
+    assert all(c[2] == "executionStats" for c in comandos)
+    assert [(e["consulta"], e["coleccion"], e["problemas"]) for e in informe] == [
+        ("ProductoModel.get_productos_por_categoria", "productos", ["COLLSCAN"]),
+        ("VentaModel.get_ventas_por_cliente", "ventas", []),
+    ]
+
+
+def _indices_creados(bases):
+    return {
+        f"{db.name}.{nombre}": sorted(db[nombre].index_information())
+        for db in (bases.tareas, bases.supermarket)
+        for nombre in db.list_collection_names()
+    }
+
+
+def test_aplicar_indices_es_idempotente(bases):
+    primero = aplicar_indices()
+    assert "errores" not in primero
+    creados = _indices_creados(bases)
+
+    segundo = aplicar_indices()
+    assert segundo == primero
+    assert _indices_creados(bases) == creados
+
+
+def test_aplicar_indices_crea_los_indices_declarados(bases):
+    resultado = aplicar_indices()
+    declarados = {}
+    for modelo in MODELOS:
+        for coleccion, lista in indexes._destinos(modelo):
+            if lista:
+                destino = f"{coleccion.database.name}.{coleccion.name}"
+                declarados[destino] = [indice.document["name"] for indice in lista]
+    assert resultado == declarados
+    for destino, nombres in declarados.items():
+        base, coleccion = destino.split(".", 1)
+        existentes = getattr(bases, "tareas" if base == "mi_db" else "supermarket")[coleccion].index_information()
+        assert set(nombres) <= set(existentes)
+
+
+@pytest.mark.parametrize("modelos", [[], [indexes.UserModel]])
+def test_aplicar_indices_sin_indices_declarados(bases, modelos):
+    assert aplicar_indices(modelos) == {}
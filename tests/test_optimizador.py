@@ -0,0 +1,223 @@
+"""
+Reglas del optimizador: entrada -> salida fija de cada reescritura, las reglas que
+dependen de la versión del servidor y, donde mongomock puede ejecutarlos, que el
+pipeline original y el optimizado dan el mismo resultado.
+
+mongomock no implementa el $lookup con sub-pipeline ni el acumulador $topN, así
+que proyectar_lookup y agrupar_top_n solo se verifican por su forma.
+"""
+import pytest
+
+from models import ReporteModel
+from optimizador import (
+    REGLAS, adelantar_match, agrupar_top_n, comparar, optimizar, opciones_aggregate, proyectar_lookup, unir_match
+)
+from supermarket_models import SupermarketReporteModel
+
+LOOKUP_PROYECTO = {"$lookup": {"from": "proyectos", "localField": "id_proyecto", "foreignField": "_id", "as": "proyecto"}}
+
+# Un $lookup cuyos campos usa un $project y un ranking ($group + $sort + $limit):
+# las dos reglas que dependen de la versión del servidor tienen algo que reescribir
+PIPELINE_VERSIONADO = [
+    LOOKUP_PROYECTO,
+    {"$unwind": "$proyecto"},
+    {"$project": {"id_responsable": 1, "nombre_proyecto": "$proyecto.nombre_proyecto"}},
+    {"$group": {"_id": "$id_responsable", "tareas": {"$sum": 1}}},
+    {"$sort": {"tareas": -1, "_id": 1}},
+    {"$limit": 2},
+]
+
+
+def test_reglas_registradas():
+    assert [nombre for nombre, _, _ in REGLAS] == [
+        "unir_match", "adelantar_match", "proyectar_lookup", "agrupar_top_n"
+    ]
+
+
+def test_unir_match_combina_condiciones_disjuntas():
+    etapas = [{"$match": {"a": 1}}, {"$match": {"b": {"$gt": 2}}}, {"$sort": {"a": 1}}]
+    assert unir_match(etapas) == [{"$match": {"a": 1, "b": {"$gt": 2}}}, {"$sort": {"a": 1}}]
+
+
+def test_unir_match_usa_and_si_comparten_campos():
+    etapas = [{"$match": {"a": {"$gt": 1}}}, {"$match": {"a": {"$lt": 5}}}]
+    assert unir_match(etapas) == [{"$match": {"$and": [{"a": {"$gt": 1}}, {"a": {"$lt": 5}}]}}]
+
+
+def test_unir_match_sin_match_seguidos():
+    assert unir_match([{"$match": {"a": 1}}, {"$sort": {"a": 1}}, {"$match": {"b": 1}}]) is None
+
+
+def test_adelantar_match_antes_de_lookup_y_unwind():
+    etapas = [LOOKUP_PROYECTO, {"$unwind": "$proyecto"}, {"$match": {"id_estado_tarea": 1}}]
+    assert optimizar(etapas) == [{"$match": {"id_estado_tarea": 1}}, LOOKUP_PROYECTO, {"$unwind": "$proyecto"}]
+
+
+def test_adelantar_match_no_cruza_el_campo_que_crea_el_lookup():
+    etapas = [LOOKUP_PROYECTO, {"$unwind": "$proyecto"}, {"$match": {"proyecto.costo": {"$gt": 1500}}}]
+    assert adelantar_match(etapas) is None
+
+
+@pytest.mark.parametrize("anterior", [
+    {"$group": {"_id": "$id_proyecto", "n": {"$sum": 1}}},
+    {"$addFields": {"id_estado_tarea": 0}},
+    {"$project": {"estado": "$id_estado_tarea"}},
+    {"$project": {"id_estado_tarea": 0}},
+    {"$unwind": {"path": "$items", "includeArrayIndex": "id_estado_tarea"}},
+    {"$limit": 10},
+])
+def test_adelantar_match_no_cruza_etapas_que_cambian_el_campo(anterior):
+    assert adelantar_match([anterior, {"$match": {"id_estado_tarea": 1}}]) is None
+
+
+def test_adelantar_match_cruza_project_que_conserva_el_campo():
+    etapas = [{"$project": {"id_estado_tarea": 1, "nombre": "$nombre_tarea"}}, {"$match": {"id_estado_tarea": 1}}]
+    assert adelantar_match(etapas) == [etapas[1], etapas[0]]
+
+
+def test_adelantar_match_no_mueve_expr():
+    etapas = [LOOKUP_PROYECTO, {"$match": {"$expr": {"$gt": ["$costo", 1]}}}]
+    assert adelantar_match(etapas) is None
+
+
+def test_proyectar_lookup_trae_solo_los_campos_usados():
+    etapas = [
+        LOOKUP_PROYECTO,
+        {"$unwind": "$proyecto"},
+        {"$project": {"nombre": "$proyecto.nombre_proyecto", "costo": "$proyecto.costo"}},
+    ]
+    resultado = proyectar_lookup(etapas)
+    assert resultado[0] == {"$lookup": {
+        **LOOKUP_PROYECTO["$lookup"], "pipeline": [{"$project": {"costo": 1, "nombre_proyecto": 1, "_id": 0}}]
+    }}
+    assert resultado[1:] == etapas[1:]
+    # Con el sub-pipeline ya puesto no hay nada más que reescribir
+    assert proyectar_lookup(resultado) is None
+
+
+@pytest.mark.parametrize("siguientes", [
+    # El documento unido completo llega a la salida
+    [{"$unwind": "$proyecto"}],
+    [{"$unwind": "$proyecto"}, {"$project": {"proyecto": 1}}],
+    [{"$addFields": {"copia": "$proyecto"}}, {"$project": {"copia": 1}}],
+])
+def test_proyectar_lookup_no_recorta_si_se_usa_el_documento_completo(siguientes):
+    assert proyectar_lookup([LOOKUP_PROYECTO] + siguientes) is None
+
+
+def test_agrupar_top_n_despues_de_group():
+    grupo = {"$group": {"_id": "$cliente_id", "total": {"$sum": "$total"}}}
+    etapas = [grupo, {"$sort": {"total": -1, "_id": 1}}, {"$limit": 3}, {"$project": {"total": 1}}]
+    assert agrupar_top_n(etapas) == [
+        grupo,
+        {"$group": {"_id": None, "top": {"$topN": {"n": 3, "sortBy": {"total": -1, "_id": 1}, "output": "$$ROOT"}}}},
+        {"$unwind": "$top"},
+        {"$replaceWith": "$top"},
+        {"$project": {"total": 1}},
+    ]
+
+
+def test_agrupar_top_n_solo_detras_de_group():
+    # Sin $group delante el $sort puede resolverse con un índice
+    assert agrupar_top_n([{"$match": {"a": 1}}, {"$sort": {"total": -1}}, {"$limit": 3}]) is None
+    assert agrupar_top_n([{"$group": {"_id": "$a"}}, {"$sort": {"_id": 1}}]) is None
+
+
+@pytest.mark.parametrize("version, esperadas", [
+    (None, []),
+    ((4, 4), []),
+    ((5, 0), ["proyectar_lookup"]),
+    ((5, 1), ["proyectar_lookup"]),
+    ((5, 2), ["proyectar_lookup", "agrupar_top_n"]),
+    ((7, 0), ["proyectar_lookup", "agrupar_top_n"]),
+])
+def test_reglas_por_version_del_servidor(version, esperadas):
+    aplicadas = []
+    optimizado = optimizar(PIPELINE_VERSIONADO, version, aplicadas)
+    assert aplicadas == esperadas
+    operadores = [next(iter(etapa)) for etapa in optimizado]
+    assert ("pipeline" in optimizado[0]["$lookup"]) == ("proyectar_lookup" in esperadas)
+    assert ("$replaceWith" in operadores) == ("agrupar_top_n" in esperadas)
+
+
+def test_optimizar_no_modifica_el_pipeline():
+    original = [LOOKUP_PROYECTO, {"$match": {"id_estado_tarea": 1}}, {"$match": {"id_responsable": 2}}]
+    copia = [dict(etapa) for etapa in original]
+    optimizar(original, (7, 0))
+    assert original == copia
+
+
+def test_opciones_aggregate():
+    assert opciones_aggregate([{"$match": {"a": 1}}]) == {"batchSize": 1000}
+    assert opciones_aggregate([{"$sort": {"a": 1}}]) == {"allowDiskUse": True, "batchSize": 1000}
+    assert opciones_aggregate([{"$group": {"_id": "$a"}}, {"$merge": {"into": "x"}}]) == {"allowDiskUse": True}
+
+
+def test_reporte_tareas_en_mongodb_5_proyecta_los_lookup(bases):
+    optimizado = optimizar(ReporteModel.pipeline_reporte_tareas(), (5, 0))
+    proyecciones = {
+        etapa["$lookup"]["from"]: etapa["$lookup"]["pipeline"]
+        for etapa in optimizado if "$lookup" in etapa
+    }
+    assert proyecciones == {
+        "proyectos": [{"$project": {"nombre_proyecto": 1, "_id": 0}}],
+        "responsables": [{"$project": {"apellido_responsable": 1, "edad": 1, "nombre_responsable": 1, "_id": 0}}],
+    }
+
+
+def test_equivalente_match_adelantado_y_unido(bases):
+    pipeline = [
+        LOOKUP_PROYECTO,
+        {"$unwind": "$proyecto"},
+        {"$match": {"id_estado_tarea": {"$in": [1, 2]}}},
+        {"$match": {"id_responsable": {"$ne": 3}}},
+        {"$project": {"_id": 1, "nombre_proyecto": "$proyecto.nombre_proyecto"}},
+        {"$sort": {"_id": 1}},
+    ]
+    resultado = comparar(bases.tareas.tareas, pipeline)
+    assert resultado["reglas"] == ["unir_match", "adelantar_match"]
+    assert resultado["equivalente"]
+    assert resultado["filas"] == resultado["filas_optimizado"] == 4
+
+
+def test_equivalente_match_que_no_se_adelanta(bases):
+    pipeline = [
+        LOOKUP_PROYECTO,
+        {"$unwind": "$proyecto"},
+        {"$match": {"proyecto.costo": {"$gt": 1500}}},
+        {"$project": {"_id": 1}},
+    ]
+    resultado = comparar(bases.tareas.tareas, pipeline)
+    assert resultado["reglas"] == []
+    assert resultado["equivalente"]
+
+
+def _match_al_final(pipeline, despues_de):
+    """El $match inicial del pipeline, escrito en cambio después de la etapa `despues_de`."""
+    match, resto = pipeline[0], pipeline[1:]
+    posicion = next(i for i, etapa in enumerate(resto) if despues_de in etapa) + 1
+    return resto[:posicion] + [match] + resto[posicion:]
+
+
+@pytest.mark.parametrize("params", [
+    {"estado": "Pendiente"},
+    {"estado": "Pendiente,Vencida", "id_proyecto": "1"},
+    {"grupo_etareo": "adulto joven"},
+])
+def test_equivalente_reporte_tareas_con_filtro_despues_del_join(bases, params):
+    pipeline = ReporteModel.pipeline_reporte_tareas(ReporteModel.compilar_filtro_tareas(params))
+    pipeline = _match_al_final(pipeline, "$addFields")
+    resultado = comparar(bases.tareas.tareas, pipeline, (4, 4))
+    assert resultado["reglas"] == ["adelantar_match"]
+    assert resultado["equivalente"]
+    assert resultado["filas"] > 0
+
+
+def test_equivalente_ventas_detallado_con_rango_despues_del_join(bases):
+    pipeline = SupermarketReporteModel.pipeline_reporte_ventas_detallado(desde="2025-09-01", hasta="2025-09-30")
+    pipeline = _match_al_final(pipeline, "$unwind")
+    # El $match del rango vuelve antes del $unwind y del $lookup a clientes
+    resultado = comparar(bases.supermarket.ventas, pipeline, (4, 4))
+    assert resultado["reglas"] == ["adelantar_match"]
+    assert resultado["equivalente"]
+    assert resultado["filas"] == 5
@@ -0,0 +1,157 @@
+"""
+Reporte de tareas: páginas en modo directo (keyset sobre 'tareas' antes de los $lookup)
+y en modo materializado (vista reporte_tareas), con la vuelta a modo directo cuando la
+vista no está al día, y los filtros de consulta compilados a un $match inicial.
+"""
+import pytest
+
+from models import ReporteModel
+from paginacion import Pagina, decodificar_cursor
+from versioning import Versiones
+
+
+def recorrer(limite, **opciones):
+    """Todas las páginas del reporte; retorna (filas, número de páginas)."""
+    filas, paginas, despues = [], 0, None
+    while True:
+        resultado = ReporteModel.generar_reporte_tareas(pagina=Pagina(limite, despues), **opciones)
+        filas.extend(resultado.data)
+        paginas += 1
+        if resultado.siguiente is None:
+            return filas, paginas
+        despues = decodificar_cursor(resultado.siguiente)
+
+
+def _sin_id(docs):
+    return sorted(sorted((k, v) for k, v in doc.items() if k != "_id") for doc in docs)
+
+
+def test_pagina_directa_corta_antes_de_los_lookup(bases):
+    pipeline = ReporteModel.pipeline_reporte_tareas(pagina=Pagina(2, [3]))
+    operadores = [next(iter(etapa)) for etapa in pipeline]
+    assert operadores[:4] == ["$match", "$match", "$sort", "$limit"]
+    assert operadores.index("$limit") < operadores.index("$lookup")
+    assert pipeline[1] == {"$match": {"$or": [{"_id": {"$gt": 3}}]}}
+    assert pipeline[3] == {"$limit": 3}
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3, 10])
+def test_paginas_directas_cubren_el_reporte(bases, limite):
+    filas, _ = recorrer(limite)
+    assert [doc["_id"] for doc in filas] == [1, 2, 3, 4, 5]
+    assert _sin_id(filas) == _sin_id(ReporteModel.generar_reporte_tareas())
+
+
+def test_pagina_directa_avanza_sobre_tareas_que_no_salen_del_join(bases):
+    # Las tareas 6 y 7 no tienen proyecto/responsable: ocupan la página pero no se retornan
+    resultado = ReporteModel.generar_reporte_tareas(pagina=Pagina(1, [5]))
+    assert resultado.data == []
+    assert decodificar_cursor(resultado.siguiente) == [6]
+    siguiente = ReporteModel.generar_reporte_tareas(pagina=Pagina(1, [6]))
+    assert siguiente.data == [] and siguiente.siguiente is None
+
+
+def test_pagina_directa_con_filtro_campos_y_total(bases):
+    match = ReporteModel.compilar_filtro_tareas({"estado": "Pendiente"})
+    resultado = ReporteModel.generar_reporte_tareas(match=match, campos=["nombre_tarea"],
+                                                    pagina=Pagina(2, con_total=True))
+    assert resultado.data == [{"_id": 1, "nombre_tarea": "Tarea 1"}, {"_id": 4, "nombre_tarea": "Tarea 4"}]
+    assert resultado.total == 3
+    assert decodificar_cursor(resultado.siguiente) == [4]
+
+
+def test_paginas_materializadas_por_responsable(bases, con_merge):
+    ReporteModel.refrescar_reporte_materializado()
+    assert ReporteModel.vista_vigente()
+    filas, paginas = recorrer(2, modo="materializado")
+    assert paginas == 3
+    assert [(doc["nombre_responsable"], doc["_id"]) for doc in filas] == [
+        ("Ana", 2), ("Ana", 4), ("Ana", 5), ("Bruno", 1), ("Carla", 3)
+    ]
+    assert _sin_id(filas) == _sin_id(ReporteModel.generar_reporte_tareas())
+
+
+def test_materializado_sin_vista_responde_en_modo_directo(bases):
+    assert not ReporteModel.vista_vigente()
+    resultado = ReporteModel.generar_reporte_tareas(modo="materializado", pagina=Pagina(10))
+    assert [doc["_id"] for doc in resultado.data] == [1, 2, 3, 4, 5]
+    assert _sin_id(ReporteModel.generar_reporte_tareas(modo="materializado")) == _sin_id(
+        ReporteModel.generar_reporte_tareas()
+    )
+
+
+def test_materializado_con_vista_desactualizada_responde_en_modo_directo(bases, con_merge):
+    ReporteModel.refrescar_reporte_materializado()
+    bases.tareas.responsables.update_one({"_id": 2}, {"$set": {"nombre_responsable": "Bruna"}})
+    Versiones.incrementar(bases.tareas.responsables)
+
+    assert not ReporteModel.vista_vigente()
+    nombres = {doc["nombre_responsable"] for doc in ReporteModel.generar_reporte_tareas(modo="materializado")}
+    assert "Bruna" in nombres and "Bruno" not in nombres
+
+    ReporteModel.refrescar_reporte_materializado(ids_responsables=[2])
+    assert ReporteModel.vista_vigente()
+    filas, _ = recorrer(10, modo="materializado")
+    assert [(doc["nombre_responsable"], doc["_id"]) for doc in filas][-2:] == [("Bruna", 1), ("Carla", 3)]
+
+
+def test_cursor_de_otro_modo_es_invalido(bases, con_merge):
+    ReporteModel.refrescar_reporte_materializado()
+    with pytest.raises(ValueError):
+        ReporteModel.generar_reporte_tareas(pagina=Pagina(2, ["Ana", 2]))
+    with pytest.raises(ValueError):
+        ReporteModel.generar_reporte_tareas(modo="materializado", pagina=Pagina(2, [3]))
+
+
+@pytest.mark.parametrize("params, esperado", [
+    ({}, {}),
+    ({"estado": "all"}, {}),
+    ({"estado": "Pendiente"}, {"id_estado_tarea": {"$in": [1]}}),
+    ({"estado": " Pendiente, Vencida ,"}, {"id_estado_tarea": {"$in": [1, 3]}}),
+    # Un estado que no existe no coincide con ninguna tarea
+    ({"estado": "Archivada"}, {"id_estado_tarea": {"$in": []}}),
+    ({"id_proyecto": "2", "id_responsable": "1,3"},
+     {"id_proyecto": {"$in": [2]}, "id_responsable": {"$in": [1, 3]}}),
+    ({"edad_min": "30"}, {"id_responsable": {"$in": [2, 3]}}),
+    ({"edad_min": "20", "edad_max": "40"}, {"id_responsable": {"$in": [1, 2]}}),
+    ({"grupo_etareo": "adulto joven"}, {"id_responsable": {"$in": [1]}}),
+    ({"grupo_etareo": "adulto mayor"}, {"id_responsable": {"$in": [3]}}),
+    ({"grupo_etareo": "sin clasificar"}, {"id_responsable": {"$in": [4]}}),
+    # Los ids pedidos se cruzan con los que cumplen el filtro de edad
+    ({"id_responsable": "1,2,4", "edad_max": "30"}, {"id_responsable": {"$in": [1, 4]}}),
+])
+def test_compilar_filtro_tareas(bases, params, esperado):
+    assert ReporteModel.compilar_filtro_tareas(params) == esperado
+
+
+@pytest.mark.parametrize("params, error", [
+    ({"id_proyecto": "1,dos"}, "'id_proyecto' debe ser un entero o una lista"),
+    ({"id_responsable": "x"}, "'id_responsable' debe ser un entero o una lista"),
+    ({"edad_min": "veinte"}, "'edad_min' debe ser un entero"),
+    ({"edad_max": "1.5"}, "'edad_max' debe ser un entero"),
+    ({"grupo_etareo": "niño"}, "grupo_etareo inválido: 'niño'"),
+])
+def test_compilar_filtro_tareas_invalido(bases, params, error):
+    with pytest.raises(ValueError, match=error):
+        ReporteModel.compilar_filtro_tareas(params)
+
+
+def test_filtro_va_antes_de_los_lookup(bases):
+    match = ReporteModel.compilar_filtro_tareas({"estado": "Pendiente", "grupo_etareo": "adulto joven"})
+    pipeline = ReporteModel.pipeline_reporte_tareas(match)
+    assert pipeline[0] == {"$match": {"id_estado_tarea": {"$in": [1]}, "id_responsable": {"$in": [1]}}}
+    assert [doc["nombre_tarea"] for doc in ReporteModel.generar_reporte_tareas(match=match)] == ["Tarea 5"]
+
+
+def test_endpoint_filtro(api):
+    respuesta = api.get("/reportes/tareas/filtro?estado=Pendiente,Vencida&fields=nombre_tarea,estado_tarea")
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()
+    assert datos["total_registros"] == 4
+    assert sorted((d["nombre_tarea"], d["estado_tarea"]) for d in datos["data"]) == [
+        ("Tarea 1", "Pendiente"), ("Tarea 3", "Vencida"), ("Tarea 4", "Pendiente"), ("Tarea 5", "Pendiente")
+    ]
+
+    respuesta = api.get("/reportes/tareas/filtro?edad_min=abc")
+    assert respuesta.status_code == 400
+    assert respuesta.get_json() == {"success": False, "error": "El parámetro 'edad_min' debe ser un entero"}
@@ -0,0 +1,80 @@
+"""
+Reporte detallado de ventas: las páginas se cortan sobre (fecha, _id) de 'ventas' antes
+del $lookup a clientes y del $unwind de items.
+"""
+from datetime import datetime
+
+import pytest
+
+from paginacion import Pagina, decodificar_cursor
+from supermarket_models import SupermarketReporteModel
+
+VENTAS_INCOMPLETAS = [
+    # Cliente inexistente y venta sin items: no salen en el reporte
+    {"_id": 6, "cliente_id": 99, "fecha": datetime(2025, 9, 3),
+     "items": [{"producto_id": 1, "cantidad": 1, "precio_unitario": 4.5, "categoria_id": 1, "nombre": "Leche"}],
+     "total": 4.5},
+    {"_id": 7, "cliente_id": 1, "fecha": datetime(2025, 9, 3), "items": [], "total": 0},
+]
+
+
+def recorrer(limite, **rango):
+    filas, despues = [], None
+    while True:
+        resultado = SupermarketReporteModel.generar_reporte_ventas_detallado(pagina=Pagina(limite, despues), **rango)
+        filas.extend(resultado.data)
+        if resultado.siguiente is None:
+            return filas
+        despues = decodificar_cursor(resultado.siguiente)
+
+
+def _sin_linea(docs):
+    return sorted(sorted((k, v) for k, v in doc.items() if k != "linea") for doc in docs)
+
+
+def test_pagina_corta_ventas_antes_del_lookup(bases):
+    pipeline = SupermarketReporteModel.pipeline_reporte_ventas_detallado(
+        pagina=Pagina(2, [datetime(2025, 9, 3), 3, 0]), desde="2025-09-01", hasta="2025-09-30")
+    operadores = [next(iter(etapa)) for etapa in pipeline]
+    assert operadores[:5] == ["$match", "$match", "$sort", "$limit", "$lookup"]
+    assert pipeline[1] == {"$match": {"$or": [
+        {"fecha": {"$lt": datetime(2025, 9, 3)}},
+        {"fecha": datetime(2025, 9, 3), "_id": {"$lte": 3}},
+    ]}}
+    assert pipeline[2] == {"$sort": {"fecha": -1, "_id": -1}}
+    # limite + 1 filas, más la venta del cursor
+    assert pipeline[3] == {"$limit": 4}
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3, 10])
+def test_paginas_cubren_el_reporte(bases, limite):
+    bases.supermarket.ventas.insert_many([dict(venta) for venta in VENTAS_INCOMPLETAS])
+    filas = recorrer(limite)
+    assert [(doc["venta_id"], doc["linea"]) for doc in filas] == [(5, 0), (5, 1), (4, 0), (3, 0), (2, 0), (1, 0), (1, 1)]
+    assert _sin_linea(filas) == _sin_linea(SupermarketReporteModel.generar_reporte_ventas_detallado())
+
+
+def test_pagina_continua_dentro_de_una_venta(bases):
+    resultado = SupermarketReporteModel.generar_reporte_ventas_detallado(pagina=Pagina(1))
+    assert [(doc["venta_id"], doc["linea"]) for doc in resultado.data] == [(5, 0)]
+    assert decodificar_cursor(resultado.siguiente) == [datetime(2025, 10, 2), 5, 0]
+    siguiente = SupermarketReporteModel.generar_reporte_ventas_detallado(
+        pagina=Pagina(1, decodificar_cursor(resultado.siguiente)))
+    assert [(doc["venta_id"], doc["linea"]) for doc in siguiente.data] == [(5, 1)]
+
+
+def test_paginas_con_rango_campos_y_total(bases):
+    rango = {"desde": "2025-09-01", "hasta": "2025-09-30"}
+    resultado = SupermarketReporteModel.generar_reporte_ventas_detallado(
+        ["producto_nombre"], pagina=Pagina(2, con_total=True), **rango)
+    assert resultado.data == [
+        {"fecha": datetime(2025, 9, 20), "venta_id": 4, "linea": 0, "producto_nombre": "Pan"},
+        {"fecha": datetime(2025, 9, 3), "venta_id": 3, "linea": 0, "producto_nombre": "Queso"},
+    ]
+    assert resultado.total == 5
+    assert len(recorrer(2, **rango)) == 5
+
+
+def test_cursor_de_otro_listado_es_invalido(bases):
+    with pytest.raises(ValueError):
+        SupermarketReporteModel.generar_reporte_ventas_detallado(pagina=Pagina(2, [datetime(2025, 9, 3), "Lucía", 3, 0]))
@@ -0,0 +1,93 @@
+"""
+Rankings top-productos (sobre los rollups diarios) y top-clientes (sobre ventas), y su
+caché por conjunto de parámetros versionada por las colecciones que leen.
+"""
+from datetime import datetime
+
+import pytest
+
+from supermarket_models import SupermarketReporteModel, VentaDiariaModel
+from versioning import Versiones
+
+SEPTIEMBRE = {"desde": "2025-09-01", "hasta": "2025-09-30"}
+
+
+@pytest.fixture
+def rollups(bases):
+    VentaDiariaModel.registrar_ventas(list(bases.supermarket.ventas.find()))
+    return bases.supermarket.ventas_diarias
+
+
+def _productos(top):
+    return [(fila["producto"], fila["total_ingresos"]) for fila in top]
+
+
+def _clientes(top):
+    return [(fila["cliente_nombre"], fila["total_compras"], fila["total_gastado"]) for fila in top]
+
+
+def test_top_productos(rollups):
+    top = SupermarketReporteModel.generar_top_productos()
+    assert _productos(top) == [("Queso", 48.0), ("Leche", 13.5), ("Pan", 12.0)]
+    assert top[0] == {"producto_id": 2, "producto": "Queso", "categoria": "Lácteos",
+                      "total_ventas": 3, "total_cantidad": 4, "total_ingresos": 48.0}
+
+
+@pytest.mark.parametrize("parametros, esperado", [
+    ({"n": "2"}, [("Queso", 48.0), ("Leche", 13.5)]),
+    (SEPTIEMBRE, [("Queso", 36.0), ("Pan", 12.0), ("Leche", 9.0)]),
+    ({"categoria": "Panadería"}, [("Pan", 12.0)]),
+    ({"categoria": "1", "n": 1, **SEPTIEMBRE}, [("Queso", 36.0)]),
+])
+def test_top_productos_con_parametros(rollups, parametros, esperado):
+    assert _productos(SupermarketReporteModel.generar_top_productos(**parametros)) == esperado
+
+
+def test_top_clientes(bases):
+    assert _clientes(SupermarketReporteModel.generar_top_clientes()) == [
+        ("Lucía", 2, 35.0), ("Mateo", 2, 28.5), ("Sofía", 1, 10.0)
+    ]
+    assert _clientes(SupermarketReporteModel.generar_top_clientes(n=2, **SEPTIEMBRE)) == [
+        ("Lucía", 2, 35.0), ("Mateo", 1, 12.0)
+    ]
+    # Con categoría solo cuentan las ventas con items de esa categoría (mongomock no suma
+    # el arreglo del $sum de una expresión, así que el gasto por categoría no se compara)
+    por_categoria = SupermarketReporteModel.generar_top_clientes(categoria="Panadería")
+    assert sorted((fila["cliente_nombre"], fila["total_compras"]) for fila in por_categoria) == [
+        ("Lucía", 1), ("Sofía", 1)
+    ]
+
+
+@pytest.mark.parametrize("parametros, error", [
+    ({"n": "0"}, "n debe estar entre 1 y 100"),
+    ({"n": "101"}, "n debe estar entre 1 y 100"),
+    ({"n": "diez"}, "'n' debe ser un entero"),
+    ({"categoria": "Ferretería"}, "Categoría desconocida"),
+    ({"desde": "2025-10-01", "hasta": "2025-09-01"}, "'desde' no puede ser posterior a 'hasta'"),
+])
+def test_parametros_invalidos(bases, parametros, error):
+    with pytest.raises(ValueError, match=error):
+        SupermarketReporteModel.generar_top_clientes(**parametros)
+
+
+def test_cache_hasta_que_cambia_la_version(bases):
+    primero = SupermarketReporteModel.generar_top_clientes(n=1)
+    assert _clientes(primero) == [("Lucía", 2, 35.0)]
+    bases.supermarket.ventas.insert_one({"_id": 6, "cliente_id": 3, "fecha": datetime(2025, 10, 5), "items": [],
+                                         "total": 100.0})
+    # Parámetros equivalentes comparten la entrada, que sigue vigente sin cambio de versión
+    assert SupermarketReporteModel.generar_top_clientes(n="1") is primero
+
+    Versiones.incrementar(bases.supermarket.ventas)
+    assert _clientes(SupermarketReporteModel.generar_top_clientes(n=1)) == [("Sofía", 2, 110.0)]
+
+
+def test_endpoints(api, rollups):
+    respuesta = api.get("/supermarket/reportes/top-productos?n=1&categoria=Lácteos")
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()
+    assert datos["total_productos"] == 1 and datos["data"][0]["producto"] == "Queso"
+
+    respuesta = api.get("/supermarket/reportes/top-clientes?n=0")
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["success"] is False
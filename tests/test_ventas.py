@@ -0,0 +1,80 @@
+"""
+POST /supermarket/ventas: validación del body y efectos en los rollups diarios
+(ventas_diarias) y en el resumen del cliente (clientes_stats).
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+import supermarket_models
+
+
+class Reloj(datetime):
+    """21:30 del 5 de octubre en Bogotá (UTC-5): en UTC ya es el 6."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2025, 10, 6, 2, 30, tzinfo=timezone.utc).astimezone(tz)
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    monkeypatch.setattr(supermarket_models, "datetime", Reloj)
+
+
+def crear(api, body):
+    return api.post("/supermarket/ventas", json=body)
+
+
+def test_crea_venta_con_snapshot_y_total(api, bases, reloj):
+    respuesta = crear(api, {"cliente_id": 2, "items": [{"producto_id": 1, "cantidad": 2}, {"producto_id": 3, "cantidad": 1}]})
+    assert respuesta.status_code == 201
+    assert respuesta.get_json() == {"success": True, "message": "Venta creada", "id": 6, "total": 11.0}
+
+    venta = bases.supermarket.ventas.find_one({"_id": 6})
+    # Sin fecha, la venta es del día en UTC
+    assert venta["fecha"] == datetime(2025, 10, 6)
+    assert venta["items"] == [
+        {"producto_id": 1, "cantidad": 2, "precio_unitario": 4.5, "categoria_id": 1, "nombre": "Leche"},
+        {"producto_id": 3, "cantidad": 1, "precio_unitario": 2.0, "categoria_id": 2, "nombre": "Pan"},
+    ]
+
+
+def test_actualiza_rollups_y_resumen_del_cliente(api, bases):
+    crear(api, {"cliente_id": 2, "fecha": "2025-10-02", "items": [{"producto_id": 1, "cantidad": 2}]})
+    crear(api, {"cliente_id": 2, "fecha": "2025-10-03", "total": 30,
+                "items": [{"producto_id": 1, "cantidad": 1}, {"producto_id": 2, "cantidad": 2}]})
+
+    rollups = {
+        (fila["fecha"].day, fila["producto_id"]): (fila["lineas"], fila["cantidad"], fila["ingresos"])
+        for fila in bases.supermarket.ventas_diarias.find()
+    }
+    assert rollups == {(2, 1): (1, 2, 9.0), (3, 1): (1, 1, 4.5), (3, 2): (1, 2, 24.0)}
+
+    resumen = bases.supermarket.clientes_stats.find_one({"_id": 2})
+    assert resumen["compras"] == 2
+    assert resumen["total_gastado"] == 39.0
+    assert resumen["primera_compra"] == datetime(2025, 10, 2)
+    assert resumen["ultima_compra"] == datetime(2025, 10, 3)
+    assert resumen["por_categoria"] == {"1": 37.5}
+
+
+@pytest.mark.parametrize("body, error", [
+    ([1, 2], "Se esperaba un objeto JSON"),
+    ({"items": [{"producto_id": 1, "cantidad": 1}]}, "requiere cliente_id e items"),
+    ({"cliente_id": 1, "items": [{"producto_id": "leche", "cantidad": 1}]}, "requiere cliente_id e items"),
+    ({"cliente_id": 1, "items": []}, "al menos un item"),
+    ({"cliente_id": 1, "items": [{"producto_id": 1, "cantidad": 0}]}, "cantidades positivas"),
+    ({"cliente_id": 1, "fecha": "02/10/2025", "items": [{"producto_id": 1, "cantidad": 1}]}, "fecha AAAA-MM-DD"),
+    ({"cliente_id": 1, "total": "mucho", "items": [{"producto_id": 1, "cantidad": 1}]}, "debe ser numérico"),
+    ({"cliente_id": 1, "items": [{"producto_id": 1, "cantidad": 1}, {"producto_id": 9, "cantidad": 1}]},
+     "Productos inexistentes: 9"),
+])
+def test_body_invalido_no_escribe_nada(api, bases, body, error):
+    respuesta = crear(api, body)
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["success"] is False
+    assert error in respuesta.get_json()["error"]
+    assert bases.supermarket.ventas.count_documents({}) == 5
+    assert bases.supermarket.ventas_diarias.count_documents({}) == 0
+    assert bases.supermarket.clientes_stats.count_documents({}) == 0
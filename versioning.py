@@ -0,0 +1,155 @@
+"""
+Contadores de versión por colección y respuestas condicionales (ETag / 304).
+
+Cada escritura hecha a través de los modelos incrementa el contador de la
+colección afectada en la colección `_versiones` de su base de datos. Los
+endpoints de reportes calculan su ETag a partir de las versiones de las
+colecciones de las que dependen y responden 304 a `If-None-Match` sin
+ejecutar el pipeline.
+
+Para detectar también escrituras hechas por fuera de la API (importadores,
+shell de Mongo) se puede activar un change stream con Versiones.vigilar
+(requiere un replica set).
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from cache import DimensionCache
+
+COLECCION_VERSIONES = "_versiones"
+
+
+class Versiones:
+    """Lectura e incremento de los contadores de versión."""
+
+    @staticmethod
+    def incrementar(collection):
+        """Registra que `collection` cambió."""
+        collection.database[COLECCION_VERSIONES].update_one(
+            {"_id": collection.name},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+        # Las dimensiones en memoria se recargan en el siguiente acceso
+        DimensionCache.invalidar(collection.name)
+
+    @staticmethod
+    def obtener(colecciones):
+        """
+        Lee las versiones actuales con una consulta por base de datos.
+
+        Returns:
+            dict: {"bd.coleccion": version} (0 si la colección nunca cambió).
+        """
+        por_db = {}
+        for collection in colecciones:
+            db = collection.database
+            por_db.setdefault(db.name, (db, []))[1].append(collection.name)
+
+        versiones = {}
+        for nombre_db, (db, nombres) in por_db.items():
+            encontradas = {
+                doc["_id"]: doc.get("version", 0)
+                for doc in db[COLECCION_VERSIONES].find({"_id": {"$in": nombres}})
+            }
+            for nombre in nombres:
+                versiones[f"{nombre_db}.{nombre}"] = encontradas.get(nombre, 0)
+        return versiones
+
+    @staticmethod
+    def registrar_fuentes(derivada, versiones):
+        """
+        Guarda junto al contador de `derivada` (p. ej. una vista materializada) las
+        versiones de las colecciones de las que se construyó (resultado de obtener()).
+        """
+        derivada.database[COLECCION_VERSIONES].update_one(
+            {"_id": derivada.name},
+            {"$set": {"fuentes": sorted(versiones.items())}},
+            upsert=True
+        )
+
+    @staticmethod
+    def vigente(derivada, fuentes):
+        """
+        True si `derivada` se construyó con las versiones actuales de `fuentes`.
+        Una colección derivada que nunca registró sus fuentes no está vigente.
+        """
+        doc = derivada.database[COLECCION_VERSIONES].find_one({"_id": derivada.name}, {"fuentes": 1})
+        if not doc or "fuentes" not in doc:
+            return False
+        return {nombre: version for nombre, version in doc["fuentes"]} == Versiones.obtener(fuentes)
+
+    @staticmethod
+    def etag(colecciones, variante=""):
+        """ETag derivado de las versiones de `colecciones` y de la variante de la petición."""
+        versiones = Versiones.obtener(colecciones)
+        firma = ";".join(f"{k}={v}" for k, v in sorted(versiones.items()))
+        return hashlib.sha1(f"{firma}|{variante}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def vigilar(db):
+        """
+        Inicia un hilo que incrementa las versiones a partir del change stream de `db`.
+        Requiere que MongoDB corra como replica set.
+        """
+        def bucle():
+            pipeline = [{"$match": {"ns.coll": {"$ne": COLECCION_VERSIONES}}}]
+            while True:
+                try:
+                    with db.watch(pipeline) as stream:
+                        for cambio in stream:
+                            nombre = cambio.get("ns", {}).get("coll")
+                            if nombre:
+                                Versiones.incrementar(db[nombre])
+                except Exception as e:
+                    print(f"[WARN] Change stream de {db.name} interrumpido: {e}")
+                    time.sleep(5)
+
+        hilo = threading.Thread(target=bucle, name=f"versiones-{db.name}", daemon=True)
+        hilo.start()
+        return hilo
+
+
+def _resolver(dependencia):
+    """Una dependencia es un modelo o una tupla (modelo, nombre de colección)."""
+    if isinstance(dependencia, tuple):
+        modelo, nombre = dependencia
+        return modelo.collection[nombre]
+    return dependencia.collection
+
+
+def condicional(*dependencias):
+    """
+    Decorador para endpoints GET: emite ETag y responde 304 si el cliente ya tiene
+    la versión vigente. Las dependencias se resuelven en cada petición porque los
+    modelos se inicializan después de importar los controladores.
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            # Los planes de explain miden la ejecución actual: nunca se responden con 304
+            if request.args.get("explain"):
+                return f(*args, **kwargs)
+            try:
+                colecciones = [_resolver(d) for d in dependencias]
+                variante = f"{request.full_path}|{request.headers.get('Accept', '')}"
+                etag = Versiones.etag(colecciones, variante)
+            except Exception:
+                # Sin versiones disponibles se responde normalmente, sin ETag
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                no_modificado = Response(status=304)
+                no_modificado.set_etag(etag)
+                return no_modificado
+
+            respuesta = make_response(f(*args, **kwargs))
+            if respuesta.status_code == 200:
+                respuesta.set_etag(etag)
+            return respuesta
+        return envoltura
+    return decorador